@@ -1,9 +1,8 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
 
 from actionlog.consumers import ActionLogEntryConsumer
 from tournaments.models import Round
+from utils.broadcasts import publish
 from utils.misc import get_ip_address
 
 from .models import ActionLogEntry
@@ -104,12 +103,8 @@ class LogActionMixin:
 
         # Notify the actionlog consumer to broadcast the event
         if self.tournament:
-            print('Broadcasting notification of ActionLogEntryConsumer')
             group_name = ActionLogEntryConsumer.group_prefix + "_" + self.tournament.slug
-            async_to_sync(get_channel_layer().group_send)(group_name, {
-                "type": "send_json",
-                "data": log.serialize,
-            })
+            publish(group_name, log.serialize)
 
     # If these methods exist, add `self.log_action()` to them.
     # (If they don't, this should be harmless.)
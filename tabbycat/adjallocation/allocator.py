@@ -1,36 +1,58 @@
 import logging
 
+from django.db import transaction
 from django.utils.translation import gettext as _
 
 from participants.models import Team
 from utils.views import BadJsonRequestError
 
-from .conflicts import ConflictsInfo, HistoryInfo
+from .conflicts import ConflictsInfo, HistoryInfo, update_round_encounters
 
 logger = logging.getLogger(__name__)
 
 
-def allocate_adjudicators(round, alloc_class):
+def allocate_adjudicators(round, alloc_class, progress=None):
+    """Runs the allocator of the given class on the round and saves the
+    allocation. Returns the allocator, for callers that want to report on it.
+    If `progress` is given, it is passed on to the allocator (see
+    `Allocator.report_progress()`)."""
     if round.draw_status != round.STATUS_CONFIRMED:
         raise RuntimeError("Tried to allocate adjudicators on unconfirmed draw")
 
     debates = round.debate_set.all()
     adjs = list(round.active_adjudicators.all())
-    allocator = alloc_class(debates, adjs, round)
+    allocator = alloc_class(debates, adjs, round, progress=progress)
 
-    for alloc in allocator.allocate():
-        alloc.save()
+    with transaction.atomic():
+        for alloc in allocator.allocate():
+            alloc.save()
+        update_round_encounters(round)
 
     round.adjudicator_status = round.STATUS_DRAFT
     round.save()
 
+    return allocator
+
+
+def get_allocator_class(round):
+    """Returns the auto-allocator class appropriate for the given round."""
+    from .anneal import ConsensusAnnealingAllocator, VotingAnnealingAllocator
+    from .hungarian import ConsensusHungarianAllocator, VotingHungarianAllocator
+
+    anneal = round.tournament.pref('adj_anneal_time') > 0
+    if round.ballots_per_debate == 'per-adj':
+        return VotingAnnealingAllocator if anneal else VotingHungarianAllocator
+    else:
+        return ConsensusAnnealingAllocator if anneal else ConsensusHungarianAllocator
+
 
 class Allocator(object):
-    def __init__(self, debates, adjudicators, round):
+    def __init__(self, debates, adjudicators, round, progress=None):
         self.tournament = round.tournament
         self.round = round
         self.debates = list(debates)
         self.adjudicators = adjudicators
+        self.progress = progress
 
         if len(self.adjudicators) == 0:
             info = _("There are no available adjudicators. Ensure there are "
@@ -45,3 +67,10 @@ class Allocator(object):
 
     def allocate(self):
         raise NotImplementedError
+
+    def report_progress(self, message, cost=None):
+        """Passes a description of the current step, and optionally the cost
+        of the best allocation found so far, to the `progress` callback, if
+        there is one."""
+        if self.progress is not None:
+            self.progress(message, cost)
@@ -1,208 +1,141 @@
-import math
+"""Simulated annealing for adjudicator allocations.
+
+The annealing allocators first run the corresponding Hungarian allocator, then
+spend a bounded amount of time improving its allocation by randomly swapping
+adjudicators between panels, or whole panels between debates. The Hungarian
+allocation fixes the size of each panel and the overall quality distribution;
+annealing then trades off conflicts and histories against deviations from that
+quality distribution.
+
+The state is stored as lists of adjudicator indices, one list per debate, and
+all penalties are looked up from tables built once before annealing starts, so
+the energy change of a proposed swap is computed from the two affected panels
+only, independently of the size of the tournament.
+
+Several independent annealing chains, with different random seeds, can be run
+in parallel in separate processes; the best result is kept. The annealing
+itself is done by `Annealer` (in `adjallocation.annealer`), which holds only
+plain Python data so that it can be sent to worker processes."""
+
+import logging
+import multiprocessing
+import os
 import random
 
-from .allocator import Allocator
-from .stab import StabAllocator
-
-
-class SAAllocator(Allocator):
-    SCORE_ADJ_TEAM_CONFLICT = 10000
-    SCORE_TARGET_PANEL = 800
-    SCORE_ADJ_TEAM_HISTORY = 100
-    SCORE_ADJ_ADJ_HISTORY = 30
-
-    MAX_TRIES = 3
-
-    def allocate(self, initial=None):
-        from .allocation import AdjudicatorAllocation
-
-        if initial is None:
-            initial = StabAllocator(self.debates, self.adjudicators).allocate()
-
-        pairs = [(aa.debate, tuple(a[1] for a in aa)) for aa in initial]
-
-        top_bracket = pairs[0][0].bracket
-        bot_bracket = pairs[-1][0].bracket
-
-        # 4-0 - 5 brackets, needs 6 gaps
-        # 5-2
-
-        gaps = (top_bracket - bot_bracket) + 2
-
-        div = 3.0 / gaps
-
-        for debate, panel in pairs:
-            setattr(debate, 'target_panel', 2 + (debate.bracket - bot_bracket +
-                                                 1) * div)
-
-        print([d.target_panel for d, p in pairs])
-
-        self.state = dict(pairs)
-
-        self.anneal(800, 1, 1e4, self.state)
-
-        # i = 0
-        # while self.best_energy > 0 and i < self.MAX_TRIES:
-        #    self.anneal(100, 1, 1e3, self.best_state)
-        #    i += 1
-
-        result = []
-        for debate, panel in list(self.best_state.items()):
-            aa = AdjudicatorAllocation(debate)
-            panel = list(panel)
-            panel.sort(key=lambda x: x.score, reverse=True)
-
-            aa.chair = panel.pop(0)
-            aa.panel = panel
+from django.utils.translation import gettext as _, ngettext
+
+from .allocation import AdjudicatorAllocation
+from .annealer import Annealer, run_annealer
+from .hungarian import ConsensusHungarianAllocator, VotingHungarianAllocator
+
+logger = logging.getLogger(__name__)
+
+
+class AnnealingMixin:
+    """Mixin for Hungarian allocators that improves the allocation returned by
+    `run_allocation()` using simulated annealing. Must be mixed in before the
+    Hungarian allocator class.
+
+    The time spent annealing and the number of independent chains are set by
+    the `time_limit` and `chains` arguments, which default to the tournament's
+    `adj_anneal_time` and `adj_anneal_chains` preferences. After allocating,
+    `self.anneal_stats` holds the statistics of each chain and the index of
+    the chain whose result was used."""
+
+    def __init__(self, *args, time_limit=None, chains=None, seed=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if time_limit is None:
+            time_limit = self.tournament.pref('adj_anneal_time')
+        if chains is None:
+            chains = self.tournament.pref('adj_anneal_chains')
+        self.time_limit = time_limit
+        self.chains = max(chains, 1)
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self.anneal_stats = None
+
+    def run_allocation(self):
+        allocation = super().run_allocation()
+        if self.time_limit <= 0:
+            return allocation
+
+        tables = self.build_annealing_tables(allocation)
+        if len(self._panel_debates) < 2:
+            logger.info("Fewer than two panels, skipping annealing")
+            return allocation
+
+        annealers = [Annealer(*tables, seed=self.seed + i) for i in range(self.chains)]
+        self.report_progress(ngettext("Annealing panels for %(time)g seconds",
+                "Annealing panels for %(time)g seconds in %(chains)d runs", self.chains) % {
+                'time': self.time_limit, 'chains': self.chains})
+        results = self.run_chains(annealers)
+
+        energies = [stats['final_energy'] for best, stats in results]
+        best_index = energies.index(min(energies))
+        self.anneal_stats = {
+            'chains': [stats for best, stats in results],
+            'best': best_index,
+        }
+        if len(results) > 1:
+            logger.info("Annealing chain energies: %s; using chain %d",
+                    ", ".join("%f" % e for e in energies), best_index)
+        self.report_progress(_("Annealed panels"), energies[best_index])
+
+        return self.make_allocation(results[best_index][0], allocation)
+
+    def run_chains(self, annealers):
+        """Runs the annealers, in parallel in a process pool if there's more
+        than one of them, and returns a list of the results of
+        `run_annealer()`.
+
+        The pool's processes are started fresh ("spawned"), rather than forked,
+        since allocations run in web and worker processes that have other
+        threads, and a forked process could inherit locks held by them."""
+        if len(annealers) == 1:
+            return [run_annealer(annealers[0], self.time_limit)]
+
+        processes = min(len(annealers), os.cpu_count() or 1)
+        logger.info("Running %d annealing chains in %d processes", len(annealers), processes)
+        with multiprocessing.get_context('spawn').Pool(processes) as pool:
+            return pool.starmap(run_annealer, [(annealer, self.time_limit) for annealer in annealers])
+
+    def build_annealing_tables(self, allocation):
+        """Returns the positional arguments for `Annealer`, built from the
+        allocation returned by the Hungarian allocator."""
+
+        # Only debates with at least one voting adjudicator take part
+        allocation = [aa for aa in allocation if aa.num_voting > 0]
+        self._panel_debates = [aa.debate for aa in allocation]
+        self._adjs = [adj for aa in allocation for adj in aa.voting()]
+        adj_index = {adj: i for i, adj in enumerate(self._adjs)}
+        initial_panels = [[adj_index[adj] for adj in aa.voting()] for aa in allocation]
+
+        # Penalty tables are converted to nested lists, since indexing Python
+        # lists is much faster than indexing NumPy arrays one element at a time
+        adjteam_penalties = self.calc_team_penalty_matrix(self._panel_debates, self._adjs).tolist()
+        adjadj_penalties = (
+            self.conflict_penalty * self.conflicts.conflict_adj_adj_matrix(self._adjs, self._adjs) +
+            self.history_penalty * self.history.seen_adj_adj_matrix(self._adjs, self._adjs)
+        ).astype(float).tolist()
+        scores = [adj._normalized_score for adj in self._adjs]
+
+        return adjteam_penalties, adjadj_penalties, scores, initial_panels
+
+    def make_allocation(self, state, allocation):
+        """Converts `state` back to a list of AdjudicatorAllocations. Trainees
+        stay in the debates the Hungarian allocator put them in."""
+        trainees = {aa.debate: aa.trainees for aa in allocation}
+        result = [aa for aa in allocation if aa.num_voting == 0]
+        for debate, panel in zip(self._panel_debates, state.panels):
+            adjs = sorted((self._adjs[a] for a in panel), key=lambda adj: adj._normalized_score, reverse=True)
+            aa = AdjudicatorAllocation(debate, chair=adjs[0], panellists=adjs[1:], trainees=trainees[debate])
             result.append(aa)
-
+            logger.debug("allocating to %s: %s (c), %s", aa.debate, aa.chair, ", ".join([str(p) for p in aa.panellists]))
         return result
 
-    def save_best(self):
-        self.best_energy = self.energy
-        self.best_state = dict(self.state)
-
-    def anneal(self, steps, min_temp, max_temp, state):
-
-        self.energy = self.calc_energy(state)
-        print("start energy", self.energy)
-        self.save_best()
-        tf = -math.log(float(max_temp) / min_temp)
-
-        accepts = 0
-        improves = 0
-
-        for i in range(steps):
-
-            temp = max_temp * math.exp(tf * i/steps)
-
-            diff, swap = self.candidate_swap()
-            if diff < 0 or math.exp(-diff / temp) > random.random():
-                accepts += 1
-                self.energy += diff
-                self.apply_swap(swap)
-
-                if diff < 0:
-                    improves += 1
-
-                    if self.energy < self.best_energy:
-                        self.save_best()
-                        if self.energy == 0:
-                            break
-
-        print("accepts", accepts, "improves", improves)
-        print("end energy", self.best_energy)
-        print("end energy", self.calc_energy(self.best_state))
-        print(self.best_state)
-
-    def calc_energy(self, state):
-        return sum(self.score(debate, panel) for debate, panel in list(state.items()))
-
-    def candidate_swap(self):
-        meth = random.choice((self.panel_swap, self.member_swap))
-        return meth()
-
-    def member_swap(self):
-        d1 = random.choice(list(self.state.keys()))
-        panel1 = self.state[d1]
-        a1 = random.choice(panel1)
-
-        d2 = d1
-        panel2 = self.state[d2]
-
-        while d1 == d2 or len(panel1) != len(panel2):
-            d2 = random.choice(list(self.state.keys()))
-            panel2 = self.state[d2]
-            a2 = random.choice(panel2)
-
-        assert len(panel1) == len(panel2)
-
-        idx1 = panel1.index(a1)
-        new_panel1 = panel1[:idx1] + (a2,) + panel1[idx1+1:]
-        idx2 = panel2.index(a2)
-        new_panel2 = panel2[:idx2] + (a1,) + panel2[idx2+1:]
-
-        curr_score = self.score(d1, panel1) + self.score(d2, panel2)
-        new_score = self.score(d1, new_panel1) + self.score(d2, new_panel2)
-        diff = new_score - curr_score
-        swap = ((d1, new_panel1), (d2, new_panel2))
-
-        return diff, swap
-
-    def panel_swap(self):
-
-        # panel swap
-        d1 = random.choice(list(self.state.keys()))
-        d2 = d1
-        panel1 = self.state[d1]
-        panel2 = self.state[d2]
-
-        while d2 == d1 or len(panel1) != len(panel2):
-            d2 = random.choice(list(self.state.keys()))
-            panel2 = self.state[d2]
-
-        curr_score = self.score(d1, panel1) + self.score(d2, panel2)
-        new_score = self.score(d2, panel1) + self.score(d1, panel2)
-
-        diff = new_score - curr_score
-        swap = ((d2, panel1), (d1, panel2))
-
-        return diff, swap
-
-    def apply_swap(self, swap):
-        for debate, panel in swap:
-            self.state[debate] = panel
-
-    def score(self, debate, panel):
-        score = sum(getattr(self, f)(debate, panel) for f in dir(self) if f.startswith('score_'))
-        return score
-
-    def score_adj_team_conflict(self, debate, panel):
-        score = 0
-
-        for adj in panel:
-            score += self.SCORE_ADJ_TEAM_CONFLICT * self.conflicts.conflict_adj_team(adj, debate.aff_team)
-            score += self.SCORE_ADJ_TEAM_CONFLICT * self.conflicts.conflict_adj_team(adj, debate.neg_team)
-        return score
-
-    def score_adj_team_history(self, debate, panel):
-        score = 0
-
-        for adj in panel:
-            adj_impt = (6 - adj.score)
-            score += self.SCORE_ADJ_TEAM_HISTORY * self.history.seen_adj_team(adj, debate.aff_team) * adj_impt
-            score += self.SCORE_ADJ_TEAM_HISTORY * self.history.seen_adj_team(adj, debate.neg_team) * adj_impt
-
-        return score
-
-    def score_adj_adj_history(self, debate, panel):
-        score = 0
-
-        for i, adj in enumerate(panel):
-            for j in range(i+1, len(panel)):
-                score += self.SCORE_ADJ_ADJ_HISTORY * self.history.seen_adj_adj(adj, panel[j])
-
-        return score
-
-    def score_target_panel_strength(self, debate, panel):
-        avg = sum(p.score for p in panel) / len(panel)
-        diff = abs(debate.target_panel - avg)
-
-        return self.SCORE_TARGET_PANEL * diff * debate.target_panel * avg
-
-
-def test():
-    from tournaments.models import Round
-    from adjallocation.stab import StabAllocator
-
-    r = Round.objects.get(pk=4)
-    debates = r.debates()
-    adjs = list(r.active_adjudicators.all())
 
-    initial = StabAllocator(debates, adjs).allocate()
+class VotingAnnealingAllocator(AnnealingMixin, VotingHungarianAllocator):
+    pass
 
-    sa = SAAllocator(debates, adjs).allocate(initial)
-    print(sa)
 
-if __name__ == '__main__':
-    test()
+class ConsensusAnnealingAllocator(AnnealingMixin, ConsensusHungarianAllocator):
+    pass
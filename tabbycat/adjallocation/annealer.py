@@ -0,0 +1,217 @@
+"""The simulated annealing algorithm used by the annealing allocators in
+`adjallocation.anneal`.
+
+This module holds only plain Python data and doesn't import Django, so that
+annealing chains can be run in freshly started ("spawned") worker processes,
+which import this module without setting up Django."""
+
+import logging
+import math
+import random
+import time
+from statistics import median
+
+logger = logging.getLogger(__name__)
+
+
+class AnnealingState:
+    """Array-backed state for the annealer. `panels[d]` is a list of indices
+    (into the annealer's list of adjudicators) of the voting adjudicators on
+    debate `d`, and `energies[d]` is the energy of that panel."""
+
+    def __init__(self, panels, energies):
+        self.panels = panels
+        self.energies = energies
+        self.energy = sum(energies)
+
+    def copy(self):
+        return AnnealingState([list(panel) for panel in self.panels], list(self.energies))
+
+
+class Annealer:
+    """Anneals a set of panels. `adjteam_penalties[d][a]` is the penalty for
+    putting adjudicator `a` on debate `d`, `adjadj_penalties[a][b]` is the
+    penalty for putting adjudicators `a` and `b` on the same panel, `scores[a]`
+    is the normalised score of adjudicator `a`, and `initial_panels[d]` is a
+    list of the adjudicators initially on debate `d`. The initial panels define
+    the target panel strengths."""
+
+    SCORE_TARGET_PANEL = 2000   # per point of normalised average panel score
+    SCORE_TARGET_CHAIR = 2000   # per point of normalised chair score below target
+
+    INITIAL_ACCEPTANCE = 0.2    # acceptance probability of a typical uphill move at the start
+    FINAL_TEMP_RATIO = 1e-4     # final temperature as a fraction of initial temperature
+    TIME_CHECK_INTERVAL = 256   # steps between checks of the time budget
+
+    def __init__(self, adjteam_penalties, adjadj_penalties, scores, initial_panels, seed=None):
+        self._adjteam_penalties = adjteam_penalties
+        self._adjadj_penalties = adjadj_penalties
+        self._scores = scores
+        self._initial_panels = initial_panels
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+        # Targets are the strengths of the initial panels
+        self._target_averages = [sum(scores[a] for a in panel) / len(panel) for panel in initial_panels]
+        self._target_chairs = [max(scores[a] for a in panel) for panel in initial_panels]
+
+        # Panel swaps are only between panels of the same size
+        self._debates_by_size = {}
+        for d, panel in enumerate(initial_panels):
+            self._debates_by_size.setdefault(len(panel), []).append(d)
+
+    def initial_state(self):
+        panels = [list(panel) for panel in self._initial_panels]
+        return AnnealingState(panels, [self.score(d, panel) for d, panel in enumerate(panels)])
+
+    # ==========================================================================
+    # Energy
+    # ==========================================================================
+
+    def score(self, d, panel):
+        """Returns the energy of the panel `panel` (a list of adjudicator
+        indices) if it were on debate `d`."""
+        return (self.score_adj_team(d, panel) + self.score_adj_adj(panel) +
+                self.score_target_panel_strength(d, panel))
+
+    def score_adj_team(self, d, panel):
+        """Conflicts and histories between the panel and the teams."""
+        penalties = self._adjteam_penalties[d]
+        return sum(penalties[a] for a in panel)
+
+    def score_adj_adj(self, panel):
+        """Conflicts and histories between members of the panel."""
+        score = 0
+        for i, a in enumerate(panel):
+            penalties = self._adjadj_penalties[a]
+            for b in panel[i+1:]:
+                score += penalties[b]
+        return score
+
+    def score_target_panel_strength(self, d, panel):
+        """Deviation of the panel's average score from the target, and shortfall
+        of the chair's score below the target.
+
+        This isn't the old SAAllocator's term, `diff * target * avg`. Scores
+        are now normalised to 0-5, and that term was zero for a panel whose
+        average was zero, whatever the target, so a chain could drain a strong
+        panel to lower its energy. The chair term stops swaps from keeping a
+        panel's average while moving its chair to a weaker debate, which the
+        average alone can't see."""
+        scores = [self._scores[a] for a in panel]
+        avg = sum(scores) / len(scores)
+        score = self.SCORE_TARGET_PANEL * abs(self._target_averages[d] - avg)
+        score += self.SCORE_TARGET_CHAIR * max(self._target_chairs[d] - max(scores), 0)
+        return score
+
+    # ==========================================================================
+    # Moves
+    # ==========================================================================
+
+    def candidate_swap(self, state):
+        """Returns a 2-tuple `(diff, swap)`, where `swap` is a tuple of
+        `(d, new_panel, new_energy)` for each affected debate, and `diff` is the
+        change in total energy if the swap were applied."""
+        if self.rng.random() < 0.5:
+            return self.panel_swap(state)
+        return self.member_swap(state)
+
+    def member_swap(self, state):
+        """Swaps one adjudicator between two panels."""
+        d1, d2 = self.rng.sample(range(len(state.panels)), 2)
+        panel1, panel2 = state.panels[d1], state.panels[d2]
+        i = self.rng.randrange(len(panel1))
+        j = self.rng.randrange(len(panel2))
+
+        new_panel1 = panel1[:i] + [panel2[j]] + panel1[i+1:]
+        new_panel2 = panel2[:j] + [panel1[i]] + panel2[j+1:]
+        new_energy1 = self.score(d1, new_panel1)
+        new_energy2 = self.score(d2, new_panel2)
+
+        diff = new_energy1 + new_energy2 - state.energies[d1] - state.energies[d2]
+        return diff, ((d1, new_panel1, new_energy1), (d2, new_panel2, new_energy2))
+
+    def panel_swap(self, state):
+        """Swaps two entire panels of the same size between debates."""
+        d1 = self.rng.randrange(len(state.panels))
+        candidates = self._debates_by_size[len(state.panels[d1])]
+        if len(candidates) < 2:
+            return self.member_swap(state)
+        d2 = d1
+        while d2 == d1:
+            d2 = self.rng.choice(candidates)
+
+        new_panel1, new_panel2 = state.panels[d2], state.panels[d1]
+        new_energy1 = self.score(d1, new_panel1)
+        new_energy2 = self.score(d2, new_panel2)
+
+        diff = new_energy1 + new_energy2 - state.energies[d1] - state.energies[d2]
+        return diff, ((d1, new_panel1, new_energy1), (d2, new_panel2, new_energy2))
+
+    @staticmethod
+    def apply_swap(state, diff, swap):
+        for d, panel, energy in swap:
+            state.panels[d] = panel
+            state.energies[d] = energy
+        state.energy += diff
+
+    # ==========================================================================
+    # Annealing
+    # ==========================================================================
+
+    def initial_temperature(self, state, samples=100):
+        """Chooses a starting temperature at which a typical uphill move is
+        accepted with probability `INITIAL_ACCEPTANCE`."""
+        uphill = [diff for diff, swap in (self.candidate_swap(state) for i in range(samples)) if diff > 0]
+        if not uphill:
+            return 1.0
+        return median(uphill) / -math.log(self.INITIAL_ACCEPTANCE)
+
+    def anneal(self, state, time_limit):
+        """Anneals from `state` for `time_limit` seconds, and returns the best
+        state found. The temperature falls geometrically with elapsed time."""
+
+        start = time.perf_counter()
+        max_temp = self.initial_temperature(state)
+        log_ratio = math.log(self.FINAL_TEMP_RATIO)
+        initial_energy = state.energy
+        best = state.copy()
+        temp = max_temp
+        steps = accepts = 0
+
+        while best.energy > 0:
+            if steps % self.TIME_CHECK_INTERVAL == 0:
+                elapsed = time.perf_counter() - start
+                if elapsed >= time_limit:
+                    break
+                temp = max_temp * math.exp(log_ratio * elapsed / time_limit)
+            steps += 1
+
+            diff, swap = self.candidate_swap(state)
+            if diff <= 0 or math.exp(-diff / temp) > self.rng.random():
+                self.apply_swap(state, diff, swap)
+                accepts += 1
+                if state.energy < best.energy:
+                    best = state.copy()
+
+        # Recompute from scratch, to guard against accumulated rounding error
+        best.energy = sum(best.energies)
+        self.stats = {
+            'seed': self.seed,
+            'steps': steps,
+            'accepts': accepts,
+            'initial_energy': initial_energy,
+            'final_energy': best.energy,
+            'elapsed': time.perf_counter() - start,
+        }
+        logger.info("Annealing: %d steps (%d accepted) in %.2f seconds, energy %f -> %f",
+                steps, accepts, self.stats['elapsed'], initial_energy, best.energy)
+        return best
+
+
+def run_annealer(annealer, time_limit):
+    """Runs `annealer` from its initial state, and returns a 2-tuple of the
+    best state found and the annealer's statistics. This is a module-level
+    function so that it can be run in a worker process."""
+    best = annealer.anneal(annealer.initial_state(), time_limit)
+    return best, annealer.stats
@@ -3,11 +3,70 @@ participants."""
 
 from itertools import combinations, product
 
+import numpy as np
+from django.db import IntegrityError, transaction
+
 from draw.models import Debate
 from participants.models import Adjudicator, Team
 
 from .models import (AdjudicatorAdjudicatorConflict, AdjudicatorInstitutionConflict,
-                     AdjudicatorTeamConflict, TeamInstitutionConflict)
+                     AdjudicatorTeamConflict, RoundEncounters, TeamInstitutionConflict)
+
+
+def _fetch_round_encounters(round_ids):
+    """Returns a dict mapping each of `round_ids` to a 2-tuple of lists
+    `(adjteam_pairs, adjadj_pairs)` of the encounters in that round, where
+    `adjteam_pairs` contains `(adj.id, team.id)` tuples and `adjadj_pairs`
+    contains `(adj1.id, adj2.id)` tuples."""
+
+    # The prefetches don't need `.select_related('adjudicator')` and
+    # `.select_related('team')`, because we only deal with the primary keys
+    # of adjudicators and teams.
+
+    debates = Debate.objects.filter(round_id__in=round_ids).prefetch_related(
+        'debateadjudicator_set',
+        'debateteam_set',
+    )
+
+    encounters = {round_id: ([], []) for round_id in round_ids}
+
+    for debate in debates:
+        adjteam_pairs, adjadj_pairs = encounters[debate.round_id]
+
+        for da, dt in product(debate.debateadjudicator_set.all(), debate.debateteam_set.all()):
+            adjteam_pairs.append((da.adjudicator_id, dt.team_id))
+
+        for da1, da2 in combinations(debate.debateadjudicator_set.all(), 2):
+            adjadj_pairs.append((da1.adjudicator_id, da2.adjudicator_id))
+
+    return encounters
+
+
+def update_round_encounters(round):
+    """Stores the encounters in the given round for `HistoryInfo`. This should
+    be called once whenever a round's draw or adjudicator allocation is saved,
+    in the same transaction, after the changes are made."""
+    adjteam_pairs, adjadj_pairs = _fetch_round_encounters([round.id])[round.id]
+    RoundEncounters.objects.update_or_create(round=round,
+            defaults={'adjteam_pairs': adjteam_pairs, 'adjadj_pairs': adjadj_pairs})
+
+
+def _build_index(ids):
+    """Returns a dict mapping each of `ids` to a compact integer index."""
+    return {id: i for i, id in enumerate(sorted(ids))}
+
+
+def _lookup_indices(index, objs):
+    """Returns a NumPy array of the indices of `objs` in `index`. Objects not
+    in `index` are given the index -1, which in the matrices built by the
+    classes in this module refers to a padding row or column of all False."""
+    return np.array([index.get(obj.id, -1) for obj in objs], dtype=np.intp)
+
+
+def _padded_matrix(nrows, ncols):
+    """Returns a boolean matrix of all False with one extra row and column, for
+    use with `_lookup_indices()`."""
+    return np.zeros((nrows + 1, ncols + 1), dtype=bool)
 
 
 class ConflictsInfo:
@@ -23,6 +82,12 @@ class ConflictsInfo:
     All queries must relate to teams and adjudicators that were in the QuerySets
     or other iterables that were provided to the constructor.
 
+    As well as scalar queries for a single pair of participants, there are
+    batched queries (the `*_matrix()` methods) that return a boolean NumPy
+    array for every pair drawn from two lists of participants. These read from
+    dense conflict matrices, indexed by compact adjudicator and team indices,
+    that are built once when the object is created.
+
     Although the attributes `self.adjteamconflicts`, `self.adjadjconflicts`,
     etc. aren't marked as such, they should be treated a private implementation
     detail that is subject to change. Callers should rely exclusively on
@@ -85,6 +150,45 @@ class ConflictsInfo:
         for conflict in adjinstconflict_instances:
             self.adjinstconflicts[conflict.adjudicator_id].add(conflict.institution)
 
+        self._build_conflict_matrices()
+
+    def _build_conflict_matrices(self):
+        """Builds dense boolean matrices of conflicts (personal or
+        institutional) between every adjudicator-team and adjudicator-
+        adjudicator pair, from the sets built by `_fetch_conflicts_from_db()`."""
+
+        self._adj_index = _build_index(self.adjudicator_ids)
+        self._team_index = _build_index(self.team_ids)
+
+        # Institutional conflicts are found by multiplying incidence matrices of
+        # adjudicators and teams against institutions: two participants
+        # conflict if they share at least one institution.
+        institution_ids = set()
+        for institutions in self.adjinstconflicts.values():
+            institution_ids.update(inst.id for inst in institutions)
+        for institutions in self.teaminstconflicts.values():
+            institution_ids.update(inst.id for inst in institutions)
+        inst_index = _build_index(institution_ids)
+
+        adjinsts = np.zeros((len(self._adj_index), len(inst_index)), dtype=np.int32)
+        for adj_id, institutions in self.adjinstconflicts.items():
+            for inst in institutions:
+                adjinsts[self._adj_index[adj_id], inst_index[inst.id]] = 1
+        teaminsts = np.zeros((len(self._team_index), len(inst_index)), dtype=np.int32)
+        for team_id, institutions in self.teaminstconflicts.items():
+            for inst in institutions:
+                teaminsts[self._team_index[team_id], inst_index[inst.id]] = 1
+
+        self._adjteam_matrix = _padded_matrix(len(self._adj_index), len(self._team_index))
+        self._adjteam_matrix[:-1, :-1] = (adjinsts @ teaminsts.T) > 0
+        for adj_id, team_id in self.adjteamconflicts:
+            self._adjteam_matrix[self._adj_index[adj_id], self._team_index[team_id]] = True
+
+        self._adjadj_matrix = _padded_matrix(len(self._adj_index), len(self._adj_index))
+        self._adjadj_matrix[:-1, :-1] = (adjinsts @ adjinsts.T) > 0
+        for adj1_id, adj2_id in self.adjadjconflicts:
+            self._adjadj_matrix[self._adj_index[adj1_id], self._adj_index[adj2_id]] = True
+
     def personal_conflict_adj_team(self, adj, team):
         """Returns True if the adjudicator and team personally conflict."""
         assert adj.id in self.adjudicator_ids, "adjudicator not covered"
@@ -115,13 +219,33 @@ class ConflictsInfo:
 
     def conflict_adj_team(self, adj, team):
         """Returns True if the adjudicator and team conflict."""
-        return (self.personal_conflict_adj_team(adj, team) or
-                self.institutional_conflict_adj_team(adj, team))
+        return bool(self._adjteam_matrix[self._adj_index[adj.id], self._team_index[team.id]])
 
     def conflict_adj_adj(self, adj1, adj2):
         """Returns True if the two adjudicators conflict."""
-        return (self.personal_conflict_adj_adj(adj1, adj2) or
-                self.institutional_conflict_adj_adj(adj1, adj2))
+        return bool(self._adjadj_matrix[self._adj_index[adj1.id], self._adj_index[adj2.id]])
+
+    def conflict_adj_team_matrix(self, adjs, teams):
+        """Returns a boolean NumPy array whose (i, j)th element is True if
+        `adjs[i]` and `teams[j]` conflict."""
+        self._check_covered(adjs, self._adj_index, "adjudicator")
+        self._check_covered(teams, self._team_index, "team")
+        rows = _lookup_indices(self._adj_index, adjs)
+        cols = _lookup_indices(self._team_index, teams)
+        return self._adjteam_matrix[np.ix_(rows, cols)]
+
+    def conflict_adj_adj_matrix(self, adjs1, adjs2):
+        """Returns a boolean NumPy array whose (i, j)th element is True if
+        `adjs1[i]` and `adjs2[j]` conflict."""
+        self._check_covered(adjs1, self._adj_index, "adjudicator")
+        self._check_covered(adjs2, self._adj_index, "adjudicator")
+        rows = _lookup_indices(self._adj_index, adjs1)
+        cols = _lookup_indices(self._adj_index, adjs2)
+        return self._adjadj_matrix[np.ix_(rows, cols)]
+
+    @staticmethod
+    def _check_covered(objs, index, name):
+        assert all(obj.id in index for obj in objs), "%s not covered" % name
 
     def serialized_by_participant(self):
         """Returns a tuple of two dicts, mapping primary keys of teams and
@@ -163,6 +287,11 @@ class HistoryInfo:
     efficiently whether particular participants have seen each other, without a
     need for further SQL queries or excessive data processing.
 
+    Like `ConflictsInfo`, this class also offers batched queries (the
+    `*_matrix()` methods), which read from dense boolean matrices built once
+    when the object is created. Participants who didn't appear in any prior
+    round are treated as having seen no one.
+
     Although the attributes `self.adjteamhistories` and  `self.adjadjhistories`
     aren't marked as such, they should be treated a private implementation
     detail that is subject to change. Callers should rely exclusively on
@@ -175,20 +304,31 @@ class HistoryInfo:
         self._fetch_histories_from_db()
 
     def _fetch_histories_from_db(self):
-        """Fetches history information from the database, based on `self.teams`
-        and `self.adjudicators`."""
-
-        # The prefetches don't need `.select_related('adjudicator')` and
-        # `.select_related('team')`, because we only deal with the primary keys
-        # of adjudicators and teams.
-
-        debates = Debate.objects.filter(
-            round__tournament=self.tournament,
-            round__seq__lt=self.round.seq,
-        ).prefetch_related(
-            'debateadjudicator_set',
-            'debateteam_set',
-        ).select_related('round')
+        """Fetches history information for all rounds prior to `self.round`.
+
+        The encounters in each round are read from its `RoundEncounters`, which
+        is updated whenever the round's draw or allocation is saved (see
+        `update_round_encounters()`), so this costs one query however many
+        rounds there are. Rounds that don't have one yet are fetched from the
+        database and stored."""
+
+        rounds = list(self.tournament.round_set.filter(seq__lt=self.round.seq).values_list('id', 'seq'))
+        round_ids = [round_id for round_id, seq in rounds]
+        encounters = {round_id: (adjteam_pairs, adjadj_pairs) for round_id, adjteam_pairs, adjadj_pairs in
+                RoundEncounters.objects.filter(round_id__in=round_ids).values_list(
+                'round_id', 'adjteam_pairs', 'adjadj_pairs')}
+
+        missing = [round_id for round_id in round_ids if round_id not in encounters]
+        if missing:
+            fetched = _fetch_round_encounters(missing)
+            encounters.update(fetched)
+            try:
+                with transaction.atomic():
+                    RoundEncounters.objects.bulk_create([RoundEncounters(round_id=round_id,
+                            adjteam_pairs=adjteam_pairs, adjadj_pairs=adjadj_pairs)
+                            for round_id, (adjteam_pairs, adjadj_pairs) in fetched.items()])
+            except IntegrityError:
+                pass  # another process stored them first; they'll be the same or newer
 
         # Histories are stored in a dict, where keys are (adj.id, team.id) or
         # (adj1.id, adj2.id) tuples, and values are lists of `seq` integers
@@ -205,16 +345,34 @@ class HistoryInfo:
         self.adjteamhistories = {}
         self.adjadjhistories = {}
 
-        for debate in debates:
-            r = debate.round.seq
+        for round_id, r in rounds:
+            adjteam_pairs, adjadj_pairs = encounters[round_id]
+            for adj_id, team_id in adjteam_pairs:
+                self.adjteamhistories.setdefault((adj_id, team_id), []).append(r)
+            for adj1_id, adj2_id in adjadj_pairs:
+                self.adjadjhistories.setdefault((adj1_id, adj2_id), []).append(r)
+                self.adjadjhistories.setdefault((adj2_id, adj1_id), []).append(r)
 
-            for da, dt in product(debate.debateadjudicator_set.all(), debate.debateteam_set.all()):
-                pair = (da.adjudicator_id, dt.team_id)
-                self.adjteamhistories.setdefault(pair, []).append(r)
+        self._build_history_matrices()
 
-            for da1, da2 in combinations(debate.debateadjudicator_set.all(), 2):
-                pair = (da1.adjudicator_id, da2.adjudicator_id)
-                self.adjadjhistories.setdefault(pair, []).append(r)
+    def _build_history_matrices(self):
+        """Builds dense boolean matrices of which adjudicator-team and
+        adjudicator-adjudicator pairs have seen each other, from the dicts built
+        by `_fetch_histories_from_db()`."""
+
+        adj_ids = {adj_id for adj_id, team_id in self.adjteamhistories}
+        adj_ids.update(adj_id for pair in self.adjadjhistories for adj_id in pair)
+        team_ids = {team_id for adj_id, team_id in self.adjteamhistories}
+        self._adj_index = _build_index(adj_ids)
+        self._team_index = _build_index(team_ids)
+
+        self._adjteam_matrix = _padded_matrix(len(self._adj_index), len(self._team_index))
+        for adj_id, team_id in self.adjteamhistories:
+            self._adjteam_matrix[self._adj_index[adj_id], self._team_index[team_id]] = True
+
+        self._adjadj_matrix = _padded_matrix(len(self._adj_index), len(self._adj_index))
+        for adj1_id, adj2_id in self.adjadjhistories:
+            self._adjadj_matrix[self._adj_index[adj1_id], self._adj_index[adj2_id]] = True
 
     def seen_adj_team(self, adj, team):
         """Returns True if the adjudicator has seen this team in the history
@@ -226,6 +384,20 @@ class HistoryInfo:
         covered by this object."""
         return (adj1.id, adj2.id) in self.adjadjhistories
 
+    def seen_adj_team_matrix(self, adjs, teams):
+        """Returns a boolean NumPy array whose (i, j)th element is True if
+        `adjs[i]` has seen `teams[j]`."""
+        rows = _lookup_indices(self._adj_index, adjs)
+        cols = _lookup_indices(self._team_index, teams)
+        return self._adjteam_matrix[np.ix_(rows, cols)]
+
+    def seen_adj_adj_matrix(self, adjs1, adjs2):
+        """Returns a boolean NumPy array whose (i, j)th element is True if
+        `adjs1[i]` and `adjs2[j]` have judged together."""
+        rows = _lookup_indices(self._adj_index, adjs1)
+        cols = _lookup_indices(self._adj_index, adjs2)
+        return self._adjadj_matrix[np.ix_(rows, cols)]
+
     def serialized_by_participant(self):
         """Returns a tuple of two dicts, mapping primary keys of teams and
         adjudicators respectively to a two-key dict
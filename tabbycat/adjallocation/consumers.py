@@ -0,0 +1,19 @@
+from channels.consumer import SyncConsumer
+
+from utils.consumers import TournamentConsumer, WSSuperUserRequiredMixin
+
+
+class AdjudicatorAllocationConsumer(TournamentConsumer, WSSuperUserRequiredMixin):
+    """Passes progress messages and results of background auto-allocations
+    on to the allocation editor."""
+
+    group_prefix = 'adjallocation'
+
+
+class AdjudicatorAllocationWorkerConsumer(SyncConsumer):
+    """Runs auto-allocation jobs sent to the "adjallocation" channel. Run with
+    `manage.py runworker adjallocation`."""
+
+    def allocate(self, event):
+        from .jobs import run_allocation_job
+        run_allocation_job(event['round'])
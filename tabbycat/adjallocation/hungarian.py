@@ -2,10 +2,11 @@ import logging
 import random
 from math import exp
 
-from munkres import Munkres
+import numpy as np
 
 from django.utils.translation import gettext as _
 
+from utils.assignment import get_solver
 from utils.views import BadJsonRequestError
 
 from .allocation import AdjudicatorAllocation
@@ -29,7 +30,7 @@ class BaseHungarianAllocator(Allocator):
         self.duplicate_allocations = t.pref('duplicate_adjs')
         self.feedback_weight = self.round.feedback_weight
 
-        self.munkres = Munkres()
+        self.solver = get_solver(t.pref('assignment_solver'))
 
     def allocate(self):
         self.populate_adj_scores(self.adjudicators)
@@ -51,6 +52,9 @@ class BaseHungarianAllocator(Allocator):
             logger.warning("%d normalised scores are smaller than 0.0", ntoosmall)
 
     def calc_cost(self, debate, adj, adjustment=0, chair=None):
+        """Returns the cost of allocating `adj` to `debate`. This is the scalar
+        reference for a single cell of the matrix returned by
+        `calc_cost_matrix()`; the allocators themselves use the latter."""
         cost = 0
 
         # Normalise debate importances back to the 1-5 (not ±2) range expected
@@ -72,21 +76,86 @@ class BaseHungarianAllocator(Allocator):
 
         return cost
 
+    def calc_cost_matrix(self, debates, adjs, adjustments=None, chairs=None):
+        """Returns a NumPy array whose (i, j)th element is the cost of
+        allocating `adjs[j]` to `debates[i]`, with adjustment `adjustments[i]`
+        and alongside chair `chairs[i]`, i.e. the same as
+
+            calc_cost(debates[i], adjs[j], adjustments[i], chairs[i])
+
+        `debates` may contain the same debate in several rows (e.g., once per
+        panel position); conflict and history penalties are computed once for
+        each distinct debate, and the rest of the matrix is built with array
+        operations rather than cell by cell."""
+
+        # Normalise debate importances back to the 1-5 (not ±2) range expected
+        importances = np.array([debate.importance + 3 for debate in debates], dtype=float)
+        if adjustments is not None:
+            importances += np.asarray(adjustments, dtype=float)
+        scores = np.array([adj._normalized_score for adj in adjs], dtype=float)
+
+        distinct = list(dict.fromkeys(debates))
+        row_index = {debate: i for i, debate in enumerate(distinct)}
+        rows = [row_index[debate] for debate in debates]
+        costs = self.calc_team_penalty_matrix(distinct, adjs)[rows]
+
+        if chairs is not None:
+            costs += self.calc_chair_penalty_matrix(chairs, adjs)
+
+        diff = 5 + importances[:, np.newaxis] - scores[np.newaxis, :]
+        excess = diff > 0.25
+        costs[excess] += 1000 * np.exp(diff[excess] - 0.25)
+
+        costs += self.max_score - scores
+        return costs
+
+    def calc_team_penalty_matrix(self, debates, adjs):
+        """Returns a NumPy array whose (i, j)th element is the total conflict
+        and history penalty between `adjs[j]` and the teams in `debates[i]`."""
+        sides = self.tournament.sides
+        teams = [debate.get_team(side) for debate in debates for side in sides]
+        shape = (len(adjs), len(debates), len(sides))
+
+        # Sum over sides to get the number of teams in each debate that each
+        # adjudicator conflicts with or has seen
+        conflicts = self.conflicts.conflict_adj_team_matrix(adjs, teams).reshape(shape).sum(axis=2)
+        histories = self.history.seen_adj_team_matrix(adjs, teams).reshape(shape).sum(axis=2)
+        return (self.conflict_penalty * conflicts + self.history_penalty * histories).T.astype(float)
+
+    def calc_chair_penalty_matrix(self, chairs, adjs):
+        """Returns a NumPy array whose (i, j)th element is the conflict and
+        history penalty between `adjs[j]` and `chairs[i]`. Rows where the chair
+        is None are all zero."""
+        penalties = np.zeros((len(chairs), len(adjs)))
+        rows = [i for i, chair in enumerate(chairs) if chair]
+        if rows:
+            present = [chairs[i] for i in rows]
+            penalties[rows] += self.conflict_penalty * self.conflicts.conflict_adj_adj_matrix(present, adjs)
+            penalties[rows] += self.history_penalty * self.history.seen_adj_adj_matrix(present, adjs)
+        return penalties
+
+    def solve(self, cost_matrix):
+        """Solves the assignment problem for the given cost matrix (a NumPy
+        array), returning a list of (row, column) index pairs and the total
+        cost of the assignment."""
+        indexes = self.solver.solve(cost_matrix)
+        total_cost = sum(cost_matrix[i, j] for i, j in indexes)
+        return indexes, total_cost
+
     def allocate_trainees(self, trainees, allocation, debates):
         if len(trainees) > 0 and len(debates) > 0:
             allocation_by_debate = {aa.debate: aa for aa in allocation}
 
             logger.info("costing trainees")
-            cost_matrix = []
-            for debate in debates:
-                chair = allocation_by_debate[debate].chair
-                row = [self.calc_cost(debate, adj, adjustment=-2.0, chair=chair) for adj in trainees]
-                cost_matrix.append(row)
-
-            logger.info("optimizing trainees (matrix size: %d positions by %d trainees)", len(cost_matrix), len(cost_matrix[0]))
-            indexes = self.munkres.compute(cost_matrix)
-            total_cost = sum(cost_matrix[i][j] for i, j in indexes)
+            self.report_progress(_("Costing trainees"))
+            chairs = [allocation_by_debate[debate].chair for debate in debates]
+            cost_matrix = self.calc_cost_matrix(debates, trainees, [-2.0] * len(debates), chairs)
+
+            logger.info("optimizing trainees (matrix size: %d positions by %d trainees)", *cost_matrix.shape)
+            self.report_progress(_("Optimizing trainees"))
+            indexes, total_cost = self.solve(cost_matrix)
             logger.info('total cost for %d trainees: %f', len(indexes), total_cost)
+            self.report_progress(_("Allocated trainees"), total_cost)
 
             result = ((debates[i], trainees[j]) for i, j in indexes if i < len(debates))
             for debate, trainee in result:
@@ -157,15 +226,14 @@ class VotingHungarianAllocator(BaseHungarianAllocator):
 
         if len(solos) > 0 and len(solo_debates) > 0:
             logger.info("costing solos")
-            cost_matrix = []
-            for debate in solo_debates:
-                row = [self.calc_cost(debate, adj) for adj in solos]
-                cost_matrix.append(row)
-
-            logger.info("optimizing solos (matrix size: %d positions by %d adjudicators)", len(cost_matrix), len(cost_matrix[0]))
-            indexes = self.munkres.compute(cost_matrix)
-            total_cost = sum(cost_matrix[i][j] for i, j in indexes)
+            self.report_progress(_("Costing solos"))
+            cost_matrix = self.calc_cost_matrix(solo_debates, solos)
+
+            logger.info("optimizing solos (matrix size: %d positions by %d adjudicators)", *cost_matrix.shape)
+            self.report_progress(_("Optimizing solos"))
+            indexes, total_cost = self.solve(cost_matrix)
             logger.info('total cost for %d solo debates: %f', len(solos), total_cost)
+            self.report_progress(_("Allocated solos"), total_cost)
 
             result = ((solo_debates[i], solos[j]) for i, j in indexes if i < len(solo_debates))
             alloc = [AdjudicatorAllocation(d, c) for d, c in result]
@@ -179,19 +247,22 @@ class VotingHungarianAllocator(BaseHungarianAllocator):
         # Allocate panellists
         if len(panellists) > 0 and len(panel_debates) > 0:
             logger.info("costing panellists")
-            cost_matrix = []
+            self.report_progress(_("Costing panellists"))
+            rows = []
+            adjustments = []
             for i, debate in enumerate(panel_debates):
                 for j in range(3):
                     # for the top half of these debates, the final panellist
                     # can be of lower quality than the other 2
-                    adjustment = -1.0 if i < len(panel_debates)/2 and j == 2 else 0.0
-                    row = [self.calc_cost(debate, adj, adjustment) for adj in panellists]
-                    cost_matrix.append(row)
+                    rows.append(debate)
+                    adjustments.append(-1.0 if i < len(panel_debates)/2 and j == 2 else 0.0)
+            cost_matrix = self.calc_cost_matrix(rows, panellists, adjustments)
 
-            logger.info("optimizing panellists (matrix size: %d positions by %d adjudicators)", len(cost_matrix), len(cost_matrix[0]))
-            indexes = self.munkres.compute(cost_matrix)
-            total_cost = sum(cost_matrix[i][j] for i, j in indexes)
+            logger.info("optimizing panellists (matrix size: %d positions by %d adjudicators)", *cost_matrix.shape)
+            self.report_progress(_("Optimizing panellists"))
+            indexes, total_cost = self.solve(cost_matrix)
             logger.info('total cost for %d panel debates: %f', len(panel_debates), total_cost)
+            self.report_progress(_("Allocated panellists"), total_cost)
 
             # transfer the indices to the debates
             # the debate corresponding to row r is floor(r/3) (i.e. r // 3)
@@ -257,18 +328,22 @@ class ConsensusHungarianAllocator(BaseHungarianAllocator):
 
         # Allocate voting
         logger.info("costing voting adjudicators")
-        cost_matrix = []
+        self.report_progress(_("Costing voting adjudicators"))
+        rows = []
+        adjustments = []
         for debate, njudges in zip(debates_sorted, judges_per_room):
             for i in range(njudges):
-                row = [self.calc_cost(debate, adj, adjustment=-i) for adj in voting]
-                cost_matrix.append(row)
+                rows.append(debate)
+                adjustments.append(-i)
+        cost_matrix = self.calc_cost_matrix(rows, voting, adjustments)
 
         logger.info("optimizing voting adjudicators (matrix size: %d positions by %d adjudicators)",
-                len(cost_matrix), len(cost_matrix[0]))
-        indexes = self.munkres.compute(cost_matrix)
+                *cost_matrix.shape)
+        self.report_progress(_("Optimizing voting adjudicators"))
+        indexes, total_cost = self.solve(cost_matrix)
         indexes.sort()
-        total_cost = sum(cost_matrix[i][j] for i, j in indexes)
         logger.info('total cost for %d debates: %f', n_debates, total_cost)
+        self.report_progress(_("Allocated voting adjudicators"), total_cost)
 
         # transfer the indices to the debates
         alloc = []
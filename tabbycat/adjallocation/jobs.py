@@ -0,0 +1,89 @@
+"""Runs auto-allocations in the background, so that large allocations don't
+time out the HTTP request that starts them.
+
+Jobs are sent to the "adjallocation" channel, which is handled by
+`AdjudicatorAllocationWorkerConsumer` in a worker process started with
+`manage.py runworker adjallocation` (see `utils.jobs`). Progress messages and
+the final allocation are broadcast to `AdjudicatorAllocationConsumer`, which
+passes them on to the allocation editor."""
+
+import logging
+
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+
+from tournaments.models import Round
+from utils.jobs import broadcast, dispatch_job
+from utils.views import BadJsonRequestError
+
+from .allocator import allocate_adjudicators, get_allocator_class
+from .consumers import AdjudicatorAllocationConsumer
+from .utils import AllocationEditorData
+
+logger = logging.getLogger(__name__)
+
+ALLOCATION_CHANNEL = "adjallocation"
+
+# Jobs that haven't finished after this long (e.g. because the worker died) no
+# longer stop new jobs from being started for the round
+ALLOCATION_JOB_TIMEOUT = 30 * 60
+
+
+def allocation_job_cache_key(round_id):
+    return "%s_%s_%s" % ('roundid', round_id, '_allocation_job')
+
+
+def start_allocation_job(round):
+    """Queues an auto-allocation job for the round. Returns False, without
+    queueing anything, if there's already a job running for the round."""
+    if not cache.add(allocation_job_cache_key(round.id), True, ALLOCATION_JOB_TIMEOUT):
+        return False
+
+    logger.info("Starting auto-allocation for %s", round)
+    dispatch_job(ALLOCATION_CHANNEL, {"type": "allocate", "round": round.id},
+            run_allocation_job, round.id)
+    return True
+
+
+def broadcast_allocation_update(round, data):
+    group_name = AdjudicatorAllocationConsumer.group_prefix + "_" + round.tournament.slug
+    data['round'] = round.seq
+    broadcast(group_name, data)
+
+
+def run_allocation_job(round_id):
+    """Runs and saves the auto-allocation for the round, broadcasting progress
+    messages while it runs, then either the new allocation or an error."""
+    round = Round.objects.select_related('tournament').get(pk=round_id)
+
+    def progress(message, cost=None):
+        broadcast_allocation_update(round, {'status': 'progress', 'message': str(message), 'cost': cost})
+
+    try:
+        allocator = allocate_adjudicators(round, get_allocator_class(round), progress=progress)
+        progress(_("Saved allocation"))
+        broadcast_allocation_update(round, get_allocation_result(round, allocator))
+
+    except BadJsonRequestError as e:
+        broadcast_allocation_update(round, {'status': 'error', 'message': str(e)})
+
+    except Exception:
+        logger.exception("Error running auto-allocation for %s", round)
+        broadcast_allocation_update(round, {'status': 'error', 'message': _(
+            "There was an unexpected error while allocating adjudicators. "
+            "Check the server logs for details.")})
+
+    finally:
+        cache.delete(allocation_job_cache_key(round_id))
+
+
+def get_allocation_result(round, allocator):
+    """Returns the data sent to the allocation editor once the allocation is
+    saved, in the same form as the view that renders the editor."""
+    data = AllocationEditorData(round)
+    return {
+        'status': 'done',
+        'debates': data.get_draw(),
+        'unallocatedAdjudicators': data.get_unallocated_adjudicators(),
+        'annealing': getattr(allocator, 'anneal_stats', None),
+    }
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.8 on 2018-10-21 09:26
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0005_remove_tournament_current_round'),
+        ('adjallocation', '0006_auto_20180919_2143'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoundEncounters',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('adjteam_pairs', django.contrib.postgres.fields.jsonb.JSONField(help_text='List of [adjudicator ID, team ID] pairs', verbose_name='adjudicator-team pairs')),
+                ('adjadj_pairs', django.contrib.postgres.fields.jsonb.JSONField(help_text='List of [adjudicator ID, adjudicator ID] pairs', verbose_name='adjudicator-adjudicator pairs')),
+                ('round', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='tournaments.Round', verbose_name='round')),
+            ],
+            options={
+                'verbose_name': 'round encounters',
+                'verbose_name_plural': 'round encounters',
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -99,3 +100,29 @@ class TeamInstitutionConflict(models.Model):
 
     def __str__(self):
         return '{} with {}'.format(self.team, self.institution)
+
+
+class RoundEncounters(models.Model):
+    """Stores which adjudicators saw which teams, and which adjudicators judged
+    together, in a round, so that `HistoryInfo` doesn't have to read every past
+    round's allocation again for each new allocation.
+
+    These are written by `adjallocation.conflicts.update_round_encounters()`
+    whenever a round's draw or allocation is saved, and for rounds that don't
+    have them yet, by `HistoryInfo` itself."""
+
+    round = models.OneToOneField('tournaments.Round', models.CASCADE,
+        verbose_name=_("round"))
+    adjteam_pairs = JSONField(
+        verbose_name=_("adjudicator-team pairs"),
+        help_text=_("List of [adjudicator ID, team ID] pairs"))
+    adjadj_pairs = JSONField(
+        verbose_name=_("adjudicator-adjudicator pairs"),
+        help_text=_("List of [adjudicator ID, adjudicator ID] pairs"))
+
+    class Meta:
+        verbose_name = _("round encounters")
+        verbose_name_plural = _("round encounters")
+
+    def __str__(self):
+        return str(self.round)
@@ -0,0 +1,79 @@
+import random
+import unittest
+
+from django.test import TestCase
+
+from adjallocation.anneal import VotingAnnealingAllocator
+from adjallocation.annealer import Annealer
+from utils.tests import CompletedTournamentTestMixin
+
+
+class TestAnnealer(unittest.TestCase):
+    """Runs the annealer on random penalty tables."""
+
+    ndebates = 20
+    panel_size = 3
+
+    def setUp(self):
+        rng = random.Random(5)
+        nadjs = self.ndebates * self.panel_size
+        self.adjteam_penalties = [[rng.choice([0, 0, 0, 100, 1e6]) for a in range(nadjs)] for d in range(self.ndebates)]
+        self.adjadj_penalties = [[0] * nadjs for a in range(nadjs)]
+        for a in range(nadjs):
+            for b in range(a):
+                self.adjadj_penalties[a][b] = self.adjadj_penalties[b][a] = rng.choice([0, 0, 0, 0, 100, 1e6])
+        self.scores = sorted((rng.random() for a in range(nadjs)), reverse=True)
+        self.initial_panels = [list(range(d * self.panel_size, (d + 1) * self.panel_size)) for d in range(self.ndebates)]
+
+    def get_annealer(self, seed=1):
+        return Annealer(self.adjteam_penalties, self.adjadj_penalties, self.scores, self.initial_panels, seed=seed)
+
+    def test_valid_and_no_worse(self):
+        annealer = self.get_annealer()
+        initial = annealer.initial_state()
+        best = annealer.anneal(annealer.initial_state(), 0.5)
+
+        self.assertEqual(sorted(a for panel in best.panels for a in panel),
+                         sorted(a for panel in initial.panels for a in panel))
+        self.assertEqual([len(panel) for panel in best.panels], [len(panel) for panel in initial.panels])
+        self.assertLessEqual(best.energy, initial.energy)
+        self.assertLess(best.energy, initial.energy)  # these tables have plenty to improve
+
+    def test_energies_consistent(self):
+        annealer = self.get_annealer()
+        best = annealer.anneal(annealer.initial_state(), 0.2)
+        for d, panel in enumerate(best.panels):
+            self.assertAlmostEqual(best.energies[d], annealer.score(d, panel))
+        self.assertAlmostEqual(best.energy, sum(best.energies))
+        self.assertEqual(annealer.stats['final_energy'], best.energy)
+
+
+class TestAnnealingAllocator(CompletedTournamentTestMixin, TestCase):
+
+    def test_allocation(self):
+        round = self.tournament.round_set.get(seq=4)
+        debates = list(round.debate_set.all())
+        adjs = list(self.tournament.adjudicator_set.all())
+        allocator = VotingAnnealingAllocator(debates, adjs, round, time_limit=0.5, chains=1, seed=1)
+        allocation = allocator.allocate()
+
+        self.assertEqual(sorted(aa.debate.id for aa in allocation), sorted(debate.id for debate in debates))
+        allocated = [adj for aa in allocation for adj in aa.all()]
+        self.assertEqual(len(allocated), len(set(allocated)))
+        for aa in allocation:
+            if aa.num_voting > 0:
+                self.assertTrue(aa.has_chair)
+
+        stats = allocator.anneal_stats['chains'][0]
+        self.assertLessEqual(stats['final_energy'], stats['initial_energy'])
+
+    def test_parallel_chains(self):
+        round = self.tournament.round_set.get(seq=4)
+        allocator = VotingAnnealingAllocator(round.debate_set.all(), list(self.tournament.adjudicator_set.all()),
+                round, time_limit=0.3, chains=2, seed=1)
+        allocator.allocate()
+
+        chains = allocator.anneal_stats['chains']
+        self.assertEqual([stats['seed'] for stats in chains], [1, 2])
+        energies = [stats['final_energy'] for stats in chains]
+        self.assertEqual(energies[allocator.anneal_stats['best']], min(energies))
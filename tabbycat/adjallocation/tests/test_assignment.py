@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from utils.assignment import (AssignmentInfeasibleError, DEFAULT_SOLVER, DISALLOWED,
+    get_solver, LAPJVSolver, SOLVER_CLASSES)
+
+
+class TestAssignmentSolvers(unittest.TestCase):
+
+    def setUp(self):
+        self.solvers = [cls() for cls in SOLVER_CLASSES if cls.is_available()]
+        self.rng = np.random.RandomState(2)
+
+    def assertValidAssignment(self, indices, costs):  # noqa: N802
+        rows, cols = zip(*indices) if indices else ((), ())
+        self.assertEqual(len(indices), min(costs.shape))
+        self.assertEqual(len(set(rows)), len(rows))
+        self.assertEqual(len(set(cols)), len(cols))
+        self.assertEqual(list(indices), sorted(indices))
+
+    def assertSolversAgree(self, costs):  # noqa: N802
+        totals = []
+        for solver in self.solvers:
+            with self.subTest(solver=solver.name, shape=costs.shape):
+                indices = solver.solve(costs)
+                self.assertValidAssignment(indices, costs)
+                totals.append(sum(costs[i, j] for i, j in indices))
+        self.assertTrue(np.allclose(totals, totals[0]), totals)
+        self.assertTrue(np.isfinite(totals[0]))
+
+    def test_square(self):
+        for size in [1, 5, 20]:
+            self.assertSolversAgree(self.rng.rand(size, size) * 100)
+
+    def test_rectangular(self):
+        for shape in [(5, 8), (8, 5), (12, 30), (30, 12)]:
+            self.assertSolversAgree(self.rng.rand(*shape) * 100)
+
+    def test_negative_and_integer_costs(self):
+        self.assertSolversAgree(self.rng.randint(-50, 50, size=(10, 10)))
+
+    def test_disallowed_avoided(self):
+        for shape in [(10, 10), (6, 10), (10, 6)]:
+            costs = self.rng.rand(*shape) * 100
+            # disallow most pairs, but leave the diagonal so that it's feasible
+            mask = self.rng.rand(*shape) < 0.6
+            for k in range(min(shape)):
+                mask[k, k] = False
+            costs[mask] = DISALLOWED
+            self.assertSolversAgree(costs)
+
+    def test_infeasible(self):
+        costs = self.rng.rand(3, 3)
+        costs[:, 2] = DISALLOWED  # three rows competing for two columns
+        for solver in self.solvers:
+            with self.subTest(solver=solver.name):
+                with self.assertRaises(AssignmentInfeasibleError):
+                    solver.solve(costs)
+
+    def test_empty(self):
+        for solver in self.solvers:
+            self.assertEqual(solver.solve(np.zeros((0, 0))), [])
+
+
+class TestGetSolver(unittest.TestCase):
+
+    def test_get_solver(self):
+        for cls in SOLVER_CLASSES:
+            if cls.is_available():
+                self.assertIsInstance(get_solver(cls.name), cls)
+
+    def test_unavailable_falls_back(self):
+        with mock.patch.object(LAPJVSolver, 'is_available', return_value=False), \
+                self.assertLogs('utils.assignment', 'WARNING'):
+            self.assertEqual(get_solver(LAPJVSolver.name).name, DEFAULT_SOLVER)
+
+    def test_unknown_solver(self):
+        with self.assertRaises(ValueError):
+            get_solver("nonexistent")
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from adjallocation.conflicts import HistoryInfo, update_round_encounters
+from adjallocation.models import DebateAdjudicator, RoundEncounters
+from participants.models import Adjudicator
+from utils.tests import CompletedTournamentTestMixin
+
+
+class TestHistoryInfo(CompletedTournamentTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.round = self.tournament.round_set.get(seq=4)
+        self.adjs = list(self.tournament.adjudicator_set.order_by('id'))
+        self.teams = list(self.tournament.team_set.order_by('id'))
+
+    def test_seen_adj_adj_matches_matrix(self):
+        history = HistoryInfo(self.round)
+        matrix = history.seen_adj_adj_matrix(self.adjs, self.adjs)
+        self.assertTrue(matrix.any())
+        for i, adj1 in enumerate(self.adjs):
+            for j, adj2 in enumerate(self.adjs):
+                self.assertEqual(history.seen_adj_adj(adj1, adj2), matrix[i, j])
+                self.assertEqual(history.seen_adj_adj(adj1, adj2), history.seen_adj_adj(adj2, adj1))
+
+    def test_seen_adj_team_matches_matrix(self):
+        history = HistoryInfo(self.round)
+        matrix = history.seen_adj_team_matrix(self.adjs, self.teams)
+        self.assertTrue(matrix.any())
+        for i, adj in enumerate(self.adjs):
+            for j, team in enumerate(self.teams):
+                self.assertEqual(history.seen_adj_team(adj, team), matrix[i, j])
+
+    def test_encounters_stored(self):
+        HistoryInfo(self.round)
+        self.assertEqual(RoundEncounters.objects.filter(round__tournament=self.tournament).count(), 3)
+        with self.assertNumQueries(2):
+            HistoryInfo(self.round)
+
+    def test_edited_allocation_in_history(self):
+        HistoryInfo(self.round)  # stores the encounters in earlier rounds
+
+        debate = self.tournament.round_set.get(seq=1).debate_set.first()
+        chair = debate.debateadjudicator_set.get(type=DebateAdjudicator.TYPE_CHAIR).adjudicator
+        team = debate.debateteam_set.first().team
+        adj = Adjudicator.objects.create(tournament=self.tournament, name="New Adjudicator")
+        DebateAdjudicator.objects.create(debate=debate, adjudicator=adj, type=DebateAdjudicator.TYPE_PANEL)
+        update_round_encounters(debate.round)
+
+        history = HistoryInfo(self.round)
+        self.assertTrue(history.seen_adj_team(adj, team))
+        self.assertTrue(history.seen_adj_adj(adj, chair))
+        self.assertTrue(history.seen_adj_adj(chair, adj))
@@ -1,11 +1,15 @@
+import json
 import math
 from itertools import combinations, product
 
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
 from participants.models import Adjudicator, Team
+from participants.prefetch import populate_feedback_scores
+from tournaments.mixins import DragAndDropDrawSerializationMixin
 
-from .conflicts import ConflictsInfo
+from .conflicts import ConflictsInfo, HistoryInfo
 
 
 def adjudicator_conflicts_display(debates):
@@ -80,3 +84,68 @@ def percentile(n, percent, key=lambda x:x):
     d0 = key(n[int(f)]) * (c-k)
     d1 = key(n[int(c)]) * (k-f)
     return d0+d1
+
+
+class AdjudicatorAllocationSerializationMixin(DragAndDropDrawSerializationMixin):
+    """Adds conflicts and histories to the serialized draw and unallocated
+    adjudicators for the allocation editor."""
+
+    @cached_property
+    def conflicts_and_history(self):
+        conflicts = ConflictsInfo(teams=self.tournament.team_set.all(),
+            adjudicators=self.tournament.adjudicator_set.all())
+        team_conflicts, adj_conflicts = conflicts.serialized_by_participant()
+        history = HistoryInfo(self.round)
+        team_history, adj_history = history.serialized_by_participant()
+
+        teams_combined = {}
+        for team_id, conflicts in team_conflicts.items():
+            teams_combined[team_id] = {'clashes': conflicts}
+        for team_id, history in team_history.items():
+            teams_combined.setdefault(team_id, {})['histories'] = history
+
+        adjs_combined = {}
+        for adj_id, conflicts in adj_conflicts.items():
+            adjs_combined[adj_id] = {'clashes': conflicts}
+        for adj_id, history in adj_history.items():
+            adjs_combined.setdefault(adj_id, {})['histories'] = history
+
+        return teams_combined, adjs_combined
+
+    def get_unallocated_adjudicators(self):
+        round = self.round
+        unused_adj_instances = round.unused_adjudicators().select_related('institution__region')
+        populate_feedback_scores(unused_adj_instances)
+        unused_adjs = [a.serialize(round) for a in unused_adj_instances]
+
+        _, adj_conflicts = self.conflicts_and_history
+        for adj in unused_adjs:
+            self.annotate_region_classes(adj)
+            adj['conflicts'] = adj_conflicts[adj['id']]
+
+        return json.dumps(unused_adjs)
+
+    def annotate_draw(self, draw, serialised_draw):
+        # Need to unique-ify/reorder break categories/regions for consistent CSS
+
+        team_conflicts, adj_conflicts = self.conflicts_and_history
+
+        for debate in serialised_draw:
+            for da in debate['debateAdjudicators']:
+                da['adjudicator']['conflicts'] = adj_conflicts[da['adjudicator']['id']]
+                self.annotate_region_classes(da['adjudicator'])
+            for dt in debate['debateTeams']:
+                if not dt['team']:
+                    continue
+                dt['team']['conflicts'] = team_conflicts[dt['team']['id']]
+
+        return super().annotate_draw(draw, serialised_draw)
+
+
+class AllocationEditorData(AdjudicatorAllocationSerializationMixin):
+    """The data that the allocation editor shows for `round`, for use outside
+    views, e.g. by `adjallocation.jobs` once an auto-allocation is saved."""
+
+    def __init__(self, round):
+        self.round = round
+        self.tournament = round.tournament
@@ -6,7 +6,6 @@ from django.db.models import Q
 from django.forms import ModelChoiceField
 from django.views.generic.base import TemplateView, View
 from django.http import JsonResponse
-from django.utils.functional import cached_property
 from django.utils.translation import gettext as _, gettext_lazy, ngettext
 
 from actionlog.mixins import LogActionMixin
@@ -14,7 +13,6 @@ from actionlog.models import ActionLogEntry
 from breakqual.models import BreakCategory
 from draw.models import Debate
 from participants.models import Adjudicator, Region
-from participants.prefetch import populate_feedback_scores
 from tournaments.models import Round
 from tournaments.mixins import DrawForDragAndDropMixin, RoundMixin, TournamentMixin
 from tournaments.views import BaseSaveDragAndDropDebateJsonView
@@ -22,9 +20,9 @@ from utils.misc import redirect_tournament, reverse_tournament
 from utils.mixins import AdministratorMixin
 from utils.views import BadJsonRequestError, JsonDataResponsePostView, ModelFormSetView
 
-from .allocator import allocate_adjudicators
-from .conflicts import ConflictsInfo, HistoryInfo
-from .hungarian import ConsensusHungarianAllocator, VotingHungarianAllocator
+from .conflicts import update_round_encounters
+from .jobs import start_allocation_job
+from .utils import AdjudicatorAllocationSerializationMixin
 from .models import (AdjudicatorAdjudicatorConflict, AdjudicatorInstitutionConflict,
                      AdjudicatorTeamConflict, DebateAdjudicator, TeamInstitutionConflict)
 
@@ -33,58 +31,8 @@ from utils.misc import reverse_round
 logger = logging.getLogger(__name__)
 
 
-class AdjudicatorAllocationMixin(DrawForDragAndDropMixin, AdministratorMixin):
-
-    @cached_property
-    def conflicts_and_history(self):
-        conflicts = ConflictsInfo(teams=self.tournament.team_set.all(),
-            adjudicators=self.tournament.adjudicator_set.all())
-        team_conflicts, adj_conflicts = conflicts.serialized_by_participant()
-        history = HistoryInfo(self.round)
-        team_history, adj_history = history.serialized_by_participant()
-
-        teams_combined = {}
-        for team_id, conflicts in team_conflicts.items():
-            teams_combined[team_id] = {'clashes': conflicts}
-        for team_id, history in team_history.items():
-            teams_combined.setdefault(team_id, {})['histories'] = history
-
-        adjs_combined = {}
-        for adj_id, conflicts in adj_conflicts.items():
-            adjs_combined[adj_id] = {'clashes': conflicts}
-        for adj_id, history in adj_history.items():
-            adjs_combined.setdefault(adj_id, {})['histories'] = history
-
-        return teams_combined, adjs_combined
-
-    def get_unallocated_adjudicators(self):
-        round = self.round
-        unused_adj_instances = round.unused_adjudicators().select_related('institution__region')
-        populate_feedback_scores(unused_adj_instances)
-        unused_adjs = [a.serialize(round) for a in unused_adj_instances]
-
-        _, adj_conflicts = self.conflicts_and_history
-        for adj in unused_adjs:
-            self.annotate_region_classes(adj)
-            adj['conflicts'] = adj_conflicts[adj['id']]
-
-        return json.dumps(unused_adjs)
-
-    def annotate_draw(self, draw, serialised_draw):
-        # Need to unique-ify/reorder break categories/regions for consistent CSS
-
-        team_conflicts, adj_conflicts = self.conflicts_and_history
-
-        for debate in serialised_draw:
-            for da in debate['debateAdjudicators']:
-                da['adjudicator']['conflicts'] = adj_conflicts[da['adjudicator']['id']]
-                self.annotate_region_classes(da['adjudicator'])
-            for dt in debate['debateTeams']:
-                if not dt['team']:
-                    continue
-                dt['team']['conflicts'] = team_conflicts[dt['team']['id']]
-
-        return super().annotate_draw(draw, serialised_draw)
+class AdjudicatorAllocationMixin(AdjudicatorAllocationSerializationMixin, DrawForDragAndDropMixin, AdministratorMixin):
+    pass
 
 
 class EditAdjudicatorAllocationView(AdjudicatorAllocationMixin, TemplateView):
@@ -111,6 +59,7 @@ class EditAdjudicatorAllocationView(AdjudicatorAllocationMixin, TemplateView):
     def get_round_info(self):
         round_info = super().get_round_info()
         round_info['updateImportanceURL'] = reverse_round('adjallocation-save-debate-importance', self.round)
+        round_info['tournamentSlug'] = self.tournament.slug
         round_info['scoreMin'] = self.tournament.pref('adj_min_score')
         round_info['scoreMax'] = self.tournament.pref('adj_max_score')
         round_info['scoreForVote'] = self.tournament.pref('adj_min_voting_score')
@@ -145,16 +94,13 @@ class CreateAutoAllocation(LogActionMixin, AdjudicatorAllocationMixin, JsonDataR
             logger.warning(info)
             raise BadJsonRequestError(info)
 
-        if round.ballots_per_debate == 'per-adj':
-            allocator_class = VotingHungarianAllocator
-        else:
-            allocator_class = ConsensusHungarianAllocator
+        if not start_allocation_job(round):
+            info = _("An auto-allocation is already running for this round.")
+            logger.warning(info)
+            raise BadJsonRequestError(info)
 
-        allocate_adjudicators(self.round, allocator_class)
-        return {
-            'debates': self.get_draw(),
-            'unallocatedAdjudicators': self.get_unallocated_adjudicators()
-        }
+        # The allocation itself is sent to the editor by AdjudicatorAllocationConsumer
+        return {'queued': True}
 
 
 class SaveDebateImportance(AdministratorMixin, RoundMixin, LogActionMixin, View):
@@ -201,6 +147,7 @@ class SaveDebatePanel(BaseSaveDragAndDropDebateJsonView):
             logger.debug("%s debate adjudicator: %s is now %s in [%s]", "Created" if created else "Updated",
                     adj_name_lookup[adj_id], obj.get_type_display(), debate.matchup)
 
+        update_round_encounters(self.round)
         return debate
 
 
@@ -46,6 +46,7 @@ class BaseFeedbackOverview(TournamentMixin, VueTableTemplateView):
                 self._adjudicators = Adjudicator.objects.filter(Q(tournament=t) | Q(tournament__isnull=True))
             else:
                 self._adjudicators = Adjudicator.objects.filter(tournament=t)
+            self._adjudicators = self._adjudicators.select_related('institution')
             populate_feedback_scores(self._adjudicators)
         return self._adjudicators
 
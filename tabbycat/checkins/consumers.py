@@ -1,4 +1,4 @@
-from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
 
@@ -12,14 +12,14 @@ class CheckInEventConsumer(TournamentConsumer, WSPublicAccessMixin):
 
     group_prefix = 'checkins'
 
-    def receive_json(self, content):
+    async def receive_json(self, content):
         # Because the public can receive but not send checkins we need to
         # re-authenticate here:
-        if not self.scope["user"].is_authenticated:
+        if not await database_sync_to_async(lambda: self.scope["user"].is_authenticated)():
             return
 
         # Send message to room group about the new checkin
-        async_to_sync(self.channel_layer.group_send)(
+        await self.channel_layer.group_send(
             self.group_name(), {
                 'type': 'broadcast_checkin',
                 'content': content
@@ -27,9 +27,18 @@ class CheckInEventConsumer(TournamentConsumer, WSPublicAccessMixin):
         )
 
     # Issue the relevant checkins
-    def broadcast_checkin(self, event):
+    async def broadcast_checkin(self, event):
         content = event['content']
-        tournament = self.tournament()
+        tournament = await self.tournament()
+        return_content, error = await database_sync_to_async(self.save_checkins)(tournament, content)
+        if error:
+            await self.send_error(_("Checkins"), error, content)
+            return
+        await self.send_json(return_content)
+
+    def save_checkins(self, tournament, content):
+        """Creates or revokes the check-ins in `content`. Returns a tuple of
+        the content to send back and an error message (or None)."""
         barcode_ids = [b for b in content['barcodes'] if b is not None]
         return_content = {'created': content['status'], 'checkins': [],
                           'component_id': content['component_id']}
@@ -57,13 +66,9 @@ class CheckInEventConsumer(TournamentConsumer, WSPublicAccessMixin):
                 # Only raise an error for single check-ins as for multi-check-in
                 # events via the status page its clear what has failed or not
                 if len(barcode_ids) == 1:
-                    msg = _("Sent checkin identifier doesn't exist")
-                    self.send_error(_("Checkins"), msg, content)
-                    return
+                    return None, _("Sent checkin identifier doesn't exist")
 
         if len(return_content['checkins']) == 0 and content['status'] is not False:
-            msg = _("No checkin identifiers exist for sent barcodes")
-            self.send_error(_("Checkins"), msg, content)
-            return
+            return None, _("No checkin identifiers exist for sent barcodes")
 
-        self.send_json(return_content)
+        return return_content, None
@@ -0,0 +1,53 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase
+
+from tournaments.models import Tournament
+from utils.consumers import forget_tournament
+
+from ..consumers import CheckInEventConsumer
+
+
+def consumer_application(slug):
+    def application(scope):
+        scope = dict(scope, user=AnonymousUser(), url_route={"args": (), "kwargs": {"tournament_slug": slug}})
+        return CheckInEventConsumer(scope)
+    return application
+
+
+# The consumers look up the tournament in another thread, so the tournament
+# needs to be committed, hence TransactionTestCase.
+class TestCheckInEventConsumer(TransactionTestCase):
+
+    def setUp(self):
+        self.tournament = Tournament.objects.create(slug="consumertest", name="Consumer test")
+
+    def tearDown(self):
+        forget_tournament("consumertest")
+
+    @async_to_sync
+    async def test_receives_broadcasts(self):
+        communicator = WebsocketCommunicator(consumer_application("consumertest"), "/ws/consumertest/checkins/")
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+
+        await get_channel_layer().group_send("checkins_consumertest", {"type": "send_json", "data": "test"})
+        self.assertEqual(await communicator.receive_json_from(), {"type": "send_json", "data": "test"})
+        await communicator.disconnect()
+
+    @async_to_sync
+    async def test_nonexistent_tournament_rejected(self):
+        communicator = WebsocketCommunicator(consumer_application("nonexistent"), "/ws/nonexistent/checkins/")
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+
+    @async_to_sync
+    async def test_public_cannot_check_in(self):
+        communicator = WebsocketCommunicator(consumer_application("consumertest"), "/ws/consumertest/checkins/")
+        await communicator.connect()
+        await communicator.send_json_to({'barcodes': ['1234'], 'status': True, 'type': 'people',
+                                         'component_id': 1})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
@@ -0,0 +1,19 @@
+from channels.consumer import SyncConsumer
+
+from utils.consumers import TournamentConsumer, WSSuperUserRequiredMixin
+
+
+class DrawGenerationConsumer(TournamentConsumer, WSSuperUserRequiredMixin):
+    """Passes progress messages and results of background draw generation
+    on to the availability page that started it."""
+
+    group_prefix = 'draw_generation'
+
+
+class DrawGenerationWorkerConsumer(SyncConsumer):
+    """Runs draw generation jobs sent to the "draw" channel. Run with
+    `manage.py runworker draw`."""
+
+    def create_draw(self, event):
+        from .jobs import run_draw_job
+        run_draw_job(event['round'], event['job'], event['user'], event['ip_address'])
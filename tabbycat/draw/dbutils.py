@@ -1,3 +1,5 @@
+from adjallocation.conflicts import update_round_encounters
+from standings.snapshots import clear_team_standings_snapshots
 from tournaments.models import Round
 
 from .models import Debate
@@ -5,5 +7,7 @@ from .models import Debate
 
 def delete_round_draw(round, **options):
     Debate.objects.filter(round=round).delete()
+    update_round_encounters(round)
+    clear_team_standings_snapshots(round)
     round.draw_status = Round.STATUS_NONE
     round.save()
@@ -5,8 +5,10 @@ from collections import Counter
 from math import log2
 from statistics import pvariance
 
+import numpy as np
 from django.utils.translation import gettext as _
-import munkres
+
+from utils.assignment import DISALLOWED, get_solver
 
 from .common import BaseBPDrawGenerator, DrawUserError
 from .pairing import BPPairing
@@ -64,6 +66,11 @@ class BPHungarianDrawGenerator(BaseBPDrawGenerator):
             "hungarian_preshuffled" - Hungarian algorithm, with the rows and
                                       columns of the cost matrix permuted
                                       randomly beforehand.
+
+        "assignment_solver" - Implementation used to solve the assignment
+                              problem, one of the solver names in
+                              `utils.assignment` ("munkres", "scipy" or
+                              "lapjv").
     """
 
     requires_even_teams = True
@@ -75,16 +82,19 @@ class BPHungarianDrawGenerator(BaseBPDrawGenerator):
         "renyi_order"      : 1.0,
         "exponent"         : 4.0,
         "assignment_method": "hungarian_preshuffled",
+        "assignment_solver": "munkres",
     }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.check_teams_for_attribute("points")
         self.check_teams_for_attribute("side_history")
-        self.munkres = munkres.Munkres()
+        self.solver = get_solver(self.options["assignment_solver"])
 
     def generate(self):
+        self.report_progress("brackets")
         self._rooms = self.define_rooms([team.points for team in self.teams])
+        self.report_progress("pairing")
         self._costs = self.generate_cost_matrix(self._rooms)
         self._indices = self.solve_assignment(self._costs)
         self._draw = self.make_pairings(self._rooms, self._indices)
@@ -217,11 +227,79 @@ class BPHungarianDrawGenerator(BaseBPDrawGenerator):
             return (2 - log2(sum([p ** α for p in probs])) / (1 - α)) * n
         return _position_cost_renyi_entropy
 
+    # Vectorized position costs, used to build the cost matrix. Each of these
+    # takes an array of side histories, with one row per team, and returns an
+    # array of the same shape whose element [i, pos] is the position cost of
+    # team i going into position pos, i.e. the same as the functions above.
+
+    POSITION_COSTS_FUNCTIONS = {
+        "simple" : "_position_costs_simple",
+        "variance": "_position_costs_variance",
+    }
+
+    @staticmethod
+    def get_entropy_position_costs_function(α):  # noqa: N803
+        if α == 1.0:
+            return BPHungarianDrawGenerator._position_costs_shannon_entropy
+        elif α == 0.0:
+            return BPHungarianDrawGenerator._position_costs_min_entropy
+        elif α > 0.0:
+            return BPHungarianDrawGenerator._get_position_costs_renyi_entropy_function(α)
+        else:
+            raise DrawUserError(_("The Rényi order can't be negative, and it's currently set "
+                "to %(alpha)f.") % {'alpha': α})
+
+    def get_position_costs_function(self):
+        """Like get_position_cost_function(), but returns the vectorized
+        version of the position cost function."""
+        if self.options["position_cost"] == "entropy":
+            α = self.options["renyi_order"]  # noqa: N806
+            return self.get_entropy_position_costs_function(α)
+        else:
+            return self.get_option_function("position_cost", self.POSITION_COSTS_FUNCTIONS)
+
+    @staticmethod
+    def _update_histories(histories):
+        """Returns an array of shape (teams, 4, 4), whose element [i, pos] is
+        the side history of team i after going into position pos."""
+        return histories[:, np.newaxis, :] + np.eye(histories.shape[1])
+
+    @staticmethod
+    def _position_costs_simple(histories):
+        return histories.astype(float)
+
+    @staticmethod
+    def _position_costs_variance(histories):
+        return BPHungarianDrawGenerator._update_histories(histories).var(axis=2)
+
+    @staticmethod
+    def _position_costs_shannon_entropy(histories):
+        histories = BPHungarianDrawGenerator._update_histories(histories)
+        n = histories.sum(axis=2)
+        probs = histories / n[:, :, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            selfinfo = np.where(probs > 0, -probs * np.log2(probs), 0.0)
+        return (2 - selfinfo.sum(axis=2)) * n
+
+    @staticmethod
+    def _position_costs_min_entropy(histories):
+        histories = BPHungarianDrawGenerator._update_histories(histories)
+        return (2 - np.log2((histories > 0).sum(axis=2))) * histories.sum(axis=2)
+
+    @staticmethod
+    def _get_position_costs_renyi_entropy_function(α):  # noqa: N803
+        def _position_costs_renyi_entropy(histories):
+            histories = BPHungarianDrawGenerator._update_histories(histories)
+            n = histories.sum(axis=2)
+            probs = histories / n[:, :, np.newaxis]
+            return (2 - np.log2((probs ** α).sum(axis=2)) / (1 - α)) * n
+        return _position_costs_renyi_entropy
+
     def generate_cost_matrix(self, rooms):
-        """Returns a cost matrix for the tournament.
-        Rows (inner lists) are teams, in the same order as in `self.teams`.
-        Columns (elements) are positions in rooms, ordered first by room in the
-        order returned by `rooms`, then in speaking order (OG, OO, CG, CO).
+        """Returns a cost matrix for the tournament, as a NumPy array.
+        Rows are teams, in the same order as in `self.teams`.
+        Columns are positions in rooms, ordered first by room in the order
+        returned by `rooms`, then in speaking order (OG, OO, CG, CO).
         Rules:
          - if the team (given its points) is not allowed in the room, use
            DISALLOWED.
@@ -229,21 +307,20 @@ class BPHungarianDrawGenerator(BaseBPDrawGenerator):
            (for a team with that position history).
         """
         nteams = len(self.teams)
-        cost = self.get_position_cost_function()
+        costs_function = self.get_position_costs_function()
         exponent = self.options["exponent"]
 
-        costs = []
-        for team in self.teams:
-            row = []
-            for level, allowed in rooms:
-                if team.points not in allowed:
-                    row.extend([munkres.DISALLOWED] * 4)
-                else:
-                    row.extend([cost(pos, team.side_history) ** exponent for pos in range(4)])
-            assert len(row) == nteams
-            costs.append(row)
-
-        assert len(costs) == nteams
+        histories = np.array([team.side_history for team in self.teams], dtype=float)
+        position_costs = costs_function(histories) ** exponent
+
+        # allowed[i, r] is whether team i is allowed in room r
+        points = np.array([team.points for team in self.teams])
+        allowed = np.column_stack([np.isin(points, list(room_allowed)) for level, room_allowed in rooms])
+
+        costs = np.where(allowed[:, :, np.newaxis], position_costs[:, np.newaxis, :], DISALLOWED)
+        costs = costs.reshape(nteams, len(rooms) * 4)
+
+        assert costs.shape == (nteams, nteams)
         return costs
 
     # Assignment algorithms
@@ -261,20 +338,20 @@ class BPHungarianDrawGenerator(BaseBPDrawGenerator):
         start = time.perf_counter()
         logger.info("Running assignment algorithm for %d teams...", len(costs))
         indices = function(costs)
-        total_cost = sum(costs[i][j] for i, j in indices)
+        total_cost = sum(costs[i, j] for i, j in indices)
         elapsed = time.perf_counter() - start
         logger.info("Assignment took %.2f seconds, total cost: %f", elapsed, total_cost)
         return indices
 
     def _assign_hungarian(self, costs):
-        return self.munkres.compute(costs)
+        return self.solver.solve(costs)
 
     def _assign_hungarian_preshuffled(self, costs):
         n = len(costs)
         K = random.sample(range(n), n)             # noqa: N806
         J = random.sample(range(n), n)             # noqa: N806
-        C = [[costs[i][j] for j in J] for i in K]  # noqa: N806
-        indices = self.munkres.compute(C)
+        C = costs[np.ix_(K, J)]                    # noqa: N806
+        indices = self.solver.solve(C)
         return [(K[i], J[j]) for i, j in indices]
 
     # Make pairings
@@ -40,11 +40,12 @@ class BaseDrawGenerator:
     requires_prev_results = False
     requires_rrseq = False
 
-    def __init__(self, teams, results=None, rrseq=None, **kwargs):
+    def __init__(self, teams, results=None, rrseq=None, progress=None, **kwargs):
         self.teams = teams
         self.team_flags = dict()
         self.results = results
         self.rrseq = rrseq
+        self.progress = progress
 
         if self.requires_even_teams:
             if not len(self.teams) % self.TEAMS_PER_DEBATE == 0:
@@ -77,6 +78,13 @@ class BaseDrawGenerator:
         """Abstract method."""
         raise NotImplementedError
 
+    def report_progress(self, phase):
+        """Passes the name of the phase the generator is starting ("brackets",
+        "pairing" or "conflicts") to the `progress` callback, if there is
+        one."""
+        if self.progress is not None:
+            self.progress(phase)
+
     def get_option_function(self, option_name, option_dict):
         option = self.options[option_name]
         if callable(option):
@@ -203,6 +211,7 @@ class EliminationDrawMixin:
     """Mixin for elimination draws."""
 
     def generate(self):
+        self.report_progress("pairing")
         pairings = self.make_pairings()
         self.shuffle_sides(pairings)
         return pairings
@@ -80,9 +80,12 @@ class PowerPairedDrawGenerator(BasePairDrawGenerator):
             self.check_teams_for_attribute("npullups", checkfunc=lambda x: isinstance(x, int))
 
     def generate(self):
+        self.report_progress("brackets")
         self._brackets = self._make_raw_brackets()
         self.resolve_odd_brackets(self._brackets)  # operates in-place
+        self.report_progress("pairing")
         self._pairings = self.generate_pairings(self._brackets)
+        self.report_progress("conflicts")
         self.avoid_conflicts(self._pairings)  # operates in-place
         self._draw = list()
         for bracket in self._pairings.values():
@@ -39,7 +39,9 @@ class RandomDrawGenerator(RandomPairingsMixin, BasePairDrawGenerator):
     DEFAULT_OPTIONS = {"max_swap_attempts": 20, "avoid_conflicts": "off"}
 
     def generate(self):
+        self.report_progress("pairing")
         self._draw = self.make_random_pairings()
+        self.report_progress("conflicts")
         self.avoid_conflicts(self._draw)  # Operates in-place
         self.allocate_sides(self._draw)  # Operates in-place
         return self._draw
@@ -114,5 +116,6 @@ class RandomBPDrawGenerator(RandomPairingsMixin, BaseBPDrawGenerator):
     DEFAULT_OPTIONS = {}
 
     def generate(self):
+        self.report_progress("pairing")
         self._draw = self.make_random_pairings()
         return self._draw
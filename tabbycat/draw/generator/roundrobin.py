@@ -21,8 +21,10 @@ class RoundRobinDrawGenerator(BasePairDrawGenerator):
 
     def generate(self):
         self.teams = self._exclude_teams_without_divisions()
+        self.report_progress("brackets")
         self._brackets = self._make_raw_brackets_from_divisions()
         # TODO: resolving brackets with odd numbers here (see resolve_odd_brackets)
+        self.report_progress("pairing")
         self._pairings = self.generate_pairings(self._brackets)
         # TODO: avoiding history conflicts here
         self._draw = list()
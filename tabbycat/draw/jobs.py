@@ -0,0 +1,176 @@
+"""Generates draws in the background, so that large draws don't time out the
+HTTP request that starts them, and so that a draw that is taking too long can
+be cancelled.
+
+Jobs are sent to the "draw" channel, which is handled by
+`DrawGenerationWorkerConsumer` in a worker process started with
+`manage.py runworker draw` (see `utils.jobs`). The phase the job is in is
+broadcast to `DrawGenerationConsumer`, followed by the result.
+
+Cancellation is cooperative: the job stops at the start of its next phase, so
+a single long phase (like solving the assignment problem for a large BP draw)
+runs to completion first. Nothing is saved until the last phase, and then in a
+single transaction."""
+
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.utils.translation import gettext as _, gettext_lazy
+
+from actionlog.consumers import ActionLogEntryConsumer
+from actionlog.models import ActionLogEntry
+from standings.base import StandingsError
+from tournaments.models import Round
+from utils.broadcasts import publish
+from utils.jobs import broadcast, dispatch_job
+from utils.misc import get_ip_address, reverse_round
+from venues.allocator import allocate_venues
+from venues.models import VenueConstraint
+
+from .consumers import DrawGenerationConsumer
+from .generator import DrawFatalError, DrawUserError
+from .manager import DrawManager
+
+logger = logging.getLogger(__name__)
+
+DRAW_CHANNEL = "draw"
+
+# Jobs that haven't finished after this long (e.g. because the worker died) no
+# longer stop new jobs from being started for the round
+DRAW_JOB_TIMEOUT = 30 * 60
+
+DRAW_PHASES = {
+    'teams':     gettext_lazy("Fetching teams"),
+    'brackets':  gettext_lazy("Forming brackets"),
+    'pairing':   gettext_lazy("Pairing teams"),
+    'conflicts': gettext_lazy("Avoiding conflicts"),
+    'saving':    gettext_lazy("Saving draw"),
+}
+
+
+class DrawCancelledError(Exception):
+    pass
+
+
+def draw_job_cache_key(round_id):
+    return "%s_%s_%s" % ('roundid', round_id, '_draw_job')
+
+
+def draw_job_cancelled_cache_key(job_id):
+    return "%s_%s_%s" % ('drawjob', job_id, '_cancelled')
+
+
+def start_draw_job(round, request):
+    """Queues a draw generation job for the round. Returns the ID of the job,
+    or None, without queueing anything, if there's already a job running for
+    the round."""
+    job_id = uuid.uuid4().hex
+    if not cache.add(draw_job_cache_key(round.id), job_id, DRAW_JOB_TIMEOUT):
+        return None
+
+    user_id = request.user.id if request.user.is_authenticated else None
+    ip_address = get_ip_address(request)
+
+    logger.info("Starting draw generation for %s", round)
+    dispatch_job(DRAW_CHANNEL, {
+        "type": "create_draw",
+        "round": round.id,
+        "job": job_id,
+        "user": user_id,
+        "ip_address": ip_address,
+    }, run_draw_job, round.id, job_id, user_id, ip_address)
+    return job_id
+
+
+def cancel_draw_job(round):
+    """Asks the draw generation job for the round, if there is one, to stop.
+    A new job can be started straight away, even if the old one is stuck and
+    never stops. Returns False if there was no job running."""
+    job_id = cache.get(draw_job_cache_key(round.id))
+    if job_id is None:
+        return False
+    logger.info("Cancelling draw generation for %s", round)
+    cache.set(draw_job_cancelled_cache_key(job_id), True, DRAW_JOB_TIMEOUT)
+    cache.delete(draw_job_cache_key(round.id))
+    return True
+
+
+def broadcast_draw_update(round, data):
+    group_name = DrawGenerationConsumer.group_prefix + "_" + round.tournament.slug
+    data['round'] = round.seq
+    broadcast(group_name, data)
+
+
+def run_draw_job(round_id, job_id, user_id=None, ip_address=None):
+    """Generates and saves the draw for the round, broadcasting each phase as
+    it starts, then the result."""
+    round = Round.objects.select_related('tournament').get(pk=round_id)
+
+    def progress(phase):
+        if cache.get(draw_job_cancelled_cache_key(job_id)):
+            raise DrawCancelledError()
+        broadcast_draw_update(round, {'status': 'progress', 'phase': phase, 'message': str(DRAW_PHASES[phase])})
+
+    try:
+        if round.draw_status != Round.STATUS_NONE:
+            raise DrawUserError(_("There was already a draw for %(round)s.") % {'round': round.name})
+        DrawManager(round, progress=progress).create()
+
+    except DrawCancelledError:
+        logger.info("Draw generation for %s was cancelled", round)
+        broadcast_draw_update(round, {'status': 'cancelled'})
+        return
+
+    except DrawUserError as e:
+        logger.warning("User error creating draw: " + str(e), exc_info=True)
+        broadcast_draw_update(round, {'status': 'error', 'message': _(
+            "The draw could not be created, for the following reason: %(message)s "
+            "Please fix this issue before attempting to create the draw.") % {'message': str(e)}})
+        return
+
+    except DrawFatalError as e:
+        logger.exception("Fatal error creating draw: " + str(e))
+        broadcast_draw_update(round, {'status': 'error', 'message': _(
+            "The draw could not be created, because the following error occurred: %(message)s "
+            "If this issue persists and you're not sure how to resolve it, please "
+            "contact the developers.") % {'message': str(e)}})
+        return
+
+    except StandingsError as e:
+        logger.exception("Error generating standings for draw: " + str(e))
+        broadcast_draw_update(round, {'status': 'error', 'message': _(
+            "The team standings could not be generated, because the following error occurred: "
+            "%(message)s Because generating the draw uses the current team standings, this "
+            "prevents the draw from being generated.") % {'message': str(e)}})
+        return
+
+    except Exception:
+        logger.exception("Error creating draw for %s", round)
+        broadcast_draw_update(round, {'status': 'error', 'message': _(
+            "There was an unexpected error while creating the draw. "
+            "Check the server logs for details.")})
+        return
+
+    finally:
+        cache.delete(draw_job_cancelled_cache_key(job_id))
+        if cache.get(draw_job_cache_key(round_id)) == job_id:
+            cache.delete(draw_job_cache_key(round_id))
+
+    warning = None
+    if VenueConstraint.objects.filter(adjudicator__in=round.tournament.relevant_adjudicators).exists():
+        warning = _("Venues were not auto-allocated because there are one or more adjudicator venue constraints. "
+            "You should run venue allocations after allocating adjudicators.")
+    else:
+        allocate_venues(round)
+
+    log_draw_creation(round, user_id, ip_address)
+    broadcast_draw_update(round, {'status': 'done', 'url': reverse_round('draw', round), 'warning': warning})
+
+
+def log_draw_creation(round, user_id, ip_address):
+    log = ActionLogEntry.objects.log(type=ActionLogEntry.ACTION_TYPE_DRAW_CREATE,
+            content_object=round, tournament=round.tournament, round=round,
+            user_id=user_id, ip_address=ip_address)
+    group_name = ActionLogEntryConsumer.group_prefix + "_" + round.tournament.slug
+    publish(group_name, log.serialize)
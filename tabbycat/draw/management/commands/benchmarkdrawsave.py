@@ -0,0 +1,88 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from draw.generator.pairing import BPPairing, Pairing
+from draw.manager import RandomDrawManager
+from draw.models import Debate, DebateTeam
+from participants.models import Team
+from tournaments.models import Round, Tournament
+
+
+def make_debates_individually(manager, pairings):
+    """Saves the draw one row at a time, as BaseDrawManager._make_debates()
+    used to, for comparison."""
+    for pairing in pairings:
+        debate = Debate(round=manager.round)
+        debate.division = pairing.division
+        debate.bracket = pairing.bracket
+        debate.room_rank = pairing.room_rank
+        debate.flags = ",".join(pairing.flags)
+        debate.save()
+
+        for team, side in zip(pairing.teams, manager.round.tournament.sides):
+            DebateTeam.objects.create(debate=debate, team=team, side=side,
+                    flags=",".join(pairing.get_team_flags(team)))
+
+
+class Command(BaseCommand):
+
+    help = "Times saving synthetic draws of different sizes to the database. " \
+        "Everything the command creates is rolled back afterwards."
+
+    METHODS = [
+        ("bulk", lambda manager, pairings: manager._make_debates(pairings)),
+        ("individual", make_debates_individually),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--rooms", type=int, nargs="+", default=[50, 100, 200],
+                            help="Numbers of rooms in the synthetic draws")
+        parser.add_argument("-f", "--format", choices=["two", "bp"], default="bp",
+                            help="Number of teams per debate")
+        parser.add_argument("-n", "--repeats", type=int, default=3,
+                            help="Number of times to save each draw")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Database: {}".format(connection.vendor))
+        for nrooms in options["rooms"]:
+            with transaction.atomic():
+                self.run_benchmark(nrooms, options["format"], options["repeats"])
+                transaction.set_rollback(True)
+
+    def run_benchmark(self, nrooms, teams_in_debate, repeats):
+        tournament = Tournament.objects.create(name="Draw save benchmark",
+                slug="benchmark-draw-save-{:d}".format(nrooms))
+        tournament.preferences['debate_rules__teams_in_debate'] = teams_in_debate
+        round = Round.objects.create(tournament=tournament, seq=1, name="Round 1", abbreviation="R1",
+                draw_type=Round.DRAW_RANDOM)
+        nteams = nrooms * len(tournament.sides)
+        teams = [Team.objects.create(tournament=tournament, reference="Team {:d}".format(i),
+                short_reference="T{:d}".format(i)) for i in range(nteams)]
+        manager = RandomDrawManager(round)
+
+        self.stdout.write("{:d} rooms ({:d} teams):".format(nrooms, nteams))
+        for name, method in self.METHODS:
+            times = []
+            for i in range(repeats):
+                pairings = self.make_pairings(teams, tournament.sides)
+                savepoint = transaction.savepoint()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    method(manager, pairings)
+                    times.append(time.perf_counter() - start)
+                transaction.savepoint_rollback(savepoint)
+            self.stdout.write("    {name:<12} {time:8.3f} s   {queries:5d} queries".format(
+                name=name, time=min(times), queries=len(queries)))
+
+    @staticmethod
+    def make_pairings(teams, sides):
+        pairing_class = BPPairing if len(sides) == 4 else Pairing
+        teams = list(teams)
+        random.shuffle(teams)
+        n = len(sides)
+        return [pairing_class(teams[i:i+n], bracket=0, room_rank=i // n + 1)
+                for i in range(0, len(teams), n)]
@@ -1,10 +1,13 @@
 import logging
 import random
 
+from django.db import connection, transaction
 from django.utils.translation import gettext as _
 
+from adjallocation.conflicts import update_round_encounters
 from participants.utils import get_side_history
 from tournaments.models import Round
+from standings.snapshots import clear_team_standings_snapshots
 from standings.teams import TeamStandingsGenerator
 
 from .models import Debate, DebateTeam
@@ -27,12 +30,13 @@ OPTIONS_TO_CONFIG_MAPPING = {
     "pullup"                : "draw_rules__bp_pullup_distribution",
     "position_cost"         : "draw_rules__bp_position_cost",
     "assignment_method"     : "draw_rules__bp_assignment_method",
+    "assignment_solver"     : "draw_rules__assignment_solver",
     "renyi_order"           : "draw_rules__bp_renyi_order",
     "exponent"              : "draw_rules__bp_position_cost_exponent",
 }
 
 
-def DrawManager(round, active_only=True):  # noqa: N802 (factory function)
+def DrawManager(round, active_only=True, progress=None):  # noqa: N802 (factory function)
     teams_in_debate = round.tournament.pref('teams_in_debate')
     try:
         klass = DRAW_MANAGER_CLASSES[(teams_in_debate, round.draw_type)]
@@ -44,18 +48,28 @@ def DrawManager(round, active_only=True):  # noqa: N802 (factory function)
         else:
             raise DrawUserError(_("Unrecognised \"teams in debate\" option: %(option)s") % {'option': teams_in_debate})
     logger.debug("Using draw manager class: %s", klass.__name__)
-    return klass(round, active_only)
+    return klass(round, active_only, progress)
 
 
 class BaseDrawManager:
-    """Creates, modifies and retrieves relevant Debate objects relating to a draw."""
+    """Creates, modifies and retrieves relevant Debate objects relating to a draw.
+
+    If `progress` is given, it is called with the name of each phase of draw
+    creation as it starts: "teams", then whichever of "brackets", "pairing" and
+    "conflicts" the draw generator goes through, then "saving". It may raise an
+    exception to abandon the draw, which is then not saved."""
 
     generator_type = None
 
-    def __init__(self, round, active_only=True):
+    def __init__(self, round, active_only=True, progress=None):
         self.round = round
         self.teams_in_debate = self.round.tournament.pref('teams_in_debate')
         self.active_only = active_only
+        self.progress = progress
+
+    def report_progress(self, phase):
+        if self.progress is not None:
+            self.progress(phase)
 
     def get_relevant_options(self):
         if self.teams_in_debate == 'two':
@@ -103,38 +117,58 @@ class BaseDrawManager:
     def _make_debates(self, pairings):
         random.shuffle(pairings)  # to avoid IDs indicating room ranks
 
-        for pairing in pairings:
-            debate = Debate(round=self.round)
-            debate.division = pairing.division
-            debate.bracket = pairing.bracket
-            debate.room_rank = pairing.room_rank
-            debate.flags = ",".join(pairing.flags)  # comma-separated list
-            if (self.round.tournament.pref('draw_side_allocations') == "manual-ballot" or
-                    self.round.is_break_round):
-                debate.sides_confirmed = False
-            debate.save()
-
-            for team, side in zip(pairing.teams, self.round.tournament.sides):
-                DebateTeam.objects.create(debate=debate, team=team, side=side,
-                        flags=",".join(pairing.get_team_flags(team)))
+        sides_confirmed = not (self.round.tournament.pref('draw_side_allocations') == "manual-ballot" or
+                self.round.is_break_round)
+        debates = [Debate(round=self.round, division=pairing.division, bracket=pairing.bracket,
+                room_rank=pairing.room_rank, sides_confirmed=sides_confirmed,
+                flags=",".join(pairing.flags))  # comma-separated list
+            for pairing in pairings]
+        self._bulk_create_debates(debates)
+
+        sides = self.round.tournament.sides
+        debateteams = [DebateTeam(debate=debate, team=team, side=side,
+                flags=",".join(pairing.get_team_flags(team)))
+            for debate, pairing in zip(debates, pairings)
+            for team, side in zip(pairing.teams, sides)]
+        DebateTeam.objects.bulk_create(debateteams)
+
+        update_round_encounters(self.round)
+        clear_team_standings_snapshots(self.round)
+
+    def _bulk_create_debates(self, debates):
+        """Saves `debates`, which must be the only debates in the round, in a
+        single query, and sets their primary keys."""
+        if connection.features.can_return_ids_from_bulk_insert:
+            Debate.objects.bulk_create(debates)  # sets primary keys
+            return
+
+        # Other databases (i.e. SQLite) don't return the new primary keys, but
+        # assign them in increasing order of insertion, so retrieve them after
+        Debate.objects.bulk_create(debates)
+        ids = list(self.round.debate_set.order_by('id').values_list('id', flat=True))
+        if len(ids) != len(debates):
+            raise RuntimeError("Expected %d debates in round after saving draw, found %d" % (len(debates), len(ids)))
+        for debate, debate_id in zip(debates, ids):
+            debate.id = debate_id
 
     def delete(self):
         self.round.debate_set.all().delete()
 
     def create(self):
-        """Generates a draw and populates the database with it."""
+        """Generates a draw and populates the database with it. The draw is
+        saved in a single transaction once it has been generated, so if
+        generation fails or is abandoned, the round is left as it was."""
 
         if self.round.draw_status != Round.STATUS_NONE:
             raise RuntimeError("Tried to create a draw on round that already has a draw")
 
-        self.delete()
-
         options = dict()
         for key in self.get_relevant_options():
             options[key] = self.round.tournament.preferences[OPTIONS_TO_CONFIG_MAPPING[key]]
         if options.get("side_allocations") == "manual-ballot":
             options["side_allocations"] = "balance"
 
+        self.report_progress("teams")
         teams = self.get_teams()
         results = self.get_results()
         rrseq = self.get_rrseq()
@@ -146,11 +180,19 @@ class BaseDrawManager:
         generator_type = self.get_generator_type()
         logger.debug("Using generator type: %s", generator_type)
         drawer = DrawGenerator(self.teams_in_debate, generator_type, teams,
-                results=results, rrseq=rrseq, **options)
+                results=results, rrseq=rrseq, progress=self.progress, **options)
         pairings = drawer.generate()
-        self._make_debates(pairings)
-        self.round.draw_status = Round.STATUS_DRAFT
-        self.round.save()
+
+        self.report_progress("saving")
+        with transaction.atomic():
+            # Check again, in case another draw was created while this one was generated
+            status = Round.objects.select_for_update().values_list('draw_status', flat=True).get(pk=self.round.pk)
+            if status != Round.STATUS_NONE:
+                raise RuntimeError("Tried to create a draw on round that already has a draw")
+            self.delete()
+            self._make_debates(pairings)
+            self.round.draw_status = Round.STATUS_DRAFT
+            self.round.save()
 
 
 class RandomDrawManager(BaseDrawManager):
@@ -178,7 +220,8 @@ class PowerPairedDrawManager(BaseDrawManager):
                 "pullup_restriction", "side_allocations"
             ])
         elif self.teams_in_debate == 'bp':
-            options.extend(["pullup", "position_cost", "assignment_method", "renyi_order", "exponent"])
+            options.extend(["pullup", "position_cost", "assignment_method", "assignment_solver",
+                    "renyi_order", "exponent"])
         return options
 
     def get_teams(self):
@@ -1,5 +1,7 @@
 import unittest
 
+from utils.assignment import DISALLOWED
+
 from ..generator.bphungarian import BPHungarianDrawGenerator
 from .utils import TestTeam
 
@@ -45,3 +47,48 @@ class TestDefineRooms(unittest.TestCase):
 
     def test_pullup_one_room(self):
         self._test_define_rooms("one_room", self.one_room)
+
+
+class TestCostMatrix(unittest.TestCase):
+    """Tests that the vectorized cost matrix matches the scalar position cost
+    functions, which are also used in the position balance report."""
+
+    histories = [[0, 0, 0, 0], [1, 0, 0, 0], [2, 1, 1, 0], [0, 3, 0, 3],
+                 [4, 1, 0, 1], [1, 1, 1, 1], [0, 0, 5, 1], [2, 2, 2, 0]]
+    points = [3, 3, 2, 2, 2, 2, 1, 1]
+
+    def _test_cost_matrix(self, **options):
+        teams = [TestTeam(i, 'I', points=points, side_history=history)
+                 for i, (points, history) in enumerate(zip(self.points, self.histories))]
+        generator = BPHungarianDrawGenerator(teams, **options)
+        rooms = generator.define_rooms(self.points)
+        cost = generator.get_position_cost_function()
+        exponent = generator.options["exponent"]
+
+        costs = generator.generate_cost_matrix(rooms)
+        self.assertEqual(costs.shape, (len(teams), len(teams)))
+        for i, team in enumerate(teams):
+            for r, (level, allowed) in enumerate(rooms):
+                for pos in range(4):
+                    with self.subTest(team=i, room=r, pos=pos):
+                        if team.points in allowed:
+                            self.assertAlmostEqual(costs[i, r*4 + pos], cost(pos, team.side_history) ** exponent)
+                        else:
+                            self.assertEqual(costs[i, r*4 + pos], DISALLOWED)
+
+    def test_simple(self):
+        self._test_cost_matrix(position_cost="simple")
+
+    def test_variance(self):
+        self._test_cost_matrix(position_cost="variance")
+
+    def test_shannon_entropy(self):
+        self._test_cost_matrix(position_cost="entropy", renyi_order=1.0)
+
+    def test_min_entropy(self):
+        self._test_cost_matrix(position_cost="entropy", renyi_order=0.0)
+
+    def test_renyi_entropy(self):
+        for α in [0.5, 2.0, 3.0]:  # noqa: N806
+            with self.subTest(renyi_order=α):
+                self._test_cost_matrix(position_cost="entropy", renyi_order=α, exponent=2.0)
@@ -22,3 +22,26 @@ class RandomDrawTests(BaseMinimalTournamentTestCase):
 
         for team in Team.objects.all():
             self.assertEqual(1, DebateTeam.objects.filter(team=team).count())
+
+        for debate in self.round.debate_set.all():
+            self.assertCountEqual(["aff", "neg"], debate.debateteam_set.values_list('side', flat=True))
+
+    def test_progress(self):
+        phases = []
+        DrawManager(self.round, progress=phases.append).create()
+        self.assertEqual(phases, ["teams", "pairing", "conflicts", "saving"])
+
+    def test_abandoned(self):
+        class Abandon(Exception):
+            pass
+
+        def progress(phase):
+            if phase == "saving":
+                raise Abandon()
+
+        with self.assertRaises(Abandon):
+            DrawManager(self.round, progress=progress).create()
+
+        self.round.refresh_from_db()
+        self.assertEqual(self.round.draw_status, Round.STATUS_NONE)
+        self.assertEqual(0, self.round.debate_set.count())
@@ -12,6 +12,12 @@ urlpatterns = [
         path('create/',
             views.CreateDrawView.as_view(),
             name='draw-create'),
+        path('create/start/',
+            views.CreateDrawJobView.as_view(),
+            name='draw-create-start'),
+        path('create/cancel/',
+            views.CancelDrawJobView.as_view(),
+            name='draw-create-cancel'),
         path('details/',
             views.AdminDrawWithDetailsView.as_view(),
             name='draw-details'),
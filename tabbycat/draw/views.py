@@ -19,6 +19,7 @@ from django.views.generic.base import TemplateView
 
 from actionlog.mixins import LogActionMixin
 from actionlog.models import ActionLogEntry
+from adjallocation.conflicts import update_round_encounters
 from adjallocation.models import DebateAdjudicator
 from adjallocation.utils import adjudicator_conflicts_display
 from divisions.models import Division
@@ -27,6 +28,8 @@ from options.preferences import BPPositionCost
 from participants.models import Adjudicator, Institution, Team
 from participants.utils import get_side_history
 from standings.base import StandingsError
+from standings.exports import clear_public_tab_exports
+from standings.snapshots import clear_team_standings_snapshots
 from standings.teams import TeamStandingsGenerator
 from standings.views import BaseStandingsView
 from tournaments.mixins import (CurrentRoundMixin, DrawForDragAndDropMixin,
@@ -36,7 +39,7 @@ from tournaments.models import Round, Tournament
 from tournaments.views import BaseSaveDragAndDropDebateJsonView
 from tournaments.utils import get_side_name
 from utils.mixins import AdministratorMixin
-from utils.views import BadJsonRequestError, PostOnlyRedirectView, VueTableTemplateView
+from utils.views import BadJsonRequestError, JsonDataResponsePostView, PostOnlyRedirectView, VueTableTemplateView
 from utils.misc import reverse_round, reverse_tournament
 from utils.tables import TabbycatTableBuilder
 from venues.allocator import allocate_venues
@@ -45,6 +48,7 @@ from venues.utils import venue_conflicts_display
 
 from .dbutils import delete_round_draw
 from .generator import DrawFatalError, DrawUserError
+from .jobs import cancel_draw_job, start_draw_job
 from .manager import DrawManager
 from .models import Debate, DebateTeam, TeamSideAllocation
 from .prefetch import populate_history
@@ -645,6 +649,30 @@ class CreateDrawView(DrawStatusEdit):
         return super().post(request, *args, **kwargs)
 
 
+class CreateDrawJobView(AdministratorMixin, RoundMixin, JsonDataResponsePostView):
+    """Starts generating the draw in the background. The progress and result
+    are sent to DrawGenerationConsumer."""
+
+    def post_data(self):
+        if self.round.draw_status != Round.STATUS_NONE:
+            info = _("Could not create draw for %(round)s, there was already a draw!") % {'round': self.round.name}
+            logger.warning(info)
+            raise BadJsonRequestError(info)
+        if start_draw_job(self.round, self.request) is None:
+            info = _("A draw is already being generated for this round.")
+            logger.warning(info)
+            raise BadJsonRequestError(info)
+        return {'queued': True}
+
+
+class CancelDrawJobView(AdministratorMixin, RoundMixin, JsonDataResponsePostView):
+
+    def post_data(self):
+        if not cancel_draw_job(self.round):
+            raise BadJsonRequestError(_("No draw is being generated for this round."))
+        return {'cancelled': True}
+
+
 class ConfirmDrawCreationView(DrawStatusEdit):
     action_log_type = ActionLogEntry.ACTION_TYPE_DRAW_CONFIRM
 
@@ -913,6 +941,9 @@ class SaveDrawMatchupsView(BaseSaveDragAndDropDebateJsonView):
                     side, debate.matchup, team_name_lookup[team_id])
 
         debate._populate_teams()
+        update_round_encounters(self.round)
+        clear_team_standings_snapshots(self.round)
+        clear_public_tab_exports(self.tournament.id)
 
         return debate
 
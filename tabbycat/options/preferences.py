@@ -302,6 +302,46 @@ class BPAssignmentMethod(ChoicePreference):
     default = 'hungarian_preshuffled'
 
 
+@tournament_preferences_registry.register
+class AssignmentSolver(ChoicePreference):
+    help_text = _("Which implementation to use to solve the assignment problems in "
+                  "adjudicator auto-allocation and BP draws. Faster solvers give "
+                  "equally optimal results, but may break ties differently.")
+    verbose_name = _("Assignment problem solver")
+    section = draw_rules
+    name = 'assignment_solver'
+    choices = (
+        ('munkres', _("Munkres (pure Python, slowest)")),
+        ('scipy', _("SciPy")),
+        ('lapjv', _("Jonker-Volgenant (requires the lap package)")),
+    )
+    default = 'munkres'
+
+
+@tournament_preferences_registry.register
+class AdjAllocationAnnealTime(FloatPreference):
+    help_text = _("After running the Hungarian algorithm, spend up to this many seconds "
+                  "improving the adjudicator allocation by simulated annealing, to reduce "
+                  "conflicts and histories. Set to 0 to skip annealing.")
+    verbose_name = _("Adjudicator allocation annealing time (seconds)")
+    section = draw_rules
+    name = 'adj_anneal_time'
+    default = 0.0
+    field_kwargs = {'validators': [MinValueValidator(0.0)]}
+
+
+@tournament_preferences_registry.register
+class AdjAllocationAnnealChains(IntegerPreference):
+    help_text = _("Number of independent simulated annealing runs, each with a different "
+                  "random seed, to run in parallel; the best result is used. Only applies "
+                  "if the annealing time is greater than zero.")
+    verbose_name = _("Adjudicator allocation annealing runs")
+    section = draw_rules
+    name = 'adj_anneal_chains'
+    default = 1
+    field_kwargs = {'validators': [MinValueValidator(1)]}
+
+
 @tournament_preferences_registry.register
 class SkipAdjCheckins(BooleanPreference):
     help_text = _("Automatically make all adjudicators available for all rounds")
@@ -584,6 +624,20 @@ class SpeakerStandingsExtraMetrics(MultiValueChoicePreference):
     default = ['stdev', 'count']
 
 
+@tournament_preferences_registry.register
+class StandingsEngine(ChoicePreference):
+    help_text = _("How standings metrics are computed. The in-memory engine loads all results once and "
+        "computes most metrics together, which is faster for large tournaments.")
+    verbose_name = _("Standings engine")
+    section = standings
+    name = 'standings_engine'
+    choices = (
+        ('sql', _("Database queries")),
+        ('columnar', _("In-memory")),
+    )
+    default = 'sql'
+
+
 # ==============================================================================
 tab_release = Section('tab_release', verbose_name=_("Tab Release"))
 # ==============================================================================
@@ -764,6 +818,16 @@ class PublicPassword(StringPreference):
     default = 'Enter Password'
 
 
+@tournament_preferences_registry.register
+class QueuePublicBallots(BooleanPreference):
+    help_text = _("If checked, ballots submitted online are acknowledged as soon as they're checked, "
+                  "and saved by a background worker. This helps if many ballots are submitted at once.")
+    verbose_name = _("Queue online ballot submissions")
+    section = data_entry
+    name = 'queue_public_ballots'
+    default = False
+
+
 @tournament_preferences_registry.register
 class DisableBallotConfirmation(BooleanPreference):
     help_text = _("Bypasses double checking by setting ballots to be automatically confirmed")
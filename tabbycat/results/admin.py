@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.db.models import Prefetch
 from django.db.models.expressions import RawSQL
 
-from .models import BallotSubmission, SpeakerScore, SpeakerScoreByAdj, TeamScore
+from .models import BallotSubmission, QueuedBallot, SpeakerScore, SpeakerScoreByAdj, TeamScore
 
 from draw.models import DebateTeam
 from utils.admin import TabbycatModelAdminFieldsMixin
@@ -119,3 +119,24 @@ class SpeakerScoreByAdjAdmin(TabbycatModelAdminFieldsMixin, admin.ModelAdmin):
     def get_speaker_name(self, obj):
         return obj.speaker_name
     get_speaker_name.short_description = "Speaker"
+
+
+# ==============================================================================
+# QueuedBallot
+# ==============================================================================
+
+@admin.register(QueuedBallot)
+class QueuedBallotAdmin(admin.ModelAdmin):
+    list_display = ('id', 'debate', 'get_round', 'adjudicator', 'status', 'timestamp', 'processed')
+    list_filter = ('status', 'debate__round')
+    raw_id_fields = ('debate', 'adjudicator', 'ballot_submission')
+    readonly_fields = ('timestamp', 'processed')
+
+    def get_round(self, obj):
+        return obj.debate.round.name
+    get_round.short_description = "Round"
+
+    def get_queryset(self, request):
+        return super(QueuedBallotAdmin, self).get_queryset(request).select_related(
+            'debate__round__tournament', 'adjudicator').prefetch_related(
+            Prefetch('debate__debateteam_set', queryset=DebateTeam.objects.select_related('team')))
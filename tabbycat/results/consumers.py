@@ -1,3 +1,5 @@
+from channels.consumer import SyncConsumer
+
 from utils.consumers import TournamentConsumer, WSLoginRequiredMixin
 
 
@@ -7,3 +9,12 @@ class BallotResultConsumer(TournamentConsumer, WSLoginRequiredMixin):
 
 class BallotStatusConsumer(TournamentConsumer, WSLoginRequiredMixin):
     group_prefix = 'ballot_statuses'
+
+
+class BallotQueueWorkerConsumer(SyncConsumer):
+    """Saves queued ballots sent to the "ballots" channel. Run with
+    `manage.py runworker ballots`."""
+
+    def process_ballot(self, event):
+        from .jobs import run_ballot_job
+        run_ballot_job(event['queued_ballot'])
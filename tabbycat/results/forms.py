@@ -1,8 +1,6 @@
 import logging
 from itertools import product
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
 from django import forms
 from django.utils import timezone
 from django.utils.translation import gettext as _
@@ -11,6 +9,7 @@ from django.utils.translation import ngettext
 from draw.models import Debate, DebateTeam
 from participants.models import Speaker, Team
 from tournaments.utils import get_side_name
+from utils.broadcasts import publish
 
 from .consumers import BallotResultConsumer, BallotStatusConsumer
 from .result import (BPDebateResult, BPEliminationDebateResult, ConsensusDebateResult,
@@ -200,24 +199,18 @@ class BaseResultForm(forms.Form):
         if self.ballotsub.confirmed:
             if self.debate.result_status is self.debate.STATUS_CONFIRMED:
                 group_name = BallotResultConsumer.group_prefix + "_" + t.slug
-                async_to_sync(get_channel_layer().group_send)(group_name, {
-                    "type": "send_json",
-                    "data": self.ballotsub.serialize_like_actionlog
-                })
+                publish(group_name, self.ballotsub.serialize_like_actionlog)
 
         # 6. Notify the Results Page/Ballots Status Graph
         group_name = BallotStatusConsumer.group_prefix + "_" + t.slug
         meta = get_status_meta(self.debate)
-        async_to_sync(get_channel_layer().group_send)(group_name, {
-            "type": "send_json",
-            "data": {
-                'status': self.cleaned_data['debate_result_status'],
-                'icon': meta[0],
-                'class': meta[1],
-                'sort': meta[2],
-                'ballot': self.ballotsub.serialize(t),
-                'round': self.debate.round.id
-            }
+        publish(group_name, {
+            'status': self.cleaned_data['debate_result_status'],
+            'icon': meta[0],
+            'class': meta[1],
+            'sort': meta[2],
+            'ballot': self.ballotsub.serialize(t),
+            'round': self.debate.round.id
         })
 
         return self.ballotsub
@@ -849,3 +842,14 @@ class BPEliminationResultForm(BaseResultForm):
         result = BPEliminationDebateResult(self.ballotsub)
         result.set_advancing(self.cleaned_data['advancing'])
         result.save()
+
+
+def get_ballot_set_form_class(tournament, round):
+    """Returns the form class used to enter ballot sets for debates in
+    `round`."""
+    if tournament.pref('teams_in_debate') == 'bp' and round.is_break_round:
+        return BPEliminationResultForm
+    elif round.ballots_per_debate == 'per-adj':
+        return PerAdjudicatorBallotSetForm
+    else:
+        return SingleBallotSetForm
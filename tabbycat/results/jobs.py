@@ -0,0 +1,194 @@
+"""Saves ballots submitted online in the background, so that when the whole
+tournament submits ballots within a few minutes, web workers aren't tied up
+saving results, sending email receipts and broadcasting updates.
+
+If the `queue_public_ballots` preference is enabled, the public ballot entry
+views validate the submitted form, store its data in a `QueuedBallot` and
+respond straight away. Each queued ballot is sent to the "ballots" channel,
+which is handled by `BallotQueueWorkerConsumer` in a worker process started
+with `manage.py runworker ballots` (see `utils.jobs`). The worker validates the
+data again and saves it, just as the view would have.
+
+At most `settings.BALLOT_QUEUE_CONCURRENCY` ballots are saved at once in each
+process. If `settings.BALLOT_QUEUE_MAX_DEPTH` ballots are already waiting in a
+tournament, new submissions are saved in the request as usual, so that
+submitters are slowed down rather than the queue growing without limit.
+
+Queued ballots stay in the database until they're processed, and a ballot is
+only marked as processed in the transaction that saves it. If a worker dies
+while saving a ballot, the ballot is left queued, and is sent to be processed
+again when the next ballot in the tournament is queued, or can be processed
+with `manage.py processballotqueue`."""
+
+import logging
+import threading
+from datetime import timedelta
+from smtplib import SMTPException
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils import timezone
+
+from actionlog.consumers import ActionLogEntryConsumer
+from actionlog.models import ActionLogEntry
+from notifications.utils import ballots_email_generator
+from utils.broadcasts import publish
+from utils.jobs import dispatch_job
+
+from .forms import get_ballot_set_form_class
+from .models import BallotSubmission, QueuedBallot
+
+logger = logging.getLogger(__name__)
+
+BALLOT_CHANNEL = "ballots"
+
+# Submitted fields that aren't stored. The password is checked before the
+# ballot is queued, so the worker doesn't check it again.
+UNSTORED_FIELDS = ['csrfmiddlewaretoken', 'password']
+
+_processing_slots = threading.BoundedSemaphore(settings.BALLOT_QUEUE_CONCURRENCY)
+
+
+def pending_queued_ballots(tournament):
+    """Returns a query set of the tournament's queued ballots that haven't
+    been processed yet."""
+    return QueuedBallot.objects.filter(debate__round__tournament=tournament, status=QueuedBallot.STATUS_QUEUED)
+
+
+def is_ballot_queue_full(tournament):
+    return pending_queued_ballots(tournament).count() >= settings.BALLOT_QUEUE_MAX_DEPTH
+
+
+def dispatch_queued_ballot(queued_ballot_id):
+    dispatch_job(BALLOT_CHANNEL, {
+        "type": "process_ballot",
+        "queued_ballot": queued_ballot_id,
+    }, run_ballot_job, queued_ballot_id)
+
+
+def queue_ballot(debate, data, adjudicator=None, ip_address=None):
+    """Stores the submitted form data (a QueryDict) of a ballot set for
+    `debate`, and sends it to be processed once the current transaction is
+    committed. The caller should already have validated the data. Returns the
+    QueuedBallot."""
+    data = {key: values for key, values in data.lists() if key not in UNSTORED_FIELDS}
+    queued = QueuedBallot.objects.create(debate=debate, adjudicator=adjudicator,
+            data=data, ip_address=ip_address, dispatched=timezone.now())
+    logger.info("Queued ballot for %s", debate)
+
+    tournament_id = debate.round.tournament_id
+    transaction.on_commit(lambda: dispatch_queued_ballot(queued.id))
+    transaction.on_commit(lambda: redispatch_abandoned_ballots(tournament_id))
+    return queued
+
+
+def redispatch_abandoned_ballots(tournament_id):
+    """Sends the tournament's queued ballots to be processed again, if they
+    were last sent more than `settings.BALLOT_QUEUE_REDISPATCH_AFTER` seconds
+    ago and aren't being processed right now. This picks up ballots whose
+    worker died while processing them (which leaves them queued; see
+    `run_ballot_job()`). If a ballot was just waiting its turn, it's sent
+    twice, but only processed once."""
+    cutoff = timezone.now() - timedelta(seconds=settings.BALLOT_QUEUE_REDISPATCH_AFTER)
+    with transaction.atomic():
+        ids = list(QueuedBallot.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+                Q(dispatched__lt=cutoff) | Q(dispatched__isnull=True),
+                debate__round__tournament_id=tournament_id, status=QueuedBallot.STATUS_QUEUED,
+                ).order_by('timestamp').values_list('id', flat=True))
+        QueuedBallot.objects.filter(id__in=ids).update(dispatched=timezone.now())
+
+    for queued_ballot_id in ids:
+        logger.warning("Sending queued ballot %d to be processed again", queued_ballot_id)
+        dispatch_queued_ballot(queued_ballot_id)
+
+
+def run_ballot_job(queued_ballot_id):
+    """Processes the queued ballot, unless another worker has processed it or
+    is processing it. Returns the BallotSubmission, or None if it wasn't
+    saved.
+
+    The queued ballot is locked, and marked as done, in the same transaction
+    that saves it, so if the worker dies partway through, the transaction is
+    rolled back, and the ballot is left queued to be processed again."""
+    with _processing_slots:
+        with transaction.atomic():
+            queued = QueuedBallot.objects.select_for_update(skip_locked=True, of=('self',)).select_related(
+                    'debate__round__tournament').filter(pk=queued_ballot_id,
+                    status=QueuedBallot.STATUS_QUEUED).first()
+            if queued is None:
+                logger.info("Queued ballot %d was already processed or is being processed", queued_ballot_id)
+                return None
+            ballotsub = save_queued_ballot(queued)
+
+        if ballotsub is not None:
+            notify_queued_ballot_saved(queued, ballotsub)
+        return ballotsub
+
+
+def save_queued_ballot(queued):
+    """Saves the queued ballot as a new BallotSubmission, as the public ballot
+    entry views would have. If the data is no longer valid, or something else
+    goes wrong, marks the queued ballot as failed and returns None; otherwise
+    marks it as done and returns the BallotSubmission."""
+
+    debate = queued.debate
+    tournament = debate.round.tournament
+
+    data = QueryDict(mutable=True)
+    for key, values in queued.data.items():
+        data.setlist(key, values)
+
+    try:
+        with transaction.atomic():
+            ballotsub = BallotSubmission(debate=debate, ip_address=queued.ip_address,
+                    submitter_type=BallotSubmission.SUBMITTER_PUBLIC)
+            form = get_ballot_set_form_class(tournament, debate.round)(ballotsub, data=data)
+            if not form.is_valid():
+                logger.warning("Queued ballot for %s is no longer valid: %s", debate, form.errors.as_text())
+                _finish(queued, QueuedBallot.STATUS_FAILED, form.errors.as_text())
+                return None
+
+            ballotsub = form.save()
+            if ballotsub.confirmed:
+                ballotsub.confirm_timestamp = timezone.now()
+                ballotsub.save()
+
+    except Exception as e:
+        logger.exception("Error processing queued ballot for %s", debate)
+        _finish(queued, QueuedBallot.STATUS_FAILED, str(e))
+        return None
+
+    queued.ballot_submission = ballotsub
+    _finish(queued, QueuedBallot.STATUS_DONE)
+    return ballotsub
+
+
+def notify_queued_ballot_saved(queued, ballotsub):
+    """Logs the saved ballot and sends email receipts. Called once the ballot
+    is committed, so that they're only sent for ballots that were saved."""
+    log_ballot_submission(ballotsub, queued.ip_address)
+
+    debate = queued.debate
+    if debate.round.tournament.pref('enable_ballot_receipts'):
+        try:
+            ballots_email_generator(debate.id)
+        except (SMTPException, ConnectionError):
+            logger.exception("Error sending ballot receipts for %s", debate)
+
+
+def _finish(queued, status, error=""):
+    queued.status = status
+    queued.error = error
+    queued.processed = timezone.now()
+    queued.save()
+
+
+def log_ballot_submission(ballotsub, ip_address):
+    round = ballotsub.debate.round
+    log = ActionLogEntry.objects.log(type=ActionLogEntry.ACTION_TYPE_BALLOT_SUBMIT,
+            content_object=ballotsub, tournament=round.tournament, round=round,
+            ip_address=ip_address)
+    group_name = ActionLogEntryConsumer.group_prefix + "_" + round.tournament.slug
+    publish(group_name, log.serialize)
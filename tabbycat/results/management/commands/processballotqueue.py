@@ -0,0 +1,39 @@
+from utils.management.base import TournamentCommand
+
+from ...jobs import pending_queued_ballots, run_ballot_job
+from ...models import QueuedBallot
+
+
+class Command(TournamentCommand):
+
+    help = "Shows how many ballots submitted online are waiting to be saved, " \
+           "and saves them in this process. Use this if the ballot queue " \
+           "worker isn't running or has stopped."
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument("--status", action="store_true", default=False,
+            help="Only show the queue depth, without processing anything")
+        parser.add_argument("--retry", action="store_true", default=False,
+            help="Also retry failed ballots")
+
+    def handle_tournament(self, tournament, **options):
+        queued = QueuedBallot.objects.filter(debate__round__tournament=tournament)
+        self.stdout.write("Tournament \"{:s}\": {:d} queued, {:d} failed".format(
+            tournament.name,
+            queued.filter(status=QueuedBallot.STATUS_QUEUED).count(),
+            queued.filter(status=QueuedBallot.STATUS_FAILED).count()))
+
+        if options["status"]:
+            return
+
+        if options["retry"]:
+            queued.filter(status=QueuedBallot.STATUS_FAILED).update(status=QueuedBallot.STATUS_QUEUED, error="")
+
+        ids = pending_queued_ballots(tournament).order_by('timestamp').values_list('id', flat=True)
+        saved = 0
+        for queued_ballot_id in ids:
+            if run_ballot_job(queued_ballot_id) is not None:
+                saved += 1
+
+        self.stdout.write("Saved {:d} of {:d} queued ballots".format(saved, len(ids)))
@@ -0,0 +1,36 @@
+# Generated by Django 2.0.8 on 2018-10-13 09:41
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0007_auto_20180909_2156'),
+        ('draw', '0003_remove_debate_ballot_in'),
+        ('results', '0002_remove_ballotsubmission_copied_from'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedBallot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', django.contrib.postgres.fields.jsonb.JSONField(help_text='The submitted form data, as a dict mapping field names to lists of values', verbose_name='data')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP address')),
+                ('status', models.CharField(choices=[('Q', 'Queued'), ('P', 'Processing'), ('D', 'Done'), ('F', 'Failed')], db_index=True, default='Q', max_length=1, verbose_name='status')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='timestamp')),
+                ('processed', models.DateTimeField(blank=True, null=True, verbose_name='processed')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('adjudicator', models.ForeignKey(blank=True, help_text='The adjudicator who submitted the ballot', null=True, on_delete=django.db.models.deletion.SET_NULL, to='participants.Adjudicator', verbose_name='adjudicator')),
+                ('ballot_submission', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='results.BallotSubmission', verbose_name='ballot submission')),
+                ('debate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='draw.Debate', verbose_name='debate')),
+            ],
+            options={
+                'verbose_name': 'queued ballot',
+                'verbose_name_plural': 'queued ballots',
+            },
+        ),
+    ]
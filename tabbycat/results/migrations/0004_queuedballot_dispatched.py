@@ -0,0 +1,33 @@
+# Generated by Django 2.0.8 on 2018-10-19 11:02
+
+from django.db import migrations, models
+
+
+def requeue_processing_ballots(apps, schema_editor):
+    # Ballots are no longer marked as processing, so any that were left
+    # processing by a worker that died are queued again
+    QueuedBallot = apps.get_model('results', 'QueuedBallot')  # noqa: N806
+    QueuedBallot.objects.filter(status='P').update(status='Q')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0003_queuedballot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedballot',
+            name='dispatched',
+            field=models.DateTimeField(blank=True, help_text='When the ballot was last sent to a worker to be processed', null=True, verbose_name='dispatched'),
+        ),
+        migrations.RunPython(requeue_processing_ballots,
+            migrations.RunPython.noop,
+            elidable=True),
+        migrations.AlterField(
+            model_name='queuedballot',
+            name='status',
+            field=models.CharField(choices=[('Q', 'Queued'), ('D', 'Done'), ('F', 'Failed')], db_index=True, default='Q', max_length=1, verbose_name='status'),
+        ),
+    ]
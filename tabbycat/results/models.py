@@ -1,6 +1,7 @@
 import logging
 from threading import Lock
 
+from django.contrib.postgres.fields import JSONField
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -300,3 +301,47 @@ class SpeakerScore(models.Model):
         if self.ballot_submission.debate != self.debate_team.debate:
             raise ValidationError(_("The ballot submission and debate team must "
                     "relate to the same debate."))
+
+
+class QueuedBallot(models.Model):
+    """A ballot set submitted online that has been validated and acknowledged,
+    but not yet saved. The submitted form data is kept here until a worker
+    saves it as a BallotSubmission. See `results.jobs`."""
+
+    STATUS_QUEUED = 'Q'
+    STATUS_DONE = 'D'
+    STATUS_FAILED = 'F'
+    STATUS_CHOICES = ((STATUS_QUEUED, _("Queued")),
+                      (STATUS_DONE, _("Done")),
+                      (STATUS_FAILED, _("Failed")), )
+
+    debate = models.ForeignKey('draw.Debate', models.CASCADE,
+        verbose_name=_("debate"))
+    adjudicator = models.ForeignKey('participants.Adjudicator', models.SET_NULL, blank=True, null=True,
+        verbose_name=_("adjudicator"),
+        help_text=_("The adjudicator who submitted the ballot"))
+    data = JSONField(
+        verbose_name=_("data"),
+        help_text=_("The submitted form data, as a dict mapping field names to lists of values"))
+    ip_address = models.GenericIPAddressField(blank=True, null=True,
+        verbose_name=_("IP address"))
+    status = models.CharField(max_length=1, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True,
+        verbose_name=_("status"))
+    timestamp = models.DateTimeField(auto_now_add=True,
+        verbose_name=_("timestamp"))
+    dispatched = models.DateTimeField(blank=True, null=True,
+        verbose_name=_("dispatched"),
+        help_text=_("When the ballot was last sent to a worker to be processed"))
+    processed = models.DateTimeField(blank=True, null=True,
+        verbose_name=_("processed"))
+    ballot_submission = models.OneToOneField(BallotSubmission, models.SET_NULL, blank=True, null=True,
+        verbose_name=_("ballot submission"))
+    error = models.TextField(blank=True,
+        verbose_name=_("error"))
+
+    class Meta:
+        verbose_name = _("queued ballot")
+        verbose_name_plural = _("queued ballots")
+
+    def __str__(self):
+        return "[{0.id}] Queued ballot for {0.debate!s} ({0.status})".format(self)
@@ -1,5 +1,7 @@
 """Functions that prefetch data for efficiency."""
 
+from django.db.models import Prefetch, prefetch_related_objects
+
 from adjallocation.models import DebateAdjudicator
 from checkins.utils import get_checkins
 from draw.models import DebateTeam
@@ -70,7 +72,7 @@ def populate_checkins(debates, tournament):
     get_checkins(debates, tournament, None)
 
 
-def populate_results(ballotsubs):
+def populate_results(ballotsubs, tournament=None):
     """Populates the `_result` attribute of each BallotSubmission in
     `ballotsubs` with a populated VotingDebateResult instance.
 
@@ -78,94 +80,167 @@ def populate_results(ballotsubs):
     debates prefetched (using select_related).
     """
 
-    # If the database is correct, some of the checks like `result.is_voting`,
-    # `result.uses_speakers` etc. should be redundant. But it's best not to
-    # assume this, so we always check these before calling a method that only
-    # exists in some DebateResult subclasses.
-
     if not ballotsubs:
         return
 
-    tournament = Tournament.objects.get(round__debate__ballotsubmission=ballotsubs[0])
-    positions = tournament.positions
-    sides = tournament.sides
+    if tournament is None:
+        tournament = Tournament.objects.get(round__debate__ballotsubmission=ballotsubs[0])
     ballotsubs = list(ballotsubs)  # set ballotsubs in stone to avoid race conditions in later queries
 
-    results_by_debate_id = {}
-    results_by_ballotsub_id = {}
+    debateteams = DebateTeam.objects.filter(
+        debate__ballotsubmission__in=ballotsubs,
+        side__in=tournament.sides
+    ).select_related('team').distinct()
+
+    debateadjs = DebateAdjudicator.objects.filter(
+        debate__ballotsubmission__in=ballotsubs
+    ).exclude(
+        type=DebateAdjudicator.TYPE_TRAINEE
+    ).select_related('adjudicator').distinct()
 
-    # Create the DebateResults
+    _populate_results(ballotsubs, tournament, debateteams, debateadjs)
+
+
+def populate_debate_results(debate, ballotsubs):
+    """Populates the `_result` attribute of each BallotSubmission in
+    `ballotsubs`, which must all be from `debate`, e.g. all versions of the
+    ballot for that debate.
+
+    This uses `debate` as the debate of every ballot submission, so that its
+    teams and adjudicators are loaded just once, and loads the results of all
+    versions in a fixed number of queries (at most four, plus one for the
+    ballot submissions themselves), however many versions there are. For best
+    performance, `debate` should already have `round__tournament` selected.
+    """
+
+    ballotsubs = list(ballotsubs)
+    if not ballotsubs:
+        return
+
+    tournament = debate.round.tournament
     for ballotsub in ballotsubs:
-        result = DebateResult(ballotsub, load=False)
-        result.init_blank_buffer()
+        ballotsub.debate = debate
+
+    prefetch_related_objects([debate],
+        Prefetch('debateteam_set', queryset=DebateTeam.objects.select_related('team')),
+        Prefetch('debateadjudicator_set', queryset=DebateAdjudicator.objects.select_related('adjudicator')))
+
+    debateteams = [dt for dt in debate.debateteam_set.all() if dt.side in tournament.sides]
+    debateadjs = [da for da in debate.debateadjudicator_set.all() if da.type != DebateAdjudicator.TYPE_TRAINEE]
 
+    _populate_results(ballotsubs, tournament, debateteams, debateadjs)
+
+
+def load_debate_result(result):
+    """Populates the buffers of `result`, an unloaded DebateResult, from the
+    database. This is what `BaseDebateResult.full_load()` uses, so that single
+    results are loaded by the same queries as results loaded in bulk.
+
+    Unlike `populate_debate_results()`, this doesn't prefetch anything onto the
+    debate, because callers often change the debate's teams or adjudicators
+    and then load a fresh result for it."""
+
+    debateteams = DebateTeam.objects.filter(debate=result.debate,
+            side__in=result.sides).select_related('team')
+    debateadjs = DebateAdjudicator.objects.filter(debate=result.debate).exclude(
+            type=DebateAdjudicator.TYPE_TRAINEE).select_related('adjudicator')
+    _load_results([result], result.tournament, debateteams, debateadjs)
+
+
+def _populate_results(ballotsubs, tournament, debateteams, debateadjs):
+    """Creates and populates a DebateResult for each ballot submission, given
+    the debate teams and (non-trainee) debate adjudicators of all of their
+    debates."""
+
+    results = []
+    for ballotsub in ballotsubs:
+        result = DebateResult(ballotsub, load=False, tournament=tournament)
         ballotsub._result = result
-        results_by_debate_id.setdefault(ballotsub.debate_id, []).append(result)
-        results_by_ballotsub_id[ballotsub.id] = result
+        results.append(result)
 
-    # Populate debateteams (load_debateteams)
-    debateteams = DebateTeam.objects.filter(
-        debate__ballotsubmission__in=ballotsubs,
-        side__in=sides
-    ).select_related('team').distinct()
+    _load_results(results, tournament, debateteams, debateadjs)
 
-    for dt in debateteams:
-        for result in results_by_debate_id[dt.debate_id]:
-            result.debateteams[dt.side] = dt
 
-    # Populate speaker positions (load_speakers)
-    speakerscores = SpeakerScore.objects.filter(
-        ballot_submission__in=ballotsubs,
-        debate_team__side__in=sides,
-        position__in=positions
-    ).select_related('debate_team')
+def _load_results(results, tournament, debateteams, debateadjs):
+    """Populates the buffers of each of `results`, given the debate teams and
+    (non-trainee) debate adjudicators of all of their debates. Scores are only
+    queried if some result uses them, and `debateadjs` is only evaluated if
+    some result is a voting result. Teams and speakers aren't loaded for
+    debates whose sides aren't confirmed."""
 
-    for ss in speakerscores:
-        result = results_by_ballotsub_id[ss.ballot_submission_id]
-        result.speakers[ss.debate_team.side][ss.position] = ss.speaker
-        result.ghosts[ss.debate_team.side][ss.position] = ss.ghost
+    # If the database is correct, some of the checks like `result.is_voting`,
+    # `result.uses_speakers` etc. should be redundant. But it's best not to
+    # assume this, so we always check these before calling a method that only
+    # exists in some DebateResult subclasses.
 
-        if not result.is_voting:
-            result.set_score(ss.debate_team.side, ss.position, ss.score)
+    positions = tournament.positions
+    sides = tournament.sides
 
-    # Populate scoresheets (load_scoresheets)
+    results_by_debate_id = {}
+    results_by_ballotsub_id = {}
+    for result in results:
+        result.init_blank_buffer()
+        results_by_debate_id.setdefault(result.debate.id, []).append(result)
+        results_by_ballotsub_id[result.ballotsub.id] = result
 
-    debateadjs = DebateAdjudicator.objects.filter(
-        debate__ballotsubmission__in=ballotsubs
-    ).exclude(
-        type=DebateAdjudicator.TYPE_TRAINEE
-    ).select_related('adjudicator').distinct()
+    ballotsubs = [result.ballotsub for result in results]
 
-    for da in debateadjs:
-        for result in results_by_debate_id[da.debate_id]:
-            if result.is_voting:
-                result.debateadjs[da.adjudicator] = da
-                result.scoresheets[da.adjudicator] = result.scoresheet_class(positions)
-
-    ssbas = SpeakerScoreByAdj.objects.filter(
-        ballot_submission__in=ballotsubs,
-        debate_team__side__in=sides,
-        position__in=positions
-    ).select_related('debate_adjudicator__adjudicator', 'debate_team')
-
-    for ssba in ssbas:
-        result = results_by_ballotsub_id[ssba.ballot_submission_id]
-        if result.is_voting:
-            result.set_score(ssba.debate_adjudicator.adjudicator, ssba.debate_team.side,
-                ssba.position, ssba.score)
-
-    # Populate advancing (load_advancing)
-    teamscores = TeamScore.objects.filter(
-        ballot_submission__in=ballotsubs,
-        debate_team__side__in=sides
-    ).select_related('debate_team')
-
-    for ts in teamscores:
-        result = results_by_ballotsub_id[ts.ballot_submission_id]
-        if result.uses_advancing and ts.win:
-            result.advancing.append(ts.debate_team.side)
+    # Populate debateteams
+    for dt in debateteams:
+        for result in results_by_debate_id[dt.debate_id]:
+            if result.debate.sides_confirmed:
+                result.debateteams[dt.side] = dt
+
+    # Populate speaker positions, and scores for consensus results
+    if any(result.uses_speakers for result in results):
+        speakerscores = SpeakerScore.objects.filter(
+            ballot_submission__in=ballotsubs,
+            debate_team__side__in=sides,
+            position__in=positions
+        ).select_related('debate_team', 'speaker')
+
+        for ss in speakerscores:
+            result = results_by_ballotsub_id[ss.ballot_submission_id]
+            if result.debate.sides_confirmed:
+                result.speakers[ss.debate_team.side][ss.position] = ss.speaker
+                result.ghosts[ss.debate_team.side][ss.position] = ss.ghost
+
+            if not result.is_voting:
+                result.set_score(ss.debate_team.side, ss.position, ss.score)
+
+    # Populate scoresheets for voting results
+    if any(result.is_voting for result in results):
+        for da in debateadjs:
+            for result in results_by_debate_id[da.debate_id]:
+                if result.is_voting:
+                    result.debateadjs[da.adjudicator] = da
+                    result.scoresheets[da.adjudicator] = result.scoresheet_class(positions)
+
+        ssbas = SpeakerScoreByAdj.objects.filter(
+            ballot_submission__in=ballotsubs,
+            debate_team__side__in=sides,
+            position__in=positions
+        ).select_related('debate_adjudicator__adjudicator', 'debate_team')
+
+        for ssba in ssbas:
+            result = results_by_ballotsub_id[ssba.ballot_submission_id]
+            if result.is_voting and ssba.debate_adjudicator.adjudicator in result.scoresheets:
+                result.set_score(ssba.debate_adjudicator.adjudicator, ssba.debate_team.side,
+                    ssba.position, ssba.score)
+
+    # Populate advancing teams
+    if any(result.uses_advancing for result in results):
+        teamscores = TeamScore.objects.filter(
+            ballot_submission__in=ballotsubs,
+            debate_team__side__in=sides
+        ).select_related('debate_team')
+
+        for ts in teamscores:
+            result = results_by_ballotsub_id[ts.ballot_submission_id]
+            if result.uses_advancing and ts.win:
+                result.advancing.append(ts.debate_team.side)
 
     # Finally, check that everything is in order
 
-    for ballotsub in ballotsubs:
-        ballotsub.result.assert_loaded()
+    for result in results:
+        result.assert_loaded()
@@ -42,8 +42,10 @@ import logging
 from functools import wraps
 from statistics import mean
 
+from django.db import transaction
+from django.db.models import Case, Value, When
+
 from adjallocation.allocation import AdjudicatorAllocation
-from adjallocation.models import DebateAdjudicator
 
 from .scoresheet import get_scoresheet_class
 from .utils import side_and_position_names
@@ -55,6 +57,73 @@ class ResultError(RuntimeError):
     pass
 
 
+def bulk_save_related(manager, key_fields, rows):
+    """Saves `rows` to the objects in the related manager `manager` (e.g.
+    `ballotsub.speakerscore_set`), in a constant number of queries.
+
+    `key_fields` is a tuple of field attribute names (e.g. `('debate_team_id',
+    'position')`) that, together with the manager's relation, identify an
+    object. `rows` is a dict mapping tuples of values of those fields to dicts
+    of the values to save to other fields (also by attribute name), like the
+    `defaults` argument of `update_or_create()`.
+
+    This loads the existing objects in one query, creates those that don't
+    exist in one `bulk_create()`, and updates those that differ from `rows` in
+    one `UPDATE` query. Other existing objects are left alone. Like other bulk
+    operations, this doesn't send `pre_save` or `post_save` signals.
+    Returns the number of objects created or updated."""
+
+    model = manager.model
+    existing = {}
+    for obj in manager.filter(**{key_fields[0] + '__in': {key[0] for key in rows}}):
+        existing[tuple(getattr(obj, f) for f in key_fields)] = obj
+
+    to_create = []
+    to_update = []
+    for key, values in rows.items():
+        obj = existing.get(key)
+        if obj is None:
+            obj = model(**dict(zip(key_fields, key)), **values)
+            setattr(obj, manager.field.attname, manager.instance.pk)
+            to_create.append(obj)
+        elif any(getattr(obj, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(obj, field, value)
+            to_update.append(obj)
+
+    if to_create:
+        model.objects.bulk_create(to_create)
+
+    if to_update:
+        # Django 2.0 has no bulk_update(), so do what it does: one UPDATE with
+        # a CASE expression for each field.
+        updates = {}
+        for field_name in rows[next(iter(rows))]:
+            field = model._meta.get_field(field_name)
+            output_field = field.target_field if field.is_relation else field
+            updates[field.attname] = Case(*[When(pk=obj.pk, then=Value(getattr(obj, field.attname),
+                output_field=output_field)) for obj in to_update], output_field=output_field)
+        model.objects.filter(pk__in=[obj.pk for obj in to_update]).update(**updates)
+
+    return len(to_create) + len(to_update)
+
+
+def notify_scores_saved(ballotsub):
+    """Updates the standings after the scores of a ballot are saved. There are
+    no signal receivers for individual team and speaker scores, since a ballot
+    has many of them, so whatever saves a ballot's scores should call this once
+    when it's done."""
+    from standings.aggregates import update_speaker_score_aggregates_for_debate  # avoid circular import
+    from standings.exports import clear_public_tab_exports
+    from standings.snapshots import clear_team_standings_snapshots
+
+    round = ballotsub.debate.round
+    clear_public_tab_exports(round.tournament_id)
+    if ballotsub.confirmed:
+        clear_team_standings_snapshots(round)
+        update_speaker_score_aggregates_for_debate(ballotsub.debate_id)
+
+
 def DebateResult(ballotsub, *args, **kwargs):  # noqa: N802 (factory function)
     """Factory function. Returns an instance of a subclass of BaseDebateResult
     appropriate for the ballot submission's tournament's settings.
@@ -95,12 +164,14 @@ class BaseDebateResult:
     The base class implements management of debate teams, side allocations and
     team score saving.
 
-    The loading process calls three functions in turn:
+    The loading process (`self.full_load()`) has three steps:
       - First, it calls `self.init_blank_buffer()`, which should initialize
         "blank" buffers for all information that it stores to eventually be
         saved to the database.
-      - Then, it calls `self.load_from_db()`, which reads the database and
-        populates the buffers accordingly.
+      - Then, it reads the database and populates the buffers accordingly.
+        This is done by `prefetch.load_debate_result()`, which shares its
+        queries with `prefetch.populate_results()`, so that results are loaded
+        the same way whether they're loaded one at a time or in bulk.
       - Finally, it calls, `self.assert_loaded()`, which verifies that the
         buffers are of the correct form, and raises an `AssertionError` if they
         are not. (It does not check for completeness, only form.)
@@ -112,8 +183,8 @@ class BaseDebateResult:
     BallotSubmission instances must have been saved to the database before the
     debate result is saved.
 
-    Subclasses should extend these functions as necessary to accommodate the
-    additional buffers they add to the class.
+    Subclasses should extend these functions (and `prefetch._load_results()`)
+    as necessary to accommodate the additional buffers they add to the class.
 
     Subclasses should implement a `teamscorefield_<fieldname>` method for each
     field of TeamScore that is relevant to them, for example,
@@ -163,9 +234,10 @@ class BaseDebateResult:
     # --------------------------------------------------------------------------
 
     def full_load(self):
-        self.init_blank_buffer()
-        self.load_from_db()
-        self.assert_loaded()
+        """Initializes the buffers, loads them from the database and checks
+        them, as described in the class docstring."""
+        from .prefetch import load_debate_result  # avoid circular import
+        load_debate_result(self)
 
     def init_blank_buffer(self):
         """Initialises the data attributes. External initialisers might find
@@ -208,48 +280,47 @@ class BaseDebateResult:
 
     def identical(self, other):
         """Returns True of all fields are the same as those in `other`."""
-        if self.debateteams != other.debateteams:
-            return False
-        return True
+        return self.identity_key() == other.identity_key()
+
+    def identity_key(self):
+        """Returns a hashable tuple of all fields, such that two results are
+        identical if and only if their identity keys are equal. This allows
+        identical results to be found by hashing, rather than by comparing
+        every pair. Subclasses should extend this method as necessary."""
+        return tuple(None if self.debateteams[side] is None else self.debateteams[side].pk
+                for side in self.sides)
 
     # --------------------------------------------------------------------------
-    # Load and save methods
+    # Save methods
     # --------------------------------------------------------------------------
 
-    def load_from_db(self):
-        """Populates the buffer from the database. Subclasses should extend this
-        method as necessary."""
-        self.load_debateteams()
-
-    def load_debateteams(self):
-
-        if not self.debate.sides_confirmed:
-            return  # don't load if sides aren't confirmed
-
-        debateteams = self.debate.debateteam_set.filter(
-                side__in=self.sides).select_related('team')
-
-        for dt in debateteams:
-            self.debateteams[dt.side] = dt
-
     def save(self):
-        """Saves to the database.
+        """Saves to the database, in a constant number of queries.
         Raises ResultError if the ballot set is incomplete or invalid."""
 
         if not self.is_valid():
             raise ResultError("Tried to save an invalid result.")
 
-        for side in self.sides:
-            dt = self.debateteams[side]
+        with transaction.atomic():
+            changed = self.save_scores()
+        if changed:
+            notify_scores_saved(self.ballotsub)
+
+    def save_scores(self):
+        """Saves the scores in the buffer using `bulk_save_related()`, and
+        returns the number of objects created or updated. Subclasses should
+        extend this method as necessary."""
 
+        teamscores = {}
+        for side in self.sides:
             teamscorefields = {}
             for field in self.TEAMSCORE_FIELDS:
                 get_field = getattr(self, 'teamscorefield_%s' % field, None)
                 if get_field is not None:
                     teamscorefields[field] = get_field(side)
+            teamscores[(self.debateteams[side].id,)] = teamscorefields
 
-            self.ballotsub.teamscore_set.update_or_create(debate_team=dt,
-                    defaults=teamscorefields)
+        return bulk_save_related(self.ballotsub.teamscore_set, ('debate_team_id',), teamscores)
 
     # --------------------------------------------------------------------------
     # Data setting and retrieval
@@ -261,7 +332,8 @@ class BaseDebateResult:
         DebateTeam instance in this debate. (Sides are saved immediately to
         enable the use of side keys to refer to teams.)"""
 
-        debateteams_by_team = {dt.team: dt for dt in self.debate.debateteam_set.filter(team__in=teams)}
+        debateteams_by_team = {dt.team: dt for dt in
+                self.debate.debateteam_set.filter(team__in=teams).select_related('team')}
         for side, team in zip(self.sides, teams):
             try:
                 debateteam = debateteams_by_team[team]
@@ -269,12 +341,12 @@ class BaseDebateResult:
                 raise ValueError("Team %s is not in debate %s" % (team, self.debate))
             debateteam.side = side
             debateteam.save()
+            self.debateteams[side] = debateteam
 
         self.debate.sides_confirmed = True
         self.debate.save()
 
         self.debate._populate_teams()  # refresh
-        self.load_debateteams()  # refresh
 
 
 class BaseDebateResultWithSpeakers(BaseDebateResult):
@@ -322,49 +394,29 @@ class BaseDebateResultWithSpeakers(BaseDebateResult):
             return False
         return True
 
-    def identical(self, other):
-        if not super().identical(other):
-            return False
-        if self.speakers != other.speakers:
-            return False
-        if self.ghosts != other.ghosts:
-            return False
-        return True
+    def identity_key(self):
+        speakers = tuple(None if self.speakers[s][p] is None else self.speakers[s][p].pk
+                for s in self.sides for p in self.positions)
+        ghosts = tuple(self.ghosts[s][p] for s in self.sides for p in self.positions)
+        return super().identity_key() + (speakers, ghosts)
 
     # --------------------------------------------------------------------------
-    # Load and save methods
+    # Save methods
     # --------------------------------------------------------------------------
 
-    def load_from_db(self):
-        super().load_from_db()
-        self.load_speakers()
-
-    def load_speakers(self):
-        """Loads team and speaker identities from the database into the buffer."""
-
-        if not self.debate.sides_confirmed:
-            return  # don't load if sides aren't confirmed
-
-        speakerscores = self.ballotsub.speakerscore_set.filter(
-            debate_team__side__in=self.sides,
-            position__in=self.positions,
-        ).select_related('speaker', 'debate_team')
-
-        for ss in speakerscores:
-            self.speakers[ss.debate_team.side][ss.position] = ss.speaker
-            self.ghosts[ss.debate_team.side][ss.position] = ss.ghost
-
-    def save(self):
-        super().save()
+    def save_scores(self):
+        changed = super().save_scores()
 
+        speakerscores = {}
         for side in self.sides:
             dt = self.debateteams[side]
             for pos in self.positions:
                 speaker = self.speakers[side][pos]
-                is_ghost = self.ghosts[side][pos]
-                score = self.get_speaker_score(side, pos)
-                self.ballotsub.speakerscore_set.update_or_create(debate_team=dt,
-                    position=pos, defaults=dict(speaker=speaker, score=score, ghost=is_ghost))
+                speakerscores[(dt.id, pos)] = dict(speaker_id=speaker.id if speaker else None,
+                    score=self.get_speaker_score(side, pos), ghost=self.ghosts[side][pos])
+
+        return changed + bulk_save_related(self.ballotsub.speakerscore_set,
+                ('debate_team_id', 'position'), speakerscores)
 
     # --------------------------------------------------------------------------
     # Data setting and retrieval
@@ -479,50 +531,27 @@ class VotingDebateResult(BaseDebateResultWithSpeakers):
     def is_valid(self):
         return super().is_valid() and all(sheet.is_valid() for sheet in self.scoresheets.values())
 
-    def identical(self, other):
-        if not super().identical(other):
-            return False
-        if not set(self.scoresheets.keys()) == set(other.scoresheets.keys()):
-            return False
-        for adj, other_sheet in other.scoresheets.items():
-            if not self.scoresheets[adj].identical(other_sheet):
-                return False
-        return True
+    def identity_key(self):
+        scoresheets = tuple(sorted((adj.pk, sheet.identity_key()) for adj, sheet in self.scoresheets.items()))
+        return super().identity_key() + (scoresheets,)
 
     # --------------------------------------------------------------------------
-    # Load and save methods
+    # Save methods
     # --------------------------------------------------------------------------
 
-    def load_from_db(self):
-        super().load_from_db()
-        self.load_scoresheets()
-
-    def load_scoresheets(self):
-        debateadjs = self.debate.debateadjudicator_set.exclude(type=DebateAdjudicator.TYPE_TRAINEE)
-        self.debateadjs = {da.adjudicator: da for da in debateadjs}
-        self.scoresheets = {adj: self.scoresheet_class(self.positions) for adj in self.debateadjs.keys()}
-
-        speakerscorebyadjs = self.ballotsub.speakerscorebyadj_set.filter(
-            debate_adjudicator__in=debateadjs,
-            debate_team__side__in=self.sides,
-            position__in=self.positions,
-        ).select_related('debate_adjudicator__adjudicator', 'debate_team')
-
-        for ssba in speakerscorebyadjs:
-            self.set_score(ssba.debate_adjudicator.adjudicator,
-                    ssba.debate_team.side, ssba.position, ssba.score)
+    def save_scores(self):
+        changed = super().save_scores()
 
-    def save(self):
-        super().save()
-
-        for adj, sheet in self.scoresheets.items():
+        speakerscorebyadjs = {}
+        for adj in self.scoresheets:
             da = self.debateadjs[adj]
             for side in self.sides:
                 dt = self.debateteams[side]
                 for pos in self.positions:
-                    self.ballotsub.speakerscorebyadj_set.update_or_create(
-                        debate_team=dt, debate_adjudicator=da, position=pos,
-                        defaults=dict(score=self.get_score(adj, side, pos)))
+                    speakerscorebyadjs[(da.id, dt.id, pos)] = dict(score=self.get_score(adj, side, pos))
+
+        return changed + bulk_save_related(self.ballotsub.speakerscorebyadj_set,
+                ('debate_adjudicator_id', 'debate_team_id', 'position'), speakerscorebyadjs)
 
     # --------------------------------------------------------------------------
     # Data setting and retrieval
@@ -714,35 +743,8 @@ class BaseConsensusDebateResultWithSpeakers(BaseDebateResultWithSpeakers):
     def is_valid(self):
         return super().is_valid() and self.scoresheet.is_valid()
 
-    def identical(self, other):
-        return super().identical(other) and self.scoresheet.identical(other.scoresheet)
-
-    # --------------------------------------------------------------------------
-    # Load and save methods
-    # --------------------------------------------------------------------------
-
-    def load_from_db(self):
-        super().load_from_db()
-        self.load_scoresheet()
-
-    def load_scoresheet(self):
-        speakerscores = self.ballotsub.speakerscore_set.filter(
-            debate_team__side__in=self.sides,
-            position__in=self.positions
-        ).select_related('debate_team')
-
-        for ss in speakerscores:
-            self.set_score(ss.debate_team.side, ss.position, ss.score)
-
-    def save(self):
-        super().save()
-
-        for side in self.sides:
-            dt = self.debateteams[side]
-            for pos in self.positions:
-                self.ballotsub.speakerscore_set.update_or_create(
-                    debate_team=dt, position=pos,
-                    defaults=dict(score=self.get_score(side, pos)))
+    def identity_key(self):
+        return super().identity_key() + (self.scoresheet.identity_key(),)
 
     # --------------------------------------------------------------------------
     # Data setting and retrieval
@@ -834,26 +836,8 @@ class BPEliminationDebateResult(BaseDebateResult):
             return False
         return all(x in self.sides for x in self.advancing)
 
-    def identical(self, other):
-        if not super().identical(other):
-            return False
-        if self.advancing != other.advancing:
-            return False
-        return True
-
-    # --------------------------------------------------------------------------
-    # Load and save methods
-    # --------------------------------------------------------------------------
-
-    def load_from_db(self):
-        super().load_from_db()
-        self.load_advancing()
-
-    def load_advancing(self):
-        queryset = self.ballotsub.teamscore_set.filter(
-            debate_team__side__in=self.sides, win=True
-        ).values_list('debate_team__side', flat=True)
-        self.advancing = list(queryset)
+    def identity_key(self):
+        return super().identity_key() + (tuple(self.advancing),)
 
     # --------------------------------------------------------------------------
     # Data setting and retrieval
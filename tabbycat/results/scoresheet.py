@@ -36,8 +36,13 @@ class BaseScoresheet:
         return self.is_complete()
 
     def identical(self, other):
-        """Base implementation. Does nothing."""
-        return True
+        return self.identity_key() == other.identity_key()
+
+    def identity_key(self):
+        """Returns a hashable tuple of the scoresheet's contents, such that two
+        scoresheets are identical if and only if their keys are equal. Base
+        implementation. Subclasses should extend this method as necessary."""
+        return ()
 
 
 class ScoresMixin:
@@ -68,8 +73,8 @@ class ScoresMixin:
             return None
         return sum(scores)
 
-    def identical(self, other):
-        return super().identical(other) and self.scores == other.scores
+    def identity_key(self):
+        return super().identity_key() + tuple(self.scores[s][p] for s in self.sides for p in self.positions)
 
 
 class DeclaredWinnerMixin:
@@ -90,8 +95,8 @@ class DeclaredWinnerMixin:
     def get_declared_winner(self):
         return self.declared_winner
 
-    def identical(self, other):
-        return super().identical(other) and self.declared_winner == other.declared_winner
+    def identity_key(self):
+        return super().identity_key() + (self.declared_winner,)
 
 
 class BaseTwoTeamScoresheet(BaseScoresheet):
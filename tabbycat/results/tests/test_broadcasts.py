@@ -0,0 +1,125 @@
+import threading
+import time
+import unittest
+
+from utils.broadcasts import BroadcastBatcher
+
+
+class RecordingSender:
+    """Fake `send` for BroadcastBatcher, which records each batch along with
+    when and in which thread it was sent."""
+
+    def __init__(self):
+        self.sent = []
+        self.condition = threading.Condition()
+
+    def __call__(self, group_name, items):
+        with self.condition:
+            self.sent.append((group_name, list(items), time.monotonic(), threading.current_thread()))
+            self.condition.notify_all()
+
+    def wait_for(self, n, timeout=5):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.sent) >= n, timeout)
+            return [(group_name, items) for group_name, items, sent_at, thread in self.sent]
+
+
+class TestBroadcastBatcher(unittest.TestCase):
+
+    window = 0.1
+
+    def setUp(self):
+        self.sender = RecordingSender()
+        self.batcher = BroadcastBatcher(self.window, self.sender)
+
+    def tearDown(self):
+        self.batcher.flush()
+
+    def test_batches_per_group(self):
+        self.batcher.publish("ballots", 1)
+        self.batcher.publish("actionlog", "a")
+        self.batcher.publish("ballots", 2)
+        self.batcher.publish("actionlog", "b")
+        self.batcher.publish("ballots", 3)
+        self.assertEqual(self.sender.wait_for(2), [("ballots", [1, 2, 3]), ("actionlog", ["a", "b"])])
+
+    def test_sent_after_window(self):
+        published_at = time.monotonic()
+        self.batcher.publish("ballots", 1)
+        self.assertEqual(self.sender.sent, [])
+        self.sender.wait_for(1)
+
+        group_name, items, sent_at, thread = self.sender.sent[0]
+        self.assertGreaterEqual(sent_at - published_at, self.window)
+        self.assertIsNot(thread, threading.current_thread())
+
+    def test_window_starts_at_first_event(self):
+        self.batcher.publish("ballots", 1)
+        time.sleep(self.window / 2)
+        self.batcher.publish("ballots", 2)
+        self.assertEqual(self.sender.wait_for(1), [("ballots", [1, 2])])
+
+        # Events after a batch is sent go in a new batch
+        self.batcher.publish("ballots", 3)
+        self.assertEqual(self.sender.wait_for(2), [("ballots", [1, 2]), ("ballots", [3])])
+
+    def test_groups_sent_in_order_of_first_event(self):
+        for i, group_name in enumerate(["c", "a", "b", "a", "c"]):
+            self.batcher.publish(group_name, i)
+        self.assertEqual(self.sender.wait_for(3), [("c", [0, 4]), ("a", [1, 3]), ("b", [2])])
+
+    def test_flush(self):
+        self.batcher.publish("ballots", 1)
+        self.batcher.publish("actionlog", "a")
+        self.batcher.flush()
+        self.assertEqual(self.sender.wait_for(2, timeout=0), [("ballots", [1]), ("actionlog", ["a"])])
+        self.assertTrue(all(thread is threading.current_thread() for *_, thread in self.sender.sent))
+
+        # Nothing is sent twice, and events after flushing are still sent
+        self.batcher.publish("ballots", 2)
+        self.assertEqual(self.sender.wait_for(3), [("ballots", [1]), ("actionlog", ["a"]), ("ballots", [2])])
+
+    def test_flush_waits_for_batch_being_sent(self):
+        sending = threading.Event()
+        release = threading.Event()
+        active = []
+        concurrent = []
+
+        def send(group_name, items):
+            active.append(group_name)
+            if len(active) > 1:
+                concurrent.append(list(active))
+            if group_name == "slow":
+                sending.set()
+                release.wait(5)
+            active.remove(group_name)
+            self.sender(group_name, items)
+
+        self.batcher.send = send
+        self.batcher.publish("slow", 1)
+        self.assertTrue(sending.wait(5))
+        self.batcher.publish("ballots", 2)
+
+        flusher = threading.Thread(target=self.batcher.flush)
+        flusher.start()
+        time.sleep(self.window / 2)
+        self.assertTrue(flusher.is_alive())
+        release.set()
+        flusher.join(5)
+
+        self.assertFalse(flusher.is_alive())
+        self.assertEqual(concurrent, [])
+        self.assertEqual(self.sender.wait_for(2, timeout=0), [("slow", [1]), ("ballots", [2])])
+
+    def test_send_error_doesnt_stop_thread(self):
+        def send(group_name, items):
+            if group_name == "broken":
+                raise RuntimeError("channel layer unavailable")
+            self.sender(group_name, items)
+
+        self.batcher.send = send
+        with self.assertLogs('utils.broadcasts', 'ERROR'):
+            self.batcher.publish("broken", 1)
+            time.sleep(self.window * 2)
+        self.batcher.publish("ballots", 2)
+        self.assertEqual(self.sender.wait_for(1), [("ballots", [2])])
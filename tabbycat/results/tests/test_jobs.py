@@ -0,0 +1,100 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db.models import Model
+from django.http import QueryDict
+from django.test import override_settings, TestCase
+from django.utils import timezone
+
+from utils.tests import CompletedTournamentTestMixin
+
+from ..forms import get_ballot_set_form_class
+from ..jobs import is_ballot_queue_full, queue_ballot, redispatch_abandoned_ballots, run_ballot_job
+from ..models import BallotSubmission, QueuedBallot
+
+
+class TestBallotQueue(CompletedTournamentTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.original = BallotSubmission.objects.filter(debate__round__tournament=self.tournament,
+                confirmed=True).select_related('debate__round').first()
+        self.debate = self.original.debate
+
+    def get_form_data(self):
+        """Returns the data that would be submitted if the form for the
+        original ballot were submitted unchanged."""
+        form = get_ballot_set_form_class(self.tournament, self.debate.round)(self.original)
+        data = QueryDict(mutable=True)
+        for name, field in form.fields.items():
+            value = form.initial.get(name, field.initial)
+            if value is None or value is False:
+                continue
+            if isinstance(value, Model):
+                value = value.pk
+            data[name] = "on" if value is True else str(value)
+        data['csrfmiddlewaretoken'] = "token"
+        return data
+
+    def test_queued_ballot_saved(self):
+        queued = queue_ballot(self.debate, self.get_form_data(), ip_address="127.0.0.1")
+        self.assertNotIn('csrfmiddlewaretoken', queued.data)
+
+        ballotsub = run_ballot_job(queued.id)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, QueuedBallot.STATUS_DONE)
+        self.assertEqual(queued.ballot_submission, ballotsub)
+        self.assertEqual(ballotsub.submitter_type, BallotSubmission.SUBMITTER_PUBLIC)
+        self.assertEqual(ballotsub.version, self.debate.ballotsubmission_set.count())
+        self.assertTrue(BallotSubmission.objects.get(pk=ballotsub.pk).result.identical(self.original.result))
+
+    def test_queued_ballot_processed_once(self):
+        queued = queue_ballot(self.debate, self.get_form_data(), ip_address="127.0.0.1")
+        nballotsubs = self.debate.ballotsubmission_set.count()
+        self.assertIsNotNone(run_ballot_job(queued.id))
+        self.assertIsNone(run_ballot_job(queued.id))
+        self.assertEqual(self.debate.ballotsubmission_set.count(), nballotsubs + 1)
+
+    def test_invalid_queued_ballot_fails(self):
+        data = self.get_form_data()
+        del data['debate_result_status']
+        queued = queue_ballot(self.debate, data, ip_address="127.0.0.1")
+        nballotsubs = self.debate.ballotsubmission_set.count()
+
+        self.assertIsNone(run_ballot_job(queued.id))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, QueuedBallot.STATUS_FAILED)
+        self.assertIn('debate_result_status', queued.error)
+        self.assertEqual(self.debate.ballotsubmission_set.count(), nballotsubs)
+
+    @override_settings(BALLOT_QUEUE_MAX_DEPTH=2)
+    def test_queue_full(self):
+        data = self.get_form_data()
+        queue_ballot(self.debate, data, ip_address="127.0.0.1")
+        self.assertFalse(is_ballot_queue_full(self.tournament))
+        queued = queue_ballot(self.debate, data, ip_address="127.0.0.1")
+        self.assertTrue(is_ballot_queue_full(self.tournament))
+        run_ballot_job(queued.id)
+        self.assertFalse(is_ballot_queue_full(self.tournament))
+
+    @override_settings(BALLOT_QUEUE_REDISPATCH_AFTER=60)
+    def test_abandoned_ballot_redispatched(self):
+        data = self.get_form_data()
+        abandoned = queue_ballot(self.debate, data, ip_address="127.0.0.1")
+        recent = queue_ballot(self.debate, data, ip_address="127.0.0.1")
+        QueuedBallot.objects.filter(pk=abandoned.pk).update(dispatched=timezone.now() - timedelta(minutes=5))
+
+        with mock.patch('results.jobs.dispatch_job') as dispatch_job:
+            redispatch_abandoned_ballots(self.tournament.id)
+        self.assertEqual([call[0][3] for call in dispatch_job.call_args_list], [abandoned.id])
+
+        # It isn't sent again straight away, and once processed, never again
+        with mock.patch('results.jobs.dispatch_job') as dispatch_job:
+            redispatch_abandoned_ballots(self.tournament.id)
+        dispatch_job.assert_not_called()
+
+        self.assertIsNotNone(run_ballot_job(abandoned.id))
+        QueuedBallot.objects.update(dispatched=timezone.now() - timedelta(minutes=5))
+        with mock.patch('results.jobs.dispatch_job') as dispatch_job:
+            redispatch_abandoned_ballots(self.tournament.id)
+        self.assertEqual([call[0][3] for call in dispatch_job.call_args_list], [recent.id])
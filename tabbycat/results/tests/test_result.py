@@ -1,11 +1,15 @@
 import logging
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from draw.models import Debate, DebateTeam
 from participants.models import Adjudicator, Institution, Speaker, Team
 from results.models import BallotSubmission, SpeakerScore, SpeakerScoreByAdj, TeamScore
+from results.prefetch import populate_debate_results
 from results.result import ConsensusDebateResult, ResultError, VotingDebateResult    # absolute import to keep logger's name consistent
+from results.utils import populate_identical_ballotsub_lists
 from tournaments.models import Round, Tournament
 from utils.tests import suppress_logs
 from venues.models import Venue
@@ -146,6 +150,11 @@ class BaseTestDebateResult(TestCase):
         return self.debate_result_class(ballotsub)
 
     def save_complete_result(self, testdata, post_create=None):
+        result = self.fill_complete_result(testdata, post_create)
+        with suppress_logs('results.result', logging.WARNING):
+            result.save()
+
+    def fill_complete_result(self, testdata, post_create=None):
 
         nspeakers = testdata['num_speakers_per_team']
 
@@ -161,9 +170,7 @@ class BaseTestDebateResult(TestCase):
             # ghost fields should be False by default
 
         self.save_scores_to_result(testdata, result)
-
-        with suppress_logs('results.result', logging.WARNING):
-            result.save()
+        return result
 
     def _get_speakerscore_in_db(self, side, pos):
         return SpeakerScore.objects.get(
@@ -205,6 +212,87 @@ class GeneralSpeakerTestsMixin:
         speaker = self.teams[0].speaker_set.first()
         self.assertRaises(TypeError, result.set_speaker, 'aff', 1, speaker)
 
+    def test_resave_updates_in_place(self):
+        self.save_complete_result(self.testdata['high'])
+        speakerscore_ids = set(SpeakerScore.objects.values_list('id', flat=True))
+        teamscore_ids = set(TeamScore.objects.values_list('id', flat=True))
+
+        result = self.get_result()
+        result.set_ghost('aff', 1, True)
+        with suppress_logs('results.result', logging.WARNING):
+            result.save()
+
+        self.assertEqual(set(SpeakerScore.objects.values_list('id', flat=True)), speakerscore_ids)
+        self.assertEqual(set(TeamScore.objects.values_list('id', flat=True)), teamscore_ids)
+        self.assertTrue(self._get_speakerscore_in_db('aff', 1).ghost)
+        self.assertFalse(self._get_speakerscore_in_db('aff', 2).ghost)
+
+    def test_save_query_count_constant(self):
+        """Saving should take the same number of queries however many
+        adjudicators and speakers there are."""
+        valid = [testdata for testdata in self.testdata.values() if testdata['high-required']['valid']]
+        self.save_complete_result(valid[0])  # so that preferences are cached
+
+        counts = []
+        for testdata in valid:
+            result = self.fill_complete_result(testdata)
+            with CaptureQueriesContext(connection) as queries, suppress_logs('results.result', logging.WARNING):
+                result.save()
+            counts.append(len(queries))
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_identical_ballotsub_versions(self):
+        testdata = self.testdata['high']
+        self.save_complete_result(testdata)
+        self.save_complete_result(testdata)
+        self.save_complete_result(testdata)
+        result = self.get_result()
+        result.set_ghost('aff', 1, True)
+        with suppress_logs('results.result', logging.WARNING):
+            result.save()
+
+        ballotsubs = list(self.debate.ballotsubmission_set.order_by('version'))
+        populate_identical_ballotsub_lists(ballotsubs, debate=self.debate)
+        self.assertEqual([b.identical_ballotsub_versions for b in ballotsubs], [[2], [1], []])
+        self.assertTrue(ballotsubs[0].result.identical(ballotsubs[1].result))
+        self.assertFalse(ballotsubs[0].result.identical(ballotsubs[2].result))
+
+    def test_debate_results_query_count_constant(self):
+        """Loading all versions of a debate's ballot should take the same
+        number of queries however many versions there are."""
+        # The first load reads (and so stores) the tournament's preferences,
+        # which isn't what's being measured
+        self.save_complete_result(self.testdata['high'])
+        populate_debate_results(self.debate, list(self.debate.ballotsubmission_set.all()))
+
+        counts = []
+        for i in range(3):
+            self.save_complete_result(self.testdata['high'])
+            debate = Debate.objects.select_related('round__tournament').get(pk=self.debate.pk)
+            ballotsubs = list(debate.ballotsubmission_set.all())
+            with CaptureQueriesContext(connection) as queries:
+                populate_debate_results(debate, ballotsubs)
+            counts.append(len(queries))
+            for ballotsub in ballotsubs:
+                self.assertTrue(ballotsub.result.is_complete())
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_single_result_matches_bulk_load(self):
+        self.save_complete_result(self.testdata['high'])
+        result = self.get_result()
+        self.assertTrue(result.is_complete())
+
+        ballotsubs = list(self.debate.ballotsubmission_set.all())
+        populate_debate_results(self.debate, ballotsubs)
+        self.assertTrue(result.identical(ballotsubs[0].result))
+
+    def test_single_result_with_unknown_sides(self):
+        self.save_complete_result(self.testdata['high'])
+        self._unset_sides()
+        result = self.get_result()
+        self.assertTrue(all(result.debateteams[side] is None for side in self.SIDES))
+        self.assertFalse(result.is_complete())
+
     @incomplete_test
     def test_unfilled_debateteam(self, result):
         result.debateteams["aff"] = None
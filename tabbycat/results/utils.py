@@ -1,5 +1,4 @@
 import logging
-from itertools import combinations
 
 from django.db.models import Count
 from django.utils.translation import gettext as _
@@ -135,27 +134,34 @@ def get_result_status_stats(round):
     return stats
 
 
-def populate_identical_ballotsub_lists(ballotsubs):
+def populate_identical_ballotsub_lists(ballotsubs, debate=None):
     """Sets an attribute `identical_ballotsub_versions` on each BallotSubmission
     in `ballotsubs` to a list of version numbers of the other BallotSubmissions
     that are identical to it.
 
-    Two ballot submissions are identical if they share the same debate, motion,
-    speakers and all speaker scores."""
+    Two ballot submissions are identical if they share the same debate,
+    speakers and all speaker scores. Ballot submissions are grouped by the
+    identity keys of their results, so this takes linear time in the number of
+    ballot submissions.
 
-    from .prefetch import populate_results
-    populate_results(ballotsubs)
+    If all of the ballot submissions are from the same debate, pass it as
+    `debate`, so that their results are loaded in a fixed number of queries."""
 
-    for ballotsub in ballotsubs:
-        ballotsub.identical_ballotsub_versions = []
-
-    for ballotsub1, ballotsub2 in combinations(ballotsubs, 2):
-        if ballotsub1.result.identical(ballotsub2.result):
-            ballotsub1.identical_ballotsub_versions.append(ballotsub2.version)
-            ballotsub2.identical_ballotsub_versions.append(ballotsub1.version)
+    from .prefetch import populate_debate_results, populate_results
+    if debate is not None:
+        populate_debate_results(debate, ballotsubs)
+    else:
+        populate_results(ballotsubs)
 
+    groups = {}
     for ballotsub in ballotsubs:
-        ballotsub.identical_ballotsub_versions.sort()
+        key = (ballotsub.debate_id, ballotsub.result.identity_key())
+        groups.setdefault(key, []).append(ballotsub)
+
+    for group in groups.values():
+        for ballotsub in group:
+            ballotsub.identical_ballotsub_versions = sorted(
+                other.version for other in group if other is not ballotsub)
 
 
 _ORDINALS = {
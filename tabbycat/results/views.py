@@ -29,9 +29,10 @@ from utils.mixins import AdministratorMixin, AssistantMixin
 from utils.views import VueTableTemplateView
 from utils.tables import TabbycatTableBuilder
 
-from .forms import BPEliminationResultForm, PerAdjudicatorBallotSetForm, SingleBallotSetForm
+from .forms import get_ballot_set_form_class
+from .jobs import is_ballot_queue_full, pending_queued_ballots, queue_ballot
 from .mixins import BallotEmailWithStatusMixin
-from .models import BallotSubmission, TeamScore
+from .models import BallotSubmission, QueuedBallot, TeamScore
 from .tables import ResultsTableBuilder
 from .prefetch import populate_confirmed_ballots
 from .utils import populate_identical_ballotsub_lists
@@ -77,6 +78,10 @@ class BaseResultsEntryForRoundView(RoundMixin, VueTableTemplateView):
     def get_context_data(self, **kwargs):
         kwargs["incomplete_ballots"] = self._get_draw().filter(
             Q(result_status=Debate.STATUS_NONE) | Q(result_status=Debate.STATUS_DRAFT)).count()
+        if self.tournament.pref('queue_public_ballots'):
+            kwargs["queued_ballots"] = pending_queued_ballots(self.tournament).filter(debate__round=self.round).count()
+            kwargs["failed_queued_ballots"] = QueuedBallot.objects.filter(debate__round=self.round,
+                    status=QueuedBallot.STATUS_FAILED).count()
         return super().get_context_data(**kwargs)
 
 
@@ -237,16 +242,11 @@ class BaseBallotSetView(LogActionMixin, TournamentMixin, FormView):
         all_ballotsubs = self.debate.ballotsubmission_set.order_by('version').select_related('submitter', 'confirmer', 'motion')
         if not self.request.user.is_superuser:
             all_ballotsubs = all_ballotsubs.exclude(discarded=True)
-        populate_identical_ballotsub_lists(all_ballotsubs)
+        populate_identical_ballotsub_lists(all_ballotsubs, debate=self.debate)
         return all_ballotsubs
 
     def get_form_class(self):
-        if self.tournament.pref('teams_in_debate') == 'bp' and self.debate.round.is_break_round:
-            return BPEliminationResultForm
-        elif self.debate.round.ballots_per_debate == 'per-adj':
-            return PerAdjudicatorBallotSetForm
-        else:
-            return SingleBallotSetForm
+        return get_ballot_set_form_class(self.tournament, self.debate.round)
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -437,6 +437,17 @@ class BasePublicNewBallotSetView(PersonalizablePublicTournamentPageMixin, BaseBa
     def get_success_url(self):
         return reverse_tournament('post-results-public-ballotset-new', self.tournament)
 
+    def form_valid(self, form):
+        if self.tournament.pref('queue_public_ballots'):
+            if is_ballot_queue_full(self.tournament):
+                logger.warning("Ballot queue for %s is full, saving ballot in request", self.tournament)
+            else:
+                queue_ballot(self.debate, self.request.POST, adjudicator=self.object,
+                        ip_address=get_ip_address(self.request))
+                self.add_success_message()
+                return HttpResponseRedirect(self.get_success_url())
+        return super().form_valid(form)
+
     def populate_objects(self):
         self.object = self.get_object() # must be populated before self.error_page() called
 
@@ -1,11 +1,13 @@
 from django.conf.urls import url
 
-from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
 from actionlog.consumers import ActionLogEntryConsumer
+from adjallocation.consumers import AdjudicatorAllocationConsumer, AdjudicatorAllocationWorkerConsumer
 from checkins.consumers import CheckInEventConsumer
-from results.consumers import BallotResultConsumer, BallotStatusConsumer
+from draw.consumers import DrawGenerationConsumer, DrawGenerationWorkerConsumer
+from results.consumers import BallotQueueWorkerConsumer, BallotResultConsumer, BallotStatusConsumer
 
 
 # This acts like a urls.py equivalent; need to import the channel routes
@@ -24,7 +26,18 @@ application = ProtocolTypeRouter({
             url(r'^ws/(?P<tournament_slug>[-\w_]+)/ballot_results/$', BallotResultConsumer),
             url(r'^ws/(?P<tournament_slug>[-\w_]+)/ballot_statuses/$', BallotStatusConsumer),
             # CheckInStatusContainer
-            url(r'^ws/(?P<tournament_slug>[-\w_]+)/checkins/$', CheckInEventConsumer)
+            url(r'^ws/(?P<tournament_slug>[-\w_]+)/checkins/$', CheckInEventConsumer),
+            # Availability page (draw generation)
+            url(r'^ws/(?P<tournament_slug>[-\w_]+)/draw_generation/$', DrawGenerationConsumer),
+            # EditAdjudicatorsContainer
+            url(r'^ws/(?P<tournament_slug>[-\w_]+)/adjallocation/$', AdjudicatorAllocationConsumer),
         ])
     ),
+
+    # Background workers (run with "manage.py runworker <channel>")
+    "channel": ChannelNameRouter({
+        "adjallocation": AdjudicatorAllocationWorkerConsumer,
+        "draw": DrawGenerationWorkerConsumer,
+        "ballots": BallotQueueWorkerConsumer,
+    }),
 })
@@ -290,3 +290,15 @@ CHANNEL_LAYERS = {
         "BACKEND": "channels.layers.InMemoryChannelLayer",
     },
 }
+
+# Seconds over which events broadcast to each WebSocket group are collected
+# and sent together (see utils/broadcasts.py); zero sends each event at once
+BROADCAST_BATCH_WINDOW = float(os.environ.get('BROADCAST_BATCH_WINDOW', 0.25))
+
+# Ballots submitted online, when queued (see results/jobs.py): the number
+# saved at once in each process, the number that can be waiting in a
+# tournament before new submissions are saved in the request instead, and the
+# number of seconds after which a waiting ballot is sent to a worker again
+BALLOT_QUEUE_CONCURRENCY = int(os.environ.get('BALLOT_QUEUE_CONCURRENCY', 4))
+BALLOT_QUEUE_MAX_DEPTH = int(os.environ.get('BALLOT_QUEUE_MAX_DEPTH', 200))
+BALLOT_QUEUE_REDISPATCH_AFTER = int(os.environ.get('BALLOT_QUEUE_REDISPATCH_AFTER', 60))
@@ -0,0 +1,176 @@
+"""Functions for keeping running aggregates of speaker scores.
+
+Speaker standings metrics are all derived from the count, total, spread,
+highest and lowest of each speaker's scores. Rather than aggregating over all
+SpeakerScore instances every time the speaker tab is generated, these are
+stored in a `SpeakerScoreAggregate` for each speaker, round and position, and
+`SpeakerScoreAggregates` combines them into metrics, with one row per speaker
+per round.
+
+When a ballot is confirmed, unconfirmed or deleted, or the scores in a confirmed
+ballot are saved, the aggregates of the speakers in that debate are recomputed,
+once per ballot. See `standings.signals` and `results.result.notify_scores_saved()`
+for when these are called. Rounds whose
+aggregates don't account for all of their confirmed scores (e.g. because the
+tournament was imported) are aggregated in full when next needed."""
+
+import logging
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, OuterRef, StdDev, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from results.models import SpeakerScore
+from tournaments.models import Round
+
+from .models import SpeakerScoreAggregate
+
+logger = logging.getLogger(__name__)
+
+
+def update_speaker_score_aggregates(round, speaker_ids=None):
+    """Recomputes the aggregates for the given round, for the speakers with
+    the given IDs, or for all speakers if `speaker_ids` is None."""
+
+    with transaction.atomic():
+        # Lock the round, so that concurrent updates of its aggregates take
+        # turns, and each reads the scores committed by the one before it.
+        Round.objects.select_for_update().values_list('id', flat=True).get(pk=round.pk)
+
+        speakerscores = SpeakerScore.objects.filter(ballot_submission__confirmed=True,
+                debate_team__debate__round=round, ghost=False)
+        existing = SpeakerScoreAggregate.objects.filter(round=round)
+        if speaker_ids is not None:
+            speakerscores = speakerscores.filter(speaker_id__in=speaker_ids)
+            existing = existing.filter(speaker_id__in=speaker_ids)
+
+        scores = defaultdict(list)
+        for speaker_id, position, score in speakerscores.values_list('speaker_id', 'position', 'score'):
+            scores[(speaker_id, position)].append(score)
+
+        aggregates = []
+        for (speaker_id, position), values in scores.items():
+            mean = sum(values) / len(values)
+            aggregates.append(SpeakerScoreAggregate(speaker_id=speaker_id, round=round, position=position,
+                count=len(values), total=sum(values), sum_squared_deviations=sum((x - mean) ** 2 for x in values),
+                highest=max(values), lowest=min(values)))
+
+        existing.delete()
+        SpeakerScoreAggregate.objects.bulk_create(aggregates)
+
+
+def update_speaker_score_aggregates_for_debate(debate_id):
+    """Recomputes the aggregates of the speakers who have scores in the given
+    debate (in any ballot), or who are on teams in the debate."""
+    round = Round.objects.filter(debate__id=debate_id).first()
+    if round is None:
+        return
+    speaker_ids = set(SpeakerScore.objects.filter(
+            debate_team__debate_id=debate_id).values_list('speaker_id', flat=True))
+    speaker_ids.update(SpeakerScoreAggregate.objects.filter(round=round,
+            speaker__team__debateteam__debate_id=debate_id).values_list('speaker_id', flat=True))
+    update_speaker_score_aggregates(round, speaker_ids)
+
+
+def add_missing_speaker_score_aggregates(round):
+    """Aggregates preliminary rounds up to and including `round` whose
+    aggregates don't cover all of their confirmed speaker scores. This
+    includes rounds that only have aggregates for some speakers, e.g. because
+    one ballot was edited after the rest of the round was confirmed."""
+    score_counts = SpeakerScore.objects.filter(debate_team__debate__round=OuterRef('pk'),
+            ballot_submission__confirmed=True, ghost=False).order_by().values(
+            'debate_team__debate__round').annotate(n=Count('id')).values('n')
+    aggregate_counts = SpeakerScoreAggregate.objects.filter(round=OuterRef('pk')).order_by().values(
+            'round').annotate(n=Sum('count')).values('n')
+    missing = Round.objects.filter(tournament_id=round.tournament_id, seq__lte=round.seq,
+            stage=Round.STAGE_PRELIMINARY).annotate(
+            scores=Coalesce(Subquery(score_counts, output_field=IntegerField()), 0),
+            aggregated=Coalesce(Subquery(aggregate_counts, output_field=IntegerField()), 0),
+            ).exclude(scores=F('aggregated')).order_by('seq')
+
+    for missing_round in missing:
+        logger.info("Adding speaker score aggregates for %s", missing_round)
+        update_speaker_score_aggregates(missing_round)
+
+
+class SpeakerScoreAggregates:
+    """Combines the aggregates of each speaker in `queryset` for the
+    preliminary rounds up to and including `round`, separately for substantive
+    speeches and replies."""
+
+    def __init__(self, queryset, round):
+        add_missing_speaker_score_aggregates(round)
+
+        self.ids = list(queryset.values_list('id', flat=True))
+        self.last_substantive_position = round.tournament.last_substantive_position
+        self.reply_position = round.tournament.reply_position
+
+        rows = list(SpeakerScoreAggregate.objects.filter(
+            speaker__in=queryset,
+            round__tournament_id=round.tournament_id,
+            round__seq__lte=round.seq,
+            round__stage=Round.STAGE_PRELIMINARY,
+        ).values_list('speaker_id', 'position', 'count', 'total', 'sum_squared_deviations', 'highest', 'lowest'))
+        self._combined = {False: self._combine([r for r in rows if r[1] <= self.last_substantive_position]),
+                          True: self._combine([r for r in rows if r[1] == self.reply_position])}
+
+    def _combine(self, rows):
+        """Combines rows of aggregates into arrays of the count, total, sum of
+        squared deviations, highest and lowest score for each speaker."""
+        index = {speaker_id: i for i, speaker_id in enumerate(self.ids)}
+        n = len(self.ids)
+        group = np.array([index[row[0]] for row in rows], dtype=int)
+        columns = np.array([row[2:] for row in rows], dtype=float).reshape(len(rows), 5)
+        counts, totals, deviations, highest, lowest = columns.T
+
+        count = np.bincount(group, weights=counts, minlength=n).astype(int)
+        total = np.bincount(group, weights=totals, minlength=n)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = total / count
+
+            # Combine sums of squared deviations from each row's mean into one
+            # about the overall mean (Chan et al.'s parallel algorithm)
+            shift = counts * (totals / counts - mean[group]) ** 2
+        m2 = np.bincount(group, weights=deviations + shift, minlength=n)
+
+        high = np.full(n, -np.inf)
+        np.maximum.at(high, group, highest)
+        low = np.full(n, np.inf)
+        np.minimum.at(low, group, lowest)
+
+        return count, total, m2, high, low
+
+    def get(self, replies=False):
+        """Returns a tuple of arrays (count, total, sum of squared deviations,
+        highest, lowest), in the order of `self.ids`."""
+        return self._combined[replies]
+
+    def aggregate(self, function, replies=False):
+        """Returns a dict mapping speaker IDs to the aggregate of their scores,
+        where `function` is one of the Django aggregate classes `Sum`, `Count`,
+        `Avg`, `StdDev` (population), `Max` or `Min`. As for SQL aggregates,
+        speakers without scores have a result of None, except for `Count`, for
+        which it is 0."""
+        count, total, m2, high, low = self.get(replies)
+
+        if function is Count:
+            return dict(zip(self.ids, count.tolist()))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if function is Sum:
+                result = total
+            elif function is Avg:
+                result = total / count
+            elif function is StdDev:
+                result = np.sqrt(m2 / count)
+            elif function is Max:
+                result = high
+            elif function is Min:
+                result = low
+            else:
+                raise ValueError("Unsupported aggregate for speaker score aggregates: {!r}".format(function))
+
+        return {speaker_id: (value if n > 0 else None)
+                for speaker_id, value, n in zip(self.ids, result.tolist(), count.tolist())}
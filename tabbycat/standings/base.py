@@ -1,9 +1,10 @@
 """Base class for standings generators."""
 
-from operator import itemgetter
 import random
 import logging
+from numbers import Number
 
+import numpy as np
 from django.utils.translation import gettext as _
 
 from .metrics import RepeatedMetricAnnotator
@@ -15,6 +16,15 @@ class StandingsError(RuntimeError):
     pass
 
 
+def encode_metric(values):
+    """Returns an array of integer codes for the given metric values, so that
+    equal values have equal codes, and codes are ordered like their values.
+    Values that aren't numbers (e.g. "n/a" for who-beat-whom) all get the same
+    code, which is greater than that of any number."""
+    numbers = np.array([float(x) if isinstance(x, Number) else np.inf for x in values], dtype=float)
+    return np.unique(numbers, return_inverse=True)[1].astype(int)
+
+
 class StandingInfo:
     """Stores standing information for an instance of a model.
 
@@ -55,6 +65,10 @@ class StandingInfo:
     results in a KeyError, and `iterrankings()` will return `(None, False)`.
     Python code should be prepared to handle this scenario. Django templates
     should use {{ ranking|default:"n/a" }} to handle the `None`.
+
+    Rankings are stored by the `Standings` object in arrays, and `rankings` is
+    only built for an instance when it is accessed, so that rows that are never
+    displayed (e.g. past a rank limit) cost nothing.
     """
 
     def __init__(self, standings, instance):
@@ -67,7 +81,14 @@ class StandingInfo:
         setattr(self, self.instance.__class__.__name__.lower(), self.instance)
 
         self.metrics = dict()
-        self.rankings = dict()
+        self.position = None  # index in standings.standings, set by Standings.sort()
+        self._added_rankings = dict()
+
+    @property
+    def rankings(self):
+        rankings = self.standings.get_rankings_for(self)
+        rankings.update(self._added_rankings)
+        return rankings
 
     def __repr__(self):
         return "<StandingInfo for {}>".format(str(self.instance))
@@ -80,7 +101,7 @@ class StandingInfo:
     def add_ranking(self, name, value):
         if name in self.rankings:
             raise ValueError("There is already a ranking {!r} for this {}".format(name, self.model_verbose_name))
-        self.rankings[name] = value
+        self._added_rankings[name] = value
 
     def itermetrics(self):
         for key in self.standings.metric_keys:
@@ -144,6 +165,9 @@ class Standings:
         self.ranking_keys = list()
         self._metric_specs = list()
         self._ranking_specs = list()
+        self._metric_codes = dict()
+        self._rankings = dict()
+        self._num_eligible = 0
 
     @property
     def standings(self):
@@ -153,10 +177,7 @@ class Standings:
     @property
     def rank_eligible(self):
         assert self.ranked, "sort() must be called before accessing standings"
-        if self.rank_filter:
-            return filter(self.rank_filter, self._standings)
-        else:
-            return self._standings
+        return self._standings[:self._num_eligible]
 
     def __len__(self):
         return len(self.standings)
@@ -221,37 +242,76 @@ class Standings:
         self.get_standing(instance).add_metric(key, value)
 
     def sort(self, precedence, tiebreak_func=None):
-        self._standings = list(self.infos.values())
+        """Sorts the standings by the metrics in `precedence`, after shuffling
+        (or otherwise ordering) them with `tiebreak_func`. Rank-ineligible
+        instances are placed last.
+
+        Each metric is encoded as an array of integer codes that preserve its
+        order, and the standings are sorted by all of them at once using
+        `np.lexsort()`, which is stable, so ties stay in tiebreak order. The
+        codes are kept for the ranking annotators (see `get_metric_codes()`)."""
+        infos = list(self.infos.values())
 
         if tiebreak_func:
-            tiebreak_func(self._standings)
+            tiebreak_func(infos)
 
-        metricitemgetter = itemgetter(*precedence)
+        ascending = dict(zip(self.metric_keys, self.metric_ascending))
+        codes = {key: encode_metric([info.metrics[key] for info in infos]) for key in precedence}
 
-        # Like standings.metrics.metricgetter, but negates metrics ranked in ascending order
-        if len(precedence) == 1 and self.metric_ascending[0]:
-            def metrics_for_ranking(info):
-                return -metricitemgetter(info.metrics)
-        elif len(precedence) == 1 and not self.metric_ascending[0]:
-            def metrics_for_ranking(info):
-                return metricitemgetter(info.metrics)
-        else:
-            def metrics_for_ranking(info):
-                metrics = metricitemgetter(info.metrics)
-                return tuple(-x if asc else x for x, asc in zip(metrics, self.metric_ascending))
+        # np.lexsort() sorts by the last key first, and in ascending order
+        sort_keys = [codes[key] if ascending.get(key) else -codes[key] for key in reversed(precedence)]
+        if self.rank_filter:
+            sort_keys.append(np.array([not self.rank_filter(info) for info in infos], dtype=bool))
+        order = np.lexsort(sort_keys) if sort_keys else np.arange(len(infos))
 
-        try:
-            self._standings.sort(key=metrics_for_ranking, reverse=True)
-        except TypeError:
-            for info in self.infos.values():
-                logger.info("%30s %s", info.instance, metrics_for_ranking(info))
-            raise
+        self._standings = [infos[i] for i in order]
+        for position, info in enumerate(self._standings):
+            info.position = position
+        self._metric_codes = {key: value[order] for key, value in codes.items()}
 
         if self.rank_filter:
-            self._standings.sort(key=self.rank_filter, reverse=True)
+            self._num_eligible = len(infos) - int(np.count_nonzero(sort_keys[-1]))
+        else:
+            self._num_eligible = len(infos)
 
         self.ranked = True
 
+    def get_metric_codes(self, keys):
+        """Returns a 2-D array with a row for each rank-eligible instance, in
+        ranked order, and a column for each metric in `keys`. Equal metrics
+        have equal codes, and codes are in the same order as the metrics."""
+        assert self.ranked, "sort() must be called before getting metric codes"
+        columns = []
+        for key in keys:
+            if key not in self._metric_codes:
+                self._metric_codes[key] = encode_metric([info.metrics[key] for info in self._standings])
+            columns.append(self._metric_codes[key][:self._num_eligible])
+        if not columns:
+            return np.zeros((self._num_eligible, 0), dtype=int)
+        return np.column_stack(columns)
+
+    def get_group_values(self, group_key):
+        """Returns a list of `group_key(info)` for each rank-eligible instance,
+        in ranked order."""
+        return [group_key(info) for info in self._standings[:self._num_eligible]]
+
+    def add_rankings(self, key, ranks, shared):
+        """Stores a ranking for the rank-eligible instances. `ranks` and
+        `shared` are arrays in ranked order; instances with a rank of 0 aren't
+        ranked."""
+        self._rankings[key] = (ranks.tolist(), shared.tolist())
+
+    def get_rankings_for(self, info):
+        """Returns a dict of the rankings of the given StandingInfo."""
+        rankings = {}
+        position = info.position
+        if position is None or position >= self._num_eligible:
+            return rankings
+        for key, (ranks, shared) in self._rankings.items():
+            if ranks[position] > 0:
+                rankings[key] = (ranks[position], shared[position])
+        return rankings
+
     def filter(self, include_filter):
         self.infos = {instance: info for instance, info in self.infos.items() if include_filter(info)}
 
@@ -271,6 +331,7 @@ class BaseStandingsGenerator:
         "tiebreak": "random",
         "rank_filter": None,
         "include_filter": None,  # not currently used by other code
+        "engine": None,  # "sql" or "columnar"; if None, uses the tournament's preference
     }
 
     TIEBREAK_FUNCTIONS = {
@@ -279,6 +340,7 @@ class BaseStandingsGenerator:
 
     metric_annotator_classes = {}
     ranking_annotator_classes = {}
+    columns_class = None  # ResultColumns subclass for the in-memory engine, see standings.columnar
 
     def __init__(self, metrics, rankings, extra_metrics=(), **options):
 
@@ -313,9 +375,7 @@ class BaseStandingsGenerator:
         # relies on a nested ID selection instead.
         queryset_for_metrics = queryset.model.objects.filter(id__in=queryset.values_list('id', flat=True))
 
-        for annotator in self.metric_annotators:
-            logger.debug("Running metric annotator: %s", annotator.name)
-            annotator.run(queryset_for_metrics, standings, round)
+        self.annotate_metrics(queryset_for_metrics, standings, round)
         logger.debug("Metric annotators done.")
 
         if self.options["include_filter"]:
@@ -330,6 +390,46 @@ class BaseStandingsGenerator:
 
         return standings
 
+    def annotate_metrics(self, queryset, standings, round=None):
+        """Adds all metrics to `standings`. Subclasses may override this
+        method to get metrics from somewhere other than the metric annotators."""
+        self.run_metric_annotators(self.metric_annotators, queryset, standings, round)
+
+    def run_metric_annotators(self, annotators, queryset, standings, round=None):
+        """Runs the given metric annotators. If the in-memory engine is
+        selected, the annotators that support it compute their metrics from
+        results loaded once into `self.columns_class`."""
+        engine = None
+        columns = None
+
+        for annotator in annotators:
+            if annotator.columnar and engine is None:
+                engine = self.get_engine(queryset, round)
+
+            if annotator.columnar and engine == "columnar":
+                if columns is None:
+                    columns = self.columns_class(queryset, round)
+                logger.debug("Running metric annotator from columns: %s", annotator.name)
+                annotator.run_from_columns(columns, standings)
+            else:
+                logger.debug("Running metric annotator: %s", annotator.name)
+                annotator.run(queryset, standings, round)
+
+    def get_engine(self, queryset, round=None):
+        if self.columns_class is None:
+            return "sql"
+        if self.options["engine"] is not None:
+            return self.options["engine"]
+        tournament = self.get_tournament(queryset, round)
+        if tournament is None:
+            return "sql"
+        return tournament.pref('standings_engine')
+
+    def get_tournament(self, queryset, round=None):
+        """Returns the tournament these standings are for, if known.
+        Subclasses may override this to find it when `round` is None."""
+        return round.tournament if round is not None else None
+
     @staticmethod
     def _check_annotators(annotators, error_str):
         """Checks the given list of annotators to ensure there are no conflicts.
@@ -0,0 +1,168 @@
+"""In-memory engine for computing standings metrics.
+
+Rather than each metric annotator running its own aggregate query, the
+confirmed results relevant to the standings are loaded once into NumPy arrays,
+one per field ("columns"), and metrics are computed from them with vectorized
+group-bys. Metric annotators that support this set `columnar = True` and
+implement `get_column_values()`. Annotators that don't (e.g. who-beat-whom) are
+run as usual.
+
+The engine is chosen by the "standings_engine" tournament preference, or the
+`engine` option of the standings generator."""
+
+import logging
+
+import numpy as np
+from django.db.models import Avg, Count, Max, Min, StdDev, Sum
+
+from draw.models import DebateTeam
+from participants.models import Team
+from results.models import SpeakerScore, TeamScore
+from tournaments.models import Round
+
+logger = logging.getLogger(__name__)
+
+
+class ResultColumns:
+    """Stores one row per score, in arrays keyed by field name. Subclasses
+    must set `fields`, a tuple of (name, dtype) pairs, and pass rows of the
+    form (owner_id, *fields) to the constructor, where `owner_id` is the ID
+    of the team or speaker the score belongs to."""
+
+    fields = ()  # must be set by subclasses
+
+    def __init__(self, ids, rows):
+        self.ids = list(ids)
+        index = {instance_id: i for i, instance_id in enumerate(self.ids)}
+
+        columns = list(zip(*rows)) if rows else [()] * (len(self.fields) + 1)
+        self.group = np.array([index[owner_id] for owner_id in columns[0]], dtype=int)
+        self.values = {}
+        self.valid = {}
+        for (name, dtype), column in zip(self.fields, columns[1:]):
+            self.valid[name] = np.array([x is not None for x in column], dtype=bool)
+            self.values[name] = np.array([0 if x is None else x for x in column], dtype=dtype)
+
+        logger.debug("Loaded %d rows for %d instances into %s", len(self.group), len(self.ids), self.__class__.__name__)
+
+    def __len__(self):
+        return len(self.group)
+
+    def get(self, field, mask=None):
+        """Returns a (values, mask) pair for the field, where `mask` excludes
+        null values, and anything excluded by the `mask` provided."""
+        valid = self.valid[field]
+        if mask is not None:
+            valid = valid & mask
+        return self.values[field], valid
+
+    def aggregate(self, function, values, mask):
+        """Aggregates the rows of `values` selected by `mask` for each instance,
+        and returns a dict mapping instance IDs to the result. As for SQL
+        aggregates, instances without any selected rows have a result of None,
+        except for `Count`, for which it is 0. `function` is one of the Django
+        aggregate classes `Sum`, `Count`, `Avg`, `StdDev`, `Max` or `Min`."""
+
+        group = self.group[mask]
+        values = values[mask]
+        n = len(self.ids)
+        counts = np.bincount(group, minlength=n)
+
+        if function is Count:
+            return dict(zip(self.ids, counts.tolist()))
+
+        if function is Sum:
+            result = np.zeros(n, dtype=int if values.dtype.kind in 'biu' else float)
+            np.add.at(result, group, values)
+
+        elif function is Avg or function is StdDev:
+            totals = np.bincount(group, weights=values, minlength=n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = totals / counts
+                if function is StdDev:  # population standard deviation, like PostgreSQL's STDDEV_POP
+                    deviations = values - result[group]
+                    result = np.sqrt(np.bincount(group, weights=deviations ** 2, minlength=n) / counts)
+
+        elif function is Max:
+            result = np.full(n, -np.inf)
+            np.maximum.at(result, group, values)
+
+        elif function is Min:
+            result = np.full(n, np.inf)
+            np.minimum.at(result, group, values)
+
+        else:
+            raise ValueError("Unsupported aggregate for columns: {!r}".format(function))
+
+        return {instance_id: (value if count > 0 else None)
+                for instance_id, value, count in zip(self.ids, result.tolist(), counts.tolist())}
+
+
+COLUMN_AGGREGATES = (Sum, Count, Avg, StdDev, Max, Min)
+
+
+class TeamResultColumns(ResultColumns):
+    """Team scores from confirmed ballots in preliminary rounds, up to and
+    including `round` if it is specified."""
+
+    fields = (
+        ('points', int),
+        ('win', bool),
+        ('margin', float),
+        ('score', float),
+        ('votes_given', int),
+        ('votes_possible', int),
+        ('forfeit', bool),
+    )
+
+    def __init__(self, queryset, round=None):
+        self.queryset = queryset
+        self.round = round
+
+        teamscores = TeamScore.objects.filter(
+            ballot_submission__confirmed=True,
+            debate_team__team__in=queryset,
+            debate_team__debate__round__stage=Round.STAGE_PRELIMINARY,
+        )
+        if round is not None:
+            teamscores = teamscores.filter(debate_team__debate__round__seq__lte=round.seq)
+        rows = list(teamscores.values_list('debate_team__team_id', *[name for name, _ in self.fields]))
+
+        super().__init__(queryset.values_list('id', flat=True), rows)
+
+    def get_bye_counts(self):
+        """Returns a dict mapping team IDs to the number of byes (debates as a
+        bye team) in preliminary rounds."""
+        debateteams = DebateTeam.objects.filter(team__in=self.queryset, team__type=Team.TYPE_BYE,
+                debate__round__stage=Round.STAGE_PRELIMINARY)
+        if self.round is not None:
+            debateteams = debateteams.filter(debate__round__seq__lte=self.round.seq)
+        counts = dict.fromkeys(self.ids, 0)
+        for team_id in debateteams.values_list('team_id', flat=True):
+            counts[team_id] += 1
+        return counts
+
+
+class SpeakerResultColumns(ResultColumns):
+    """Speaker scores (excluding ghosts) from confirmed ballots in preliminary
+    rounds, up to and including `round`, which must be specified."""
+
+    fields = (
+        ('score', float),
+        ('position', int),
+    )
+
+    def __init__(self, queryset, round):
+        self.last_substantive_position = round.tournament.last_substantive_position
+        self.reply_position = round.tournament.reply_position
+
+        speakerscores = SpeakerScore.objects.filter(
+            ballot_submission__confirmed=True,
+            speaker__in=queryset,
+            debate_team__debate__round__seq__lte=round.seq,
+            debate_team__debate__round__stage=Round.STAGE_PRELIMINARY,
+            ghost=False,
+        )
+        rows = list(speakerscores.values_list('speaker_id', *[name for name, _ in self.fields]))
+
+        super().__init__(queryset.values_list('id', flat=True), rows)
@@ -0,0 +1,138 @@
+"""Functions for exporting public tab pages.
+
+Once the tab is released, the public tab pages show the same standings to
+everyone until something changes, but each cache miss generates the standings
+again. `export_public_tabs()` renders the tables of every released public tab
+page once, and stores them in a `PublicTabExport`, from which the pages are
+then served without generating any standings (see `PublicTabMixin`).
+
+Exports are deleted whenever results, the draw, participants or tournament
+preferences change, after which the pages are generated as usual until they
+are exported again. See `standings.signals`, and the callers of
+`clear_public_tab_exports()`, for when this happens.
+
+The pages are rendered without holding any locks, since that can take a while
+and would hold up saving ballots. Instead, an export first stores a marker
+row, which clearing the exports deletes along with the pages. The rendered
+pages are only stored if the marker is still there when they're done."""
+
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db import transaction
+from django.http import HttpRequest
+from django.utils import translation
+
+from .models import PublicTabExport
+
+logger = logging.getLogger(__name__)
+
+# `PublicTabExport.view` of the marker row of an export in progress
+IN_PROGRESS_VIEW = ""
+
+
+def get_public_tab_pages(tournament):
+    """Yields a (view class, category slug) tuple for each public tab page
+    that can be exported."""
+    from .views import (PublicBreakCategoryTabView, PublicReplyTabView, PublicSpeakerCategoryTabView,
+            PublicSpeakerTabView, PublicTeamTabView)  # avoid circular import
+
+    yield PublicTeamTabView, ""
+    yield PublicSpeakerTabView, ""
+    yield PublicReplyTabView, ""
+    for slug in tournament.breakcategory_set.values_list('slug', flat=True):
+        yield PublicBreakCategoryTabView, slug
+    for slug in tournament.speakercategory_set.filter(public=True).values_list('slug', flat=True):
+        yield PublicSpeakerCategoryTabView, slug
+
+
+def get_public_tab_export(tournament, view, category=""):
+    """Returns the stored tables data for the given page in the current
+    language, or None if it hasn't been exported."""
+    return PublicTabExport.objects.filter(tournament=tournament, view=view, category=category,
+            language=translation.get_language()).values_list('tables_data', flat=True).first()
+
+
+def render_public_tab_tables(view_class, tournament, category=""):
+    """Renders the tables data of a public tab page, as it would be shown to
+    an anonymous user. Returns None if the page isn't enabled, or if it would
+    show an error or other message alongside the tables."""
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = AnonymousUser()
+    request._messages = CookieStorage(request)
+
+    kwargs = {'tournament_slug': tournament.slug}
+    if category:
+        kwargs['category'] = category
+    view = view_class(request=request, args=(), kwargs=kwargs)
+
+    if not view.is_page_enabled(tournament):
+        return None
+    if category:
+        view.object = view.get_object()
+
+    tables_data = view.get_tables_data(use_export=False)
+    if list(request._messages):
+        logger.info("Not exporting %s %s, because it has messages", view_class.__name__, category)
+        return None
+    return tables_data
+
+
+def export_public_tabs(tournament, languages=None):
+    """Renders and stores all released public tab pages of the tournament, in
+    each of the given languages (by default, the site's default language).
+    Returns the number of pages exported, or None if the exports were cleared
+    while the pages were being rendered, in which case nothing is stored."""
+
+    if languages is None:
+        languages = [settings.LANGUAGE_CODE]
+
+    marker, _ = PublicTabExport.objects.get_or_create(tournament=tournament, view=IN_PROGRESS_VIEW,
+            category="", language="", defaults={'tables_data': []})
+
+    try:
+        exports = []
+        for language in languages:
+            with translation.override(language):
+                for view_class, category in get_public_tab_pages(tournament):
+                    tables_data = render_public_tab_tables(view_class, tournament, category)
+                    if tables_data is not None:
+                        exports.append(PublicTabExport(tournament=tournament, view=view_class.__name__,
+                                category=category, language=language, tables_data=tables_data))
+    except Exception:
+        PublicTabExport.objects.filter(pk=marker.pk).delete()
+        raise
+
+    with transaction.atomic():
+        if PublicTabExport.objects.select_for_update().filter(pk=marker.pk).values_list('id', flat=True).first() is None:
+            logger.info("Not storing public tab exports for %s, because they were cleared while rendering", tournament)
+            return None
+        PublicTabExport.objects.filter(tournament=tournament, language__in=languages).delete()
+        PublicTabExport.objects.filter(pk=marker.pk).delete()
+        PublicTabExport.objects.bulk_create(exports)
+
+    logger.info("Exported %d public tab pages for %s", len(exports), tournament)
+    return len(exports)
+
+
+def clear_public_tab_exports(tournament_id):
+    """Deletes all exported public tab pages of the tournament, and stops any
+    export in progress from being stored. Callers that change many objects
+    should call this once, when they're done.
+
+    If this is called in a transaction, the exports are deleted again when it
+    is committed, in case an export rendered from the data before the change
+    was stored in the meantime."""
+    _delete_public_tab_exports(tournament_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _delete_public_tab_exports(tournament_id))
+
+
+def _delete_public_tab_exports(tournament_id):
+    deleted, _ = PublicTabExport.objects.filter(tournament_id=tournament_id).delete()
+    if deleted:
+        logger.info("Cleared %d public tab exports for tournament %d", deleted, tournament_id)
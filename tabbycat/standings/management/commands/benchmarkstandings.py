@@ -0,0 +1,210 @@
+import json
+import random
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from adjallocation.models import DebateAdjudicator
+from draw.models import Debate, DebateTeam
+from participants.models import Adjudicator, Institution, Speaker, Team
+from results.dbutils import add_results_to_round
+from results.models import BallotSubmission
+from tournaments.models import Round, Tournament
+
+from ...profiling import profile_standings
+from ...speakers import SpeakerStandingsGenerator
+from ...teams import TeamStandingsGenerator
+
+TEAM_METRICS = {
+    "two": ("points", "wins", "speaks_sum", "speaks_avg", "speaks_ind_avg", "speaks_stddev", "draw_strength",
+            "draw_strength_speaks", "margin_sum", "margin_avg", "num_adjs", "wbw"),
+    "bp": ("points", "speaks_sum", "speaks_avg", "speaks_ind_avg", "speaks_stddev", "draw_strength",
+           "draw_strength_speaks", "firsts", "seconds", "wbw"),
+}
+TEAM_RANKINGS = ("rank", "subrank", "institution")
+
+SPEAKER_METRICS = {
+    "two": ("total", "average", "trimmed_mean", "stdev", "count",
+            "replies_sum", "replies_avg", "replies_stddev", "replies_count"),
+    "bp": ("total", "average", "trimmed_mean", "stdev", "count"),
+}
+SPEAKER_RANKINGS = ("rank",)
+
+# Each configuration is (name, generator class, options). Snapshots and
+# aggregates are disabled where the configuration is about an engine, since
+# otherwise most annotators wouldn't run at all.
+CONFIGURATIONS = [
+    ("team-sql", TeamStandingsGenerator, {"engine": "sql", "use_snapshots": False}),
+    ("team-columnar", TeamStandingsGenerator, {"engine": "columnar", "use_snapshots": False}),
+    ("team-snapshots", TeamStandingsGenerator, {"engine": "sql", "use_snapshots": True}),
+    ("speaker-sql", SpeakerStandingsGenerator, {"engine": "sql", "use_aggregates": False}),
+    ("speaker-columnar", SpeakerStandingsGenerator, {"engine": "columnar", "use_aggregates": False}),
+    ("speaker-aggregates", SpeakerStandingsGenerator, {"use_aggregates": True}),
+]
+
+
+class Command(BaseCommand):
+
+    help = "Times each metric and ranking annotator of the team and speaker " \
+        "standings generators on synthetic tournaments, and compares them " \
+        "to a stored baseline. Everything the command creates is rolled back " \
+        "afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("-t", "--teams", type=int, nargs="+", default=[48, 192],
+                            help="Numbers of teams in the synthetic tournaments")
+        parser.add_argument("-r", "--rounds", type=int, default=5,
+                            help="Number of rounds in each synthetic tournament")
+        parser.add_argument("-p", "--panel-size", type=int, default=1,
+                            help="Number of adjudicators in each debate")
+        parser.add_argument("-f", "--format", choices=["two", "bp"], default="two",
+                            help="Number of teams per debate")
+        parser.add_argument("-n", "--repeats", type=int, default=3,
+                            help="Number of times to generate each standings (the fastest is reported)")
+        parser.add_argument("-c", "--configuration", type=str, action="append", dest="configurations",
+                            choices=[name for name, _, _ in CONFIGURATIONS],
+                            help="Only run these configurations (can be specified multiple times)")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="Random seed for the synthetic results")
+        parser.add_argument("--save-baseline", type=str, metavar="FILE",
+                            help="Write the timings to this file, as JSON")
+        parser.add_argument("--baseline", type=str, metavar="FILE",
+                            help="Compare the timings to those in this file (from --save-baseline)")
+        parser.add_argument("--tolerance", type=float, default=0.25,
+                            help="Relative slowdown against the baseline that counts as a regression (default 0.25)")
+        parser.add_argument("--min-time", type=float, default=0.005,
+                            help="Slowdowns of less than this many seconds are never regressions (default 0.005)")
+
+    def handle(self, *args, **options):
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        configurations = [c for c in CONFIGURATIONS
+                          if not options["configurations"] or c[0] in options["configurations"]]
+
+        self.stdout.write("Database: {}".format(connection.vendor))
+        results = OrderedDict()
+        for nteams in options["teams"]:
+            with transaction.atomic():
+                tournament = self.make_tournament(nteams, options["rounds"], options["panel_size"], options["format"])
+                size = "{format}-{teams:d}t-{rounds:d}r-{panel:d}a".format(format=options["format"],
+                        teams=nteams, rounds=options["rounds"], panel=options["panel_size"])
+                self.stdout.write(self.style.MIGRATE_HEADING("{:d} teams, {:d} rounds, panels of {:d} ({}):".format(
+                        nteams, options["rounds"], options["panel_size"], size)))
+                for name, generator_class, generator_options in configurations:
+                    key = "{}/{}".format(size, name)
+                    results[key] = self.run_benchmark(tournament, name, generator_class, generator_options,
+                            options["format"], options["repeats"])
+                transaction.set_rollback(True)
+
+        if options["save_baseline"]:
+            with open(options["save_baseline"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write("Saved timings to {}".format(options["save_baseline"]))
+
+        if baseline is not None:
+            regressions = self.compare(results, baseline, options["tolerance"], options["min_time"])
+            if regressions:
+                raise CommandError("{:d} regression(s) against {}".format(regressions, options["baseline"]))
+            self.stdout.write(self.style.SUCCESS("No regressions against {}".format(options["baseline"])))
+
+    def make_tournament(self, nteams, nrounds, panel_size, teams_in_debate):
+        """Creates a tournament with random draws and confirmed random results
+        for `nrounds` rounds."""
+
+        tournament = Tournament.objects.create(name="Standings benchmark",
+                slug="benchmark-standings-{:d}".format(nteams))
+        tournament.preferences['debate_rules__teams_in_debate'] = teams_in_debate
+        if teams_in_debate == "bp":
+            tournament.preferences['debate_rules__ballots_per_debate_prelim'] = 'per-debate'
+            tournament.preferences['debate_rules__substantive_speakers'] = 2
+            tournament.preferences['debate_rules__reply_scores_enabled'] = False
+
+        sides = tournament.sides
+        if nteams % len(sides) != 0:
+            raise CommandError("The number of teams must be a multiple of {:d}".format(len(sides)))
+        nspeakers = tournament.last_substantive_position
+
+        institutions = [Institution.objects.create(name="Benchmark Institution {:d}".format(i), code="BI{:d}".format(i))
+                        for i in range(max(nteams // 4, 1))]
+        teams = []
+        for i in range(nteams):
+            team = Team.objects.create(tournament=tournament, institution=random.choice(institutions),
+                    reference="Team {:d}".format(i), short_reference="T{:d}".format(i))
+            Speaker.objects.bulk_create([Speaker(team=team, name="Speaker {:d}-{:d}".format(i, j))
+                    for j in range(nspeakers)])
+            teams.append(team)
+        adjudicators = [Adjudicator.objects.create(tournament=tournament, name="Adjudicator {:d}".format(i))
+                        for i in range(nteams // len(sides) * panel_size)]
+
+        for seq in range(1, nrounds + 1):
+            round = Round.objects.create(tournament=tournament, seq=seq, name="Round {:d}".format(seq),
+                    abbreviation="R{:d}".format(seq), draw_type=Round.DRAW_RANDOM)
+            random.shuffle(teams)
+            random.shuffle(adjudicators)
+            for i in range(0, nteams, len(sides)):
+                room = i // len(sides)
+                debate = Debate.objects.create(round=round, room_rank=room + 1)
+                DebateTeam.objects.bulk_create([DebateTeam(debate=debate, team=team, side=side)
+                        for team, side in zip(teams[i:i+len(sides)], sides)])
+                panel = adjudicators[room*panel_size:(room+1)*panel_size]
+                DebateAdjudicator.objects.bulk_create([DebateAdjudicator(debate=debate, adjudicator=adj,
+                        type=DebateAdjudicator.TYPE_CHAIR if j == 0 else DebateAdjudicator.TYPE_PANEL)
+                        for j, adj in enumerate(panel)])
+            add_results_to_round(round, submitter_type=BallotSubmission.SUBMITTER_PUBLIC, user=None,
+                    confirmed=True)
+            self.stdout.write("Added results for {}".format(round.name))
+
+        return tournament
+
+    def run_benchmark(self, tournament, name, generator_class, generator_options, teams_in_debate, repeats):
+        if generator_class is TeamStandingsGenerator:
+            queryset = tournament.team_set.all()
+            generator = generator_class(TEAM_METRICS[teams_in_debate], TEAM_RANKINGS, **generator_options)
+        else:
+            queryset = Speaker.objects.filter(team__tournament=tournament)
+            generator = generator_class(SPEAKER_METRICS[teams_in_debate], SPEAKER_RANKINGS, **generator_options)
+        round = tournament.round_set.order_by('seq').last()
+
+        # Keep the fastest run. The first run of the snapshots and aggregates
+        # configurations is slower, because it creates them.
+        best = None
+        for i in range(repeats):
+            _, profile = profile_standings(generator, queryset, round)
+            if best is None or profile.total.time < best.total.time:
+                best = profile
+
+        self.stdout.write("  {}:".format(name))
+        timings = best.as_dict()
+        for key, timing in timings.items():
+            self.stdout.write("    {key:<32} {time:8.4f} s   {queries:5d} queries".format(key=key, **timing))
+        return timings
+
+    def compare(self, results, baseline, tolerance, min_time):
+        """Writes out timings that are slower, or make more queries, than in
+        the baseline. Returns the number of such regressions."""
+        regressions = 0
+        for config, timings in results.items():
+            if config not in baseline:
+                self.stdout.write(self.style.WARNING("{} is not in the baseline".format(config)))
+                continue
+            for key, timing in timings.items():
+                base = baseline[config].get(key)
+                if base is None:
+                    continue
+                slowdown = timing["time"] - base["time"]
+                if timing["queries"] > base["queries"]:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR("{}: {} made {:d} queries (baseline {:d})".format(
+                            config, key, timing["queries"], base["queries"])))
+                if slowdown > min_time and slowdown > base["time"] * tolerance:
+                    regressions += 1
+                    self.stdout.write(self.style.ERROR("{}: {} took {:.4f} s (baseline {:.4f} s)".format(
+                            config, key, timing["time"], base["time"])))
+        return regressions
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from utils.management.base import TournamentCommand
+
+from ...exports import clear_public_tab_exports, export_public_tabs
+
+
+class Command(TournamentCommand):
+
+    help = "Exports all released public tab pages, so that they're served " \
+           "without recalculating the standings. Exports are cleared " \
+           "automatically when results, the draw, participants or " \
+           "preferences change."
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument("-l", "--language", type=str, action="append", dest="languages", metavar="LANGUAGE",
+            help="Language code to export pages in (default: %s). Can be specified multiple times." % settings.LANGUAGE_CODE)
+        parser.add_argument("--clear", action="store_true", default=False,
+            help="Delete existing exports instead of exporting")
+
+    def handle_tournament(self, tournament, **options):
+        if options["clear"]:
+            clear_public_tab_exports(tournament.id)
+            self.stdout.write("Cleared public tab exports for {}".format(tournament.name))
+            return
+
+        count = export_public_tabs(tournament, languages=options["languages"])
+        if count is None:
+            raise CommandError("Exports for {} were cleared while they were being rendered, "
+                    "because something changed. Try again.".format(tournament.name))
+        self.stdout.write("Exported {:d} public tab pages for {}".format(count, tournament.name))
@@ -47,6 +47,9 @@ class BaseMetricAnnotator:
     repeatable = False
     listed = True
     ascending = False  # if True, this metric is sorted in ascending order, not descending
+    snapshot = True  # if False, this metric is always computed afresh, not stored in standings snapshots
+    uses_opponents = False  # if True, this metric depends on the metrics of opponents
+    columnar = False  # if True, this metric can be computed by the in-memory engine, see standings.columnar
 
     def run(self, queryset, standings, round=None):
         standings.record_added_metric(self.key, self.name, self.abbr, self.icon, self.ascending)
@@ -63,6 +66,16 @@ class BaseMetricAnnotator:
         """
         raise NotImplementedError("BaseMetricAnnotator subclasses must implement annotate()")
 
+    def run_from_columns(self, columns, standings):
+        standings.record_added_metric(self.key, self.name, self.abbr, self.icon, self.ascending)
+        self.annotate_from_columns(columns, standings)
+
+    def annotate_from_columns(self, columns, standings):
+        """Like `annotate()`, but computes the metric from `columns`, a
+        `ResultColumns` object, instead of the database. Subclasses that set
+        `columnar` to True must implement this method."""
+        raise NotImplementedError("BaseMetricAnnotator subclasses with columnar = True must implement annotate_from_columns()")
+
 
 class RepeatedMetricAnnotator(BaseMetricAnnotator):
     """Base class for metric annotators that can be used multiple times.
@@ -73,6 +86,7 @@ class RepeatedMetricAnnotator(BaseMetricAnnotator):
 
     ranked_only = True  # Repeated metrics don't make sense outside the precedence
     repeatable = True
+    snapshot = False  # Depends on which other items are tied, so can't be stored per item
 
     def __init__(self, index, keys):
         self.index = index
@@ -104,3 +118,18 @@ class QuerySetMetricAnnotator(BaseMetricAnnotator):
     def annotate(self, queryset, standings, round=None):
         queryset = self.get_annotated_queryset(queryset, "metric", round)
         self.annotate_with_queryset(queryset, standings, round)
+
+    def get_column_values(self, columns):
+        """Returns a dict mapping instance IDs to the metric, computed from
+        `columns`. Values of None are treated as zero, as in the database."""
+        raise NotImplementedError("Subclasses of QuerySetMetricAnnotator with columnar = True must implement get_column_values().")
+
+    def annotate_from_columns(self, columns, standings):
+        self.annotate_from_values(self.get_column_values(columns), standings)
+
+    def annotate_from_values(self, values, standings):
+        """Annotates `standings` from `values`, a dict mapping instance IDs to
+        the metric. Values of None are treated as zero, as in the database."""
+        for info in standings.infoview():
+            value = values.get(info.instance_id)
+            info.add_metric(self.key, 0 if value is None else value)
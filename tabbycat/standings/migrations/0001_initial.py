@@ -0,0 +1,53 @@
+# Generated by Django 2.0.8 on 2018-10-02 10:14
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('participants', '0007_auto_20180909_2156'),
+        ('tournaments', '0005_remove_tournament_current_round'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamStandingsSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrics', models.CharField(help_text='Comma-separated list of the metric keys stored in this snapshot', max_length=250, verbose_name='metrics')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='timestamp')),
+                ('round', models.ForeignKey(blank=True, help_text='Rounds after this round are excluded; if blank, all rounds are included', null=True, on_delete=django.db.models.deletion.CASCADE, to='tournaments.Round', verbose_name='round')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tournaments.Tournament', verbose_name='tournament')),
+            ],
+            options={
+                'verbose_name': 'team standings snapshot',
+                'verbose_name_plural': 'team standings snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamStandingsSnapshotRow',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrics', django.contrib.postgres.fields.jsonb.JSONField(verbose_name='metrics')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='standings.TeamStandingsSnapshot', verbose_name='snapshot')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='participants.Team', verbose_name='team')),
+            ],
+            options={
+                'verbose_name': 'team standings snapshot row',
+                'verbose_name_plural': 'team standings snapshot rows',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamstandingssnapshotrow',
+            unique_together={('snapshot', 'team')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamstandingssnapshot',
+            unique_together={('tournament', 'round', 'metrics')},
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.0.8 on 2018-10-04 21:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0007_auto_20180909_2156'),
+        ('tournaments', '0005_remove_tournament_current_round'),
+        ('standings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpeakerScoreAggregate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField(verbose_name='position')),
+                ('count', models.PositiveIntegerField(verbose_name='count')),
+                ('total', models.FloatField(verbose_name='total')),
+                ('sum_squared_deviations', models.FloatField(help_text='Sum of the squares of the differences between each score and the mean score', verbose_name='sum of squared deviations')),
+                ('highest', models.FloatField(verbose_name='highest')),
+                ('lowest', models.FloatField(verbose_name='lowest')),
+                ('round', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tournaments.Round', verbose_name='round')),
+                ('speaker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='participants.Speaker', verbose_name='speaker')),
+            ],
+            options={
+                'verbose_name': 'speaker score aggregate',
+                'verbose_name_plural': 'speaker score aggregates',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='speakerscoreaggregate',
+            unique_together={('speaker', 'round', 'position')},
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.0.8 on 2018-10-06 14:12
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0005_remove_tournament_current_round'),
+        ('standings', '0002_speakerscoreaggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PublicTabExport',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(help_text='Name of the view class that renders the page', max_length=100, verbose_name='view')),
+                ('category', models.SlugField(blank=True, help_text='Slug of the break or speaker category, if the page is for a category', verbose_name='category')),
+                ('language', models.CharField(max_length=10, verbose_name='language')),
+                ('tables_data', django.contrib.postgres.fields.jsonb.JSONField(verbose_name='tables data')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='timestamp')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='tournaments.Tournament', verbose_name='tournament')),
+            ],
+            options={
+                'verbose_name': 'public tab export',
+                'verbose_name_plural': 'public tab exports',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='publictabexport',
+            unique_together={('tournament', 'view', 'category', 'language')},
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.0.8 on 2018-10-19 09:24
+
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def populate_speakerscoreaggregate(apps, schema_editor):
+
+    SpeakerScore = apps.get_model('results', 'SpeakerScore')  # noqa: N806
+    SpeakerScoreAggregate = apps.get_model('standings', 'SpeakerScoreAggregate')  # noqa: N806
+
+    scores = defaultdict(list)
+    for speaker_id, round_id, position, score in SpeakerScore.objects.filter(
+            ballot_submission__confirmed=True, ghost=False).values_list(
+            'speaker_id', 'debate_team__debate__round_id', 'position', 'score').iterator():
+        scores[(speaker_id, round_id, position)].append(score)
+
+    aggregates = []
+    for (speaker_id, round_id, position), values in scores.items():
+        mean = sum(values) / len(values)
+        aggregates.append(SpeakerScoreAggregate(speaker_id=speaker_id, round_id=round_id, position=position,
+            count=len(values), total=sum(values), sum_squared_deviations=sum((x - mean) ** 2 for x in values),
+            highest=max(values), lowest=min(values)))
+
+    SpeakerScoreAggregate.objects.all().delete()
+    SpeakerScoreAggregate.objects.bulk_create(aggregates, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('results', '0003_queuedballot'),
+        ('standings', '0003_publictabexport'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_speakerscoreaggregate,
+            migrations.RunPython.noop,
+            elidable=True),
+    ]
@@ -0,0 +1,118 @@
+from django.contrib.postgres.fields import JSONField
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class TeamStandingsSnapshot(models.Model):
+    """Stores the metrics of team standings for a round, so that they don't
+    have to be recomputed every time the standings are generated. There is one
+    snapshot for each set of metrics that is asked for. The metric values for
+    each team are in the related `TeamStandingsSnapshotRow` instances.
+
+    Snapshots are created by `TeamStandingsGenerator`, and kept up to date by
+    the functions in `standings.snapshots`."""
+
+    tournament = models.ForeignKey('tournaments.Tournament', models.CASCADE,
+        verbose_name=_("tournament"))
+    round = models.ForeignKey('tournaments.Round', models.CASCADE, blank=True, null=True,
+        verbose_name=_("round"),
+        help_text=_("Rounds after this round are excluded; if blank, all rounds are included"))
+    metrics = models.CharField(max_length=250,
+        verbose_name=_("metrics"),
+        help_text=_("Comma-separated list of the metric keys stored in this snapshot"))
+    timestamp = models.DateTimeField(auto_now_add=True,
+        verbose_name=_("timestamp"))
+
+    class Meta:
+        unique_together = [('tournament', 'round', 'metrics')]
+        verbose_name = _("team standings snapshot")
+        verbose_name_plural = _("team standings snapshots")
+
+    def __str__(self):
+        return "[{0.id}] {0.tournament} {0.round}: {0.metrics}".format(self)
+
+
+class TeamStandingsSnapshotRow(models.Model):
+    snapshot = models.ForeignKey(TeamStandingsSnapshot, models.CASCADE, related_name='rows',
+        verbose_name=_("snapshot"))
+    team = models.ForeignKey('participants.Team', models.CASCADE,
+        verbose_name=_("team"))
+    metrics = JSONField(
+        verbose_name=_("metrics"))
+
+    class Meta:
+        unique_together = [('snapshot', 'team')]
+        verbose_name = _("team standings snapshot row")
+        verbose_name_plural = _("team standings snapshot rows")
+
+    def __str__(self):
+        return "[{0.snapshot_id}] {0.team}: {0.metrics}".format(self)
+
+
+class SpeakerScoreAggregate(models.Model):
+    """Stores running aggregates of a speaker's scores in a round, for each
+    position they spoke in, so that speaker standings can be computed from one
+    row per speaker per round, rather than from all speaker scores.
+
+    Only scores in confirmed ballots that aren't ghost scores are included.
+    Aggregates are kept up to date by the functions in `standings.aggregates`."""
+
+    speaker = models.ForeignKey('participants.Speaker', models.CASCADE,
+        verbose_name=_("speaker"))
+    round = models.ForeignKey('tournaments.Round', models.CASCADE,
+        verbose_name=_("round"))
+    position = models.IntegerField(
+        verbose_name=_("position"))
+    count = models.PositiveIntegerField(
+        verbose_name=_("count"))
+    total = models.FloatField(
+        verbose_name=_("total"))
+    sum_squared_deviations = models.FloatField(
+        verbose_name=_("sum of squared deviations"),
+        help_text=_("Sum of the squares of the differences between each score and the mean score"))
+    highest = models.FloatField(
+        verbose_name=_("highest"))
+    lowest = models.FloatField(
+        verbose_name=_("lowest"))
+
+    class Meta:
+        unique_together = [('speaker', 'round', 'position')]
+        verbose_name = _("speaker score aggregate")
+        verbose_name_plural = _("speaker score aggregates")
+
+    def __str__(self):
+        return "[{0.round_id}] {0.speaker} at {0.position}: {0.count} scores totalling {0.total}".format(self)
+
+
+class PublicTabExport(models.Model):
+    """Stores the table data of a public tab page, so that once the tab is
+    released, the page can be served without generating the standings.
+
+    Exports are created by `standings.exports.export_public_tabs()`, and
+    deleted by `standings.exports.clear_public_tab_exports()` when anything
+    that could change them (results, the draw, participants or preferences)
+    changes. While an export is in progress, there's also a marker row whose
+    `view` is blank."""
+
+    tournament = models.ForeignKey('tournaments.Tournament', models.CASCADE,
+        verbose_name=_("tournament"))
+    view = models.CharField(max_length=100,
+        verbose_name=_("view"),
+        help_text=_("Name of the view class that renders the page"))
+    category = models.SlugField(blank=True,
+        verbose_name=_("category"),
+        help_text=_("Slug of the break or speaker category, if the page is for a category"))
+    language = models.CharField(max_length=10,
+        verbose_name=_("language"))
+    tables_data = JSONField(
+        verbose_name=_("tables data"))
+    timestamp = models.DateTimeField(auto_now_add=True,
+        verbose_name=_("timestamp"))
+
+    class Meta:
+        unique_together = [('tournament', 'view', 'category', 'language')]
+        verbose_name = _("public tab export")
+        verbose_name_plural = _("public tab exports")
+
+    def __str__(self):
+        return "[{0.id}] {0.tournament} {0.view} {0.category} ({0.language})".format(self)
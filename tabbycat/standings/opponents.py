@@ -0,0 +1,56 @@
+"""Opponent matrix for metrics derived from the metrics of opponents."""
+
+import logging
+
+import numpy as np
+
+from draw.models import DebateTeam
+from tournaments.models import Round
+
+logger = logging.getLogger(__name__)
+
+
+class OpponentMatrix:
+    """Records how many times each pair of teams in a tournament has faced
+    each other in preliminary rounds, as an array. This allows any metric
+    derived from opponents' metrics (like draw strength) to be computed with a
+    single matrix multiplication, from a single query for the draw.
+
+    If `round` is specified, rounds after `round` are excluded."""
+
+    def __init__(self, tournament, round=None):
+        debateteams = DebateTeam.objects.filter(debate__round__tournament=tournament,
+                debate__round__stage=Round.STAGE_PRELIMINARY)
+        if round is not None:
+            debateteams = debateteams.filter(debate__round__seq__lte=round.seq)
+        edges = list(debateteams.values_list('team_id', 'debate_id'))
+
+        self.team_ids = sorted({team_id for team_id, _ in edges})
+        self._team_index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        debate_index = {debate_id: i for i, debate_id in enumerate({debate_id for _, debate_id in edges})}
+
+        # incidence[i, j] is 1 if team i was in debate j; multiplying it by its
+        # transpose counts the debates that each pair of teams was in together
+        incidence = np.zeros((len(self.team_ids), len(debate_index)), dtype=int)
+        for team_id, debate_id in edges:
+            incidence[self._team_index[team_id], debate_index[debate_id]] += 1
+        self.matrix = incidence @ incidence.T
+        np.fill_diagonal(self.matrix, 0)
+
+        logger.debug("Built opponent matrix for %d teams in %d debates", len(self.team_ids), len(debate_index))
+
+    def count(self, team_id, opponent_id):
+        """Returns the number of times the two teams have faced each other."""
+        try:
+            return self.matrix[self._team_index[team_id], self._team_index[opponent_id]].item()
+        except KeyError:
+            return 0
+
+    def sum_over_opponents(self, values):
+        """Given a dict mapping team IDs to numbers, returns a dict mapping
+        team IDs to the sum of those numbers over the team's opponents, with
+        each opponent counted once for every time the team faced them. Teams
+        missing from `values`, or for which it is None, count as 0."""
+        vector = np.array([values.get(team_id) or 0 for team_id in self.team_ids])
+        totals = self.matrix @ vector
+        return dict(zip(self.team_ids, totals.tolist()))
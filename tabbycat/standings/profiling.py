@@ -0,0 +1,121 @@
+"""Functions for profiling standings generators.
+
+`profile_standings()` generates standings as usual, but records the wall time
+taken and the number of database queries made by each metric and ranking
+annotator. Whichever way the generator runs an annotator (from the database,
+from in-memory columns, or from speaker score aggregates) is timed, so this
+can be used to compare the standings engines. Everything else the generator
+does, like loading columns or snapshots and sorting, is reported together as
+"other". See the `benchmarkstandings` command for how this is used."""
+
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+
+from django.db import connection
+
+# Methods that the generators call to run an annotator
+ANNOTATOR_RUN_METHODS = ['run', 'run_from_columns', 'run_from_aggregates']
+
+
+class AnnotatorTiming:
+    """Accumulates the time and queries taken by one annotator."""
+
+    def __init__(self, key, kind):
+        self.key = key
+        self.kind = kind  # "metric", "ranking" or "other"
+        self.time = 0.0
+        self.queries = 0
+
+    def __repr__(self):
+        return "<AnnotatorTiming {0.kind} {0.key}: {0.time:.4f} s, {0.queries:d} queries>".format(self)
+
+    def as_dict(self):
+        return {'time': self.time, 'queries': self.queries}
+
+
+class StandingsProfile:
+    """The timings of one call to a standings generator."""
+
+    def __init__(self):
+        self.timings = OrderedDict()
+        self.total = AnnotatorTiming("total", "other")
+
+    def __iter__(self):
+        return iter(self.timings.values())
+
+    def add(self, key, kind):
+        return self.timings.setdefault((kind, key), AnnotatorTiming(key, kind))
+
+    @property
+    def other(self):
+        """Time and queries not accounted for by any annotator."""
+        other = AnnotatorTiming("other", "other")
+        other.time = self.total.time - sum(t.time for t in self)
+        other.queries = self.total.queries - sum(t.queries for t in self)
+        return other
+
+    def as_dict(self):
+        """Returns the timings as a dict mapping names like "metric:points" to
+        dicts with keys "time" and "queries", suitable for storing as JSON."""
+        result = OrderedDict(("{}:{}".format(t.kind, t.key), t.as_dict()) for t in self)
+        result["other"] = self.other.as_dict()
+        result["total"] = self.total.as_dict()
+        return result
+
+
+@contextmanager
+def _measure(timing):
+    """Adds the time and number of queries taken inside the context manager to
+    `timing`. Queries are counted using a database execute wrapper, so this
+    works with `DEBUG = False` and nests."""
+
+    def count_query(execute, sql, params, many, context):
+        timing.queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing.time += time.perf_counter() - start
+
+
+def _timed(method, timing):
+    def wrapper(*args, **kwargs):
+        with _measure(timing):
+            return method(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def _instrument(annotator, timing):
+    """Wraps the annotator's run methods, on this instance only, so that
+    calls to them are added to `timing`."""
+    wrapped = [name for name in ANNOTATOR_RUN_METHODS if hasattr(annotator, name)]
+    for name in wrapped:
+        setattr(annotator, name, _timed(getattr(annotator, name), timing))
+    try:
+        yield
+    finally:
+        for name in wrapped:
+            delattr(annotator, name)
+
+
+def profile_standings(generator, queryset, round=None):
+    """Generates standings using `generator`, as `generator.generate()` would.
+    Returns a tuple `(standings, profile)`, where `profile` is a
+    `StandingsProfile` with the time and queries of each annotator."""
+
+    profile = StandingsProfile()
+    annotators = [(a, "metric") for a in generator.metric_annotators] + \
+                 [(a, "ranking") for a in generator.ranking_annotators]
+
+    with ExitStack() as stack:
+        for annotator, kind in annotators:
+            stack.enter_context(_instrument(annotator, profile.add(annotator.key, kind)))
+        with _measure(profile.total):
+            standings = generator.generate(queryset, round=round)
+
+    return standings, profile
@@ -8,13 +8,52 @@ but there are other "types" of ranks, for example, ranks within brackets
 """
 
 import logging
-from itertools import groupby
 
-from .metrics import metricgetter
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+def rank_within_groups(codes, groups=None):
+    """Computes ranks from rows of metric codes that are already in ranked
+    order (see `Standings.get_metric_codes()`). Rows with equal codes share a
+    rank. If `groups` is given, it is an array of group numbers for each row,
+    rows are ranked only against others in the same group, and rows with a
+    negative group number aren't ranked.
+
+    Returns a tuple `(ranks, shared)` of arrays, where `ranks` is 0 for rows
+    that aren't ranked, and `shared` is True for rows whose rank is shared."""
+    n = len(codes)
+    ranks = np.zeros(n, dtype=int)
+    shared = np.zeros(n, dtype=bool)
+
+    if groups is None:
+        order = np.arange(n)
+    else:
+        order = np.argsort(groups, kind='mergesort')  # stable, so ranked order is kept within groups
+        order = order[groups[order] >= 0]
+    if len(order) == 0:
+        return ranks, shared
+
+    # A tie starts wherever a row differs from the previous row, or starts a group
+    codes = codes[order]
+    new_group = np.zeros(len(order), dtype=bool)
+    new_group[0] = True
+    if groups is not None:
+        new_group[1:] = groups[order][1:] != groups[order][:-1]
+    new_tie = new_group.copy()
+    new_tie[1:] |= (codes[1:] != codes[:-1]).any(axis=1)
+
+    index = np.arange(len(order))
+    group_start = np.maximum.accumulate(np.where(new_group, index, 0))
+    tie_start = np.maximum.accumulate(np.where(new_tie, index, 0))
+    tie_number = np.cumsum(new_tie) - 1
+
+    ranks[order] = tie_start - group_start + 1
+    shared[order] = np.bincount(tie_number)[tie_number] > 1
+    return ranks, shared
+
+
 class BaseRankAnnotator:
     """Base class for all rank annotators.
 
@@ -39,13 +78,13 @@ class BaseRankAnnotator:
 
     def run(self, standings):
         standings.record_added_ranking(self.key, self.name, self.abbr, self.icon)
-        self.annotate(standings.rank_eligible)
+        self.annotate(standings)
 
     def annotate(self, standings):
-        """Annotates the given `standings` by calling `add_ranking()` on every
-        `TeamStandingInfo` object in `standings`.
+        """Annotates the rank-eligible instances in the given `standings`,
+        normally by calling `standings.add_rankings()`.
 
-        `standings` is a `TeamStandings` object.
+        `standings` is a sorted `Standings` object.
         """
         raise NotImplementedError("BaseRankAnnotator subclasses must implement annotate()")
 
@@ -58,32 +97,31 @@ class BasicRankAnnotator(BaseRankAnnotator):
     icon = "bar-chart"
 
     def __init__(self, metrics):
-        self.rank_key = metricgetter(*metrics)
+        self.rank_metrics = metrics
 
     def annotate(self, standings):
-        rank = 1
-        for key, group in groupby(standings, key=self.rank_key):
-            group = list(group)
-            for info in group:
-                info.add_ranking("rank", (rank, len(group) > 1))
-            rank += len(group)
+        codes = standings.get_metric_codes(self.rank_metrics)
+        standings.add_rankings(self.key, *rank_within_groups(codes))
 
 
 class BaseRankWithinGroupAnnotator(BaseRankAnnotator):
     """Base class for ranking annotators that rank within groups.
 
-    Subclasses must define `self.group_key` and `self.rank_key`."""
+    Subclasses must define `self.rank_metrics` and either `self.group_key`,
+    which returns the group of a StandingInfo (or None to leave it unranked),
+    or `get_groups()`."""
+
+    def get_groups(self, standings):
+        """Returns an array of group numbers for the rank-eligible instances in
+        `standings`, with -1 for those not in any group."""
+        numbers = {None: -1}
+        return np.array([numbers.setdefault(group, len(numbers) - 1)
+                for group in standings.get_group_values(self.group_key)], dtype=int)
 
     def annotate(self, standings):
-        filtered = [tsi for tsi in standings if self.group_key(tsi) is not None]
-        by_group = sorted(filtered, key=self.group_key)
-        for key, group in groupby(by_group, key=self.group_key):
-            rank_in_group = 1
-            for _, subgroup in groupby(group, self.rank_key):
-                subgroup = list(subgroup)
-                for tsi in subgroup:
-                    tsi.add_ranking(self.key, (rank_in_group, len(subgroup) > 1))
-                rank_in_group += len(subgroup)
+        codes = standings.get_metric_codes(self.rank_metrics)
+        groups = self.get_groups(standings)
+        standings.add_rankings(self.key, *rank_within_groups(codes, groups))
 
 
 class SubrankAnnotator(BaseRankWithinGroupAnnotator):
@@ -93,8 +131,11 @@ class SubrankAnnotator(BaseRankWithinGroupAnnotator):
     abbr = "Sub"
 
     def __init__(self, metrics):
-        self.group_key = metricgetter(metrics[0])
-        self.rank_key = metricgetter(*metrics[1:])
+        self.group_metric = metrics[0]
+        self.rank_metrics = metrics[1:]
+
+    def get_groups(self, standings):
+        return standings.get_metric_codes([self.group_metric])[:, 0]
 
 
 class DivisionRankAnnotator(BaseRankWithinGroupAnnotator):
@@ -104,7 +145,7 @@ class DivisionRankAnnotator(BaseRankWithinGroupAnnotator):
     abbr = "Div"
 
     def __init__(self, metrics):
-        self.rank_key = metricgetter(*metrics)
+        self.rank_metrics = metrics
 
     @staticmethod
     def group_key(tsi):
@@ -118,7 +159,7 @@ class RankFromInstitutionAnnotator(BaseRankWithinGroupAnnotator):
     abbr = "Inst"
 
     def __init__(self, metrics):
-        self.rank_key = metricgetter(*metrics)
+        self.rank_metrics = metrics
 
     @staticmethod
     def group_key(tsi):
@@ -1,53 +1,71 @@
 import logging
+from collections import defaultdict
 
+import numpy as np
 from django.db.models import Prefetch
 
 from draw.models import DebateTeam
-from draw.prefetch import populate_opponents
 from results.models import SpeakerScore, TeamScore
 
 logger = logging.getLogger(__name__)
 
 
-def add_team_round_results(standings, rounds, opponents=False, lookup=None, id_attr='instance_id'):
-    """Sets, on each item `info` in `standings`, an attribute
-    `info.round_results` to be a list of `TeamScore` objects, one for each round
-    in `rounds` (in the same order), relating to the team associated with that
-    item.
+def get_team_round_results(team_ids, rounds, opponents=False):
+    """Returns a dict mapping each team ID in `team_ids` to a list of
+    `TeamScore` objects, one for each round in `rounds` (in the same order),
+    or `None` where the team has no confirmed result in that round.
 
-    If, for some team and round, there is no relevant `TeamScore`, then the
-    corresponding element of `info.round_results` will be `None`.
-
-    If `lookup` is given, it should be a function that takes two arguments
-    `(standings, x)` and returns the element in `standings` relating to the
-    `Team` object `x`.  By default, it just uses `standings.get_standings(x)`.
-    """
+    The confirmed team scores of all debates involving these teams in `rounds`
+    are fetched in one query, including those of their opponents, so that if
+    `opponents` is True, each team's opponent can be found among them without
+    further queries. (The opponent is set as `ts.debate_team.opponent`, with
+    its speakers prefetched.) Otherwise, `ts.debate_team.debate.debateteam_set`
+    is prefetched instead."""
 
-    if lookup is None:
-        def lookup(standings, x):
-            return standings.get_standing(x)
-
-    team_ids = [getattr(info, id_attr) for info in standings]
     teamscores = TeamScore.objects.select_related(
         'debate_team__team', 'debate_team__debate__round').filter(
         ballot_submission__confirmed=True,
         debate_team__debate__round__in=rounds,
-        debate_team__team_id__in=team_ids
-    )
+        debate_team__debate__debateteam__team_id__in=team_ids,
+    ).distinct()
 
     if opponents:
-        populate_opponents([ts.debate_team for ts in teamscores])
+        teamscores = teamscores.prefetch_related('debate_team__team__speaker_set')
     else:
         teamscores = teamscores.prefetch_related(
             Prefetch('debate_team__debate__debateteam_set', queryset=DebateTeam.objects.select_related('team')))
 
-    for info in standings:
-        info.round_results = [None] * len(rounds)
+    round_index = {r.id: i for i, r in enumerate(rounds)}
+    results = {team_id: [None] * len(rounds) for team_id in team_ids}
+    by_debate = defaultdict(list)
 
-    round_lookup = {r: i for i, r in enumerate(rounds)}
     for ts in teamscores:
-        info = lookup(standings, ts.debate_team.team)
-        info.round_results[round_lookup[ts.debate_team.debate.round]] = ts
+        by_debate[ts.debate_team.debate_id].append(ts.debate_team)
+        if ts.debate_team.team_id in results:
+            results[ts.debate_team.team_id][round_index[ts.debate_team.debate.round_id]] = ts
+
+    if opponents:
+        for debateteams in by_debate.values():
+            if len(debateteams) != 2:
+                continue  # let DebateTeam.opponent look it up (and complain) if it's needed
+            debateteams[0]._opponent, debateteams[1]._opponent = debateteams[1], debateteams[0]
+
+    return results
+
+
+def add_team_round_results(standings, rounds, opponents=False, id_attr='instance_id'):
+    """Sets, on each item `info` in `standings`, an attribute
+    `info.round_results` to be a list of `TeamScore` objects, one for each round
+    in `rounds` (in the same order), relating to the team associated with that
+    item. `id_attr` is the attribute of each item that holds the team ID.
+
+    If, for some team and round, there is no relevant `TeamScore`, then the
+    corresponding element of `info.round_results` will be `None`.
+    """
+    standings = list(standings)
+    results = get_team_round_results([getattr(info, id_attr) for info in standings], rounds, opponents)
+    for info in standings:
+        info.round_results = results[getattr(info, id_attr)]
 
 
 def add_team_round_results_public(teams, rounds, opponents=False):
@@ -58,8 +76,7 @@ def add_team_round_results_public(teams, rounds, opponents=False):
       - `t.points`, the number of points that team has from the rounds in
         `rounds`.
     """
-    add_team_round_results(teams, rounds, opponents=opponents,
-        lookup=(lambda teams, x: [t for t in teams if t == x][0]), id_attr='id')
+    add_team_round_results(teams, rounds, opponents=opponents, id_attr='id')
     for team in teams:
         team.points = sum([ts.points for ts in team.round_results if ts])
 
@@ -70,23 +87,28 @@ def add_speaker_round_results(standings, rounds, tournament, replies=False):
     received by the speaker associated with `info` in the corresponding round.
     If there is no score available for a speaker and round, the corresponding
     element will be `None`.
+
+    The scores are fetched as (speaker, round, score) tuples in one query, and
+    placed in an array with a row for each speaker and a column for each round.
     """
 
-    speaker_ids = [info.instance_id for info in standings]
-    speaker_scores = SpeakerScore.objects.select_related('speaker',
-        'ballot_submission', 'debate_team__debate__round').filter(
+    standings = list(standings)
+    speaker_index = {info.instance_id: i for i, info in enumerate(standings)}
+    round_index = {r.id: i for i, r in enumerate(rounds)}
+
+    speaker_scores = SpeakerScore.objects.filter(
         ballot_submission__confirmed=True, debate_team__debate__round__in=rounds,
-        speaker_id__in=speaker_ids, ghost=False)
+        speaker_id__in=list(speaker_index), ghost=False)
 
     if replies:
         speaker_scores = speaker_scores.filter(position=tournament.reply_position)
     else:
         speaker_scores = speaker_scores.filter(position__lte=tournament.last_substantive_position)
 
-    for info in standings:
-        info.scores = [None] * len(rounds)
+    scores = np.full((len(standings), len(rounds)), np.nan)
+    for speaker_id, round_id, score in speaker_scores.values_list(
+            'speaker_id', 'debate_team__debate__round_id', 'score'):
+        scores[speaker_index[speaker_id], round_index[round_id]] = score
 
-    round_lookup = {r: i for i, r in enumerate(rounds)}
-    for ss in speaker_scores:
-        info = standings.get_standing(ss.speaker)
-        info.scores[round_lookup[ss.debate_team.debate.round]] = ss.score
+    for info, row in zip(standings, scores.tolist()):
+        info.scores = [None if score != score else score for score in row]  # NaN != NaN
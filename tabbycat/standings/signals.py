@@ -0,0 +1,134 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from options.models import TournamentPreferenceModel
+from participants.models import Speaker, Team
+from results.models import BallotSubmission
+from tournaments.models import Round
+
+from .aggregates import update_speaker_score_aggregates_for_debate
+from .exports import clear_public_tab_exports
+from .snapshots import clear_team_standings_snapshots, update_team_standings_snapshots
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=BallotSubmission)
+def record_ballot_confirmed_status(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._was_confirmed = False
+    else:
+        instance._was_confirmed = BallotSubmission.objects.filter(pk=instance.pk, confirmed=True).exists()
+
+
+@receiver(post_save, sender=BallotSubmission)
+def update_snapshots_on_ballot_save(sender, instance, raw=False, **kwargs):
+    """Confirming or unconfirming a ballot only affects the teams in that
+    debate (and their opponents), so just update those teams."""
+    if raw or instance.confirmed == getattr(instance, '_was_confirmed', False):
+        return
+    update_team_standings_snapshots(instance.debate_id)
+    update_speaker_score_aggregates_for_debate(instance.debate_id)
+
+
+@receiver(post_delete, sender=BallotSubmission)
+def update_snapshots_on_ballot_delete(sender, instance, **kwargs):
+    """The ballot's scores are deleted before it is, so this recomputes the
+    debate once, without them."""
+    if instance.confirmed:
+        update_team_standings_snapshots(instance.debate_id)
+        update_speaker_score_aggregates_for_debate(instance.debate_id)
+
+
+@receiver(pre_save, sender=Round)
+def record_round_order(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._previous_order = None
+    else:
+        instance._previous_order = Round.objects.filter(pk=instance.pk).values_list('seq', 'stage').first()
+
+
+@receiver(post_save, sender=Round)
+def clear_snapshots_on_round_order_change(sender, instance, raw=False, **kwargs):
+    """Snapshots include all preliminary rounds up to theirs, so adding a round,
+    or changing a round's place or stage, affects the snapshots of every round
+    from there on (or from its old place, if that was earlier)."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous_order', None)
+    if previous is None:
+        clear_team_standings_snapshots(instance)
+    elif previous != (instance.seq, instance.stage):
+        clear_team_standings_snapshots(instance, seq=min(previous[0], instance.seq))
+
+
+@receiver(post_delete, sender=Round)
+def clear_snapshots_on_round_delete(sender, instance, **kwargs):
+    clear_team_standings_snapshots(instance)
+
+
+# ==============================================================================
+# Public tab exports
+# ==============================================================================
+
+@receiver(post_delete, sender=BallotSubmission)
+@receiver(post_save, sender=BallotSubmission)
+def clear_exports_on_ballot_change(sender, instance, raw=False, **kwargs):
+    """Scores are saved many at a time, so they're handled once per ballot, by
+    this and by `results.result.notify_scores_saved()`."""
+    if raw:
+        return
+    tournament_id = Round.objects.filter(debate__id=instance.debate_id).values_list('tournament_id', flat=True).first()
+    if tournament_id is not None:
+        clear_public_tab_exports(tournament_id)
+
+
+@receiver(post_delete, sender=Team)
+@receiver(post_save, sender=Team)
+def clear_exports_on_team_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        clear_public_tab_exports(instance.tournament_id)
+
+
+@receiver(post_delete, sender=Speaker)
+@receiver(post_save, sender=Speaker)
+def clear_exports_on_speaker_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    tournament_id = Team.objects.filter(id=instance.team_id).values_list('tournament_id', flat=True).first()
+    if tournament_id is not None:
+        clear_public_tab_exports(tournament_id)
+
+
+@receiver(post_delete, sender=Round)
+@receiver(post_save, sender=Round)
+def clear_exports_on_round_change(sender, instance, raw=False, **kwargs):
+    """Rounds (e.g. which rounds are silent) change what's on the tab pages,
+    too."""
+    if not raw:
+        clear_public_tab_exports(instance.tournament_id)
+
+
+@receiver(pre_save, sender=TournamentPreferenceModel)
+def record_preference_value(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        instance._previous_raw_value = None
+    else:
+        instance._previous_raw_value = TournamentPreferenceModel.objects.filter(
+                pk=instance.pk).values_list('raw_value', flat=True).first()
+
+
+@receiver(post_save, sender=TournamentPreferenceModel)
+def clear_exports_on_preference_change(sender, instance, created=False, raw=False, **kwargs):
+    """Preferences (e.g. tab limits) change what's on the tab pages, too. But
+    dynamic-preferences stores the default value of a preference the first
+    time it's read, which doesn't change anything."""
+    if raw:
+        return
+    if created:
+        changed = instance.value != instance.preference.default
+    else:
+        changed = instance.raw_value != getattr(instance, '_previous_raw_value', None)
+    if changed:
+        clear_public_tab_exports(instance.instance_id)
@@ -0,0 +1,178 @@
+"""Functions for keeping materialized team standings ("snapshots").
+
+Computing team standings from scratch takes a conditional aggregation over all
+TeamScore instances for every metric, which is slow for large tournaments. So
+`TeamStandingsGenerator` stores the metrics it computes for each team in a
+`TeamStandingsSnapshot`, one for each combination of round and metrics, and
+reads them from there next time.
+
+When a ballot is confirmed or unconfirmed, only the teams in that debate (and,
+for metrics like draw strength, their opponents) are recomputed. Other changes
+that could affect the standings, like changes to the draw, to the scores in a
+confirmed ballot or to the order of rounds, just delete the snapshots, so that
+they're recomputed in full when next needed. See `standings.signals`, and the
+callers of `clear_team_standings_snapshots()`, for when these are called.
+
+Metrics that depend on how teams compare to each other (i.e., who-beat-whom)
+aren't stored, and are always computed afresh."""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from draw.models import DebateTeam
+from participants.models import Team
+from tournaments.models import Round
+
+from .base import Standings
+from .models import TeamStandingsSnapshot, TeamStandingsSnapshotRow
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_metrics_key(annotators):
+    return ",".join(sorted(annotator.key for annotator in annotators))
+
+
+def run_annotators(annotators, queryset, standings, round=None):
+    for annotator in annotators:
+        annotator.run(queryset, standings, round)
+
+
+def compute_team_metrics(annotators, team_ids, round=None, run=run_annotators):
+    """Runs the given metric annotators on the teams with the given IDs, and
+    returns a dict mapping team IDs to dicts of metrics."""
+    queryset = Team.objects.filter(id__in=team_ids)
+    standings = Standings(queryset)
+    run(annotators, queryset, standings, round)
+    return {info.instance_id: info.metrics for info in standings.infoview()}
+
+
+def get_team_standings_snapshot(tournament_id, round, metrics_key):
+    snapshots = TeamStandingsSnapshot.objects.filter(tournament_id=tournament_id,
+            round=round, metrics=metrics_key).order_by('id')
+    snapshot = snapshots.first()
+    if snapshot is None:
+        try:
+            with transaction.atomic():
+                snapshot = TeamStandingsSnapshot.objects.create(tournament_id=tournament_id,
+                        round=round, metrics=metrics_key)
+        except IntegrityError:
+            # Another request created it first.
+            logger.info("Standings snapshot for %s was created by another request", metrics_key)
+            snapshot = snapshots.first()
+    return snapshot
+
+
+def lock_team_standings_snapshot(snapshot):
+    """Locks the snapshot until the end of the current transaction, so that
+    requests changing its rows take turns, and each computes from the results
+    committed before it. Returns False if the snapshot has been deleted."""
+    return TeamStandingsSnapshot.objects.select_for_update().filter(
+            pk=snapshot.pk).values_list('id', flat=True).first() is not None
+
+
+def annotate_from_snapshot(annotators, queryset, standings, round=None, run=run_annotators):
+    """Annotates `standings` with the metrics from `annotators`, reading stored
+    metrics from the relevant snapshot where possible. Teams that aren't in the
+    snapshot yet are computed and added to it. Metrics that aren't stored are
+    computed by calling `run(annotators, queryset, standings, round)`."""
+
+    stored = [annotator for annotator in annotators if annotator.snapshot]
+
+    if round is not None:
+        tournament_ids = [round.tournament_id]
+    else:
+        tournament_ids = list(queryset.order_by().values_list('tournament_id', flat=True).distinct())
+
+    if not stored or len(tournament_ids) != 1:
+        run(annotators, queryset, standings, round)
+        return
+
+    snapshot = get_team_standings_snapshot(tournament_ids[0], round, snapshot_metrics_key(stored))
+    rows = dict(snapshot.rows.filter(team__in=queryset).values_list('team_id', 'metrics'))
+
+    missing = [info.instance_id for info in standings.infoview() if info.instance_id not in rows]
+    if missing:
+        with transaction.atomic():
+            locked = lock_team_standings_snapshot(snapshot)
+            if locked:
+                # Another request may have added some while this one waited
+                rows.update(snapshot.rows.filter(team_id__in=missing).values_list('team_id', 'metrics'))
+                missing = [team_id for team_id in missing if team_id not in rows]
+            if missing:
+                logger.info("Computing %d teams missing from standings snapshot %d", len(missing), snapshot.id)
+                computed = compute_team_metrics(stored, missing, round, run)
+                if locked:
+                    TeamStandingsSnapshotRow.objects.bulk_create([
+                        TeamStandingsSnapshotRow(snapshot=snapshot, team_id=team_id, metrics=metrics)
+                        for team_id, metrics in computed.items()])
+                rows.update(computed)
+
+    for annotator in annotators:
+        if not annotator.snapshot:
+            run([annotator], queryset, standings, round)
+            continue
+
+        standings.record_added_metric(annotator.key, annotator.name, annotator.abbr, annotator.icon, annotator.ascending)
+        for info in standings.infoview():
+            metrics = rows[info.instance_id]
+            if annotator.key in metrics:
+                info.add_metric(annotator.key, metrics[annotator.key])
+
+
+def _snapshots_affected_by(round, seq=None):
+    if seq is None:
+        seq = round.seq
+    return TeamStandingsSnapshot.objects.filter(tournament_id=round.tournament_id).filter(
+            Q(round__isnull=True) | Q(round__seq__gte=seq)).select_related('round')
+
+
+def update_team_standings_snapshots(debate_id):
+    """Recomputes the rows of the teams in the given debate, and of their
+    opponents if needed, in all snapshots that include the debate's round."""
+    from .teams import TeamStandingsGenerator  # avoid circular import
+
+    round = Round.objects.filter(debate__id=debate_id).first()
+    if round is None or round.stage != Round.STAGE_PRELIMINARY:
+        return
+
+    snapshots = list(_snapshots_affected_by(round))
+    if not snapshots:
+        return
+
+    team_ids = set(DebateTeam.objects.filter(debate_id=debate_id).values_list('team_id', flat=True))
+
+    for snapshot in snapshots:
+        generator = TeamStandingsGenerator(snapshot.metrics.split(","), ())
+        annotators = generator.metric_annotators
+        affected = set(team_ids)
+
+        if any(annotator.uses_opponents for annotator in annotators):
+            opponents = DebateTeam.objects.filter(debate__debateteam__team_id__in=team_ids,
+                    debate__round__stage=Round.STAGE_PRELIMINARY)
+            if snapshot.round is not None:
+                opponents = opponents.filter(debate__round__seq__lte=snapshot.round.seq)
+            affected.update(opponents.values_list('team_id', flat=True))
+
+        with transaction.atomic():
+            if not lock_team_standings_snapshot(snapshot):
+                continue
+            logger.info("Updating %d teams in standings snapshot %d", len(affected), snapshot.id)
+            computed = compute_team_metrics(annotators, affected, snapshot.round, generator.run_metric_annotators)
+            for team_id, metrics in computed.items():
+                snapshot.rows.filter(team_id=team_id).update(metrics=metrics)
+
+
+def clear_team_standings_snapshots(round, seq=None):
+    """Deletes all snapshots that include the given round, so that they will be
+    recomputed in full. If `seq` is given, deletes those that include any round
+    of the tournament from that `seq` onwards instead.
+
+    This isn't done by signal receivers on `DebateTeam` and `TeamScore`, since
+    those are saved many at a time. Whatever changes the draw or the scores in
+    a confirmed ballot should call this once, when it's done."""
+    deleted, _ = _snapshots_affected_by(round, seq).delete()
+    if deleted:
+        logger.info("Cleared standings snapshots from %s", round)
@@ -2,12 +2,15 @@
 
 import logging
 
+import numpy as np
 from django.utils.translation import gettext_lazy as _
 from django.db.models import Avg, Case, Count, F, FloatField, Max, Min, Q, StdDev, Sum, When
 
 from tournaments.models import Round
 
+from .aggregates import SpeakerScoreAggregates
 from .base import BaseStandingsGenerator
+from .columnar import COLUMN_AGGREGATES, SpeakerResultColumns
 from .metrics import QuerySetMetricAnnotator
 from .ranking import BasicRankAnnotator
 
@@ -43,6 +46,35 @@ class SpeakerScoreQuerySetMetricAnnotator(QuerySetMetricAnnotator):
 
         return self.function('speakerscore__score', filter=annotation_filter)
 
+    @property
+    def columnar(self):
+        return self.function in COLUMN_AGGREGATES
+
+    def get_column_scores(self, columns):
+        """Returns a (values, mask) pair for the speaker scores this metric
+        is computed from."""
+        positions = columns.values['position']
+        if not self.replies:
+            mask = positions <= columns.last_substantive_position
+        elif columns.reply_position is not None:
+            mask = positions == columns.reply_position
+        else:
+            mask = np.zeros(len(columns), dtype=bool)
+        return columns.get('score', mask)
+
+    def get_column_values(self, columns):
+        values, mask = self.get_column_scores(columns)
+        return columns.aggregate(self.function, values, mask)
+
+    def run_from_aggregates(self, aggregates, standings):
+        standings.record_added_metric(self.key, self.name, self.abbr, self.icon, self.ascending)
+        self.annotate_from_values(self.get_aggregate_values(aggregates), standings)
+
+    def get_aggregate_values(self, aggregates):
+        """Returns a dict mapping speaker IDs to the metric, computed from
+        `aggregates`, a `SpeakerScoreAggregates` object."""
+        return aggregates.aggregate(self.function, self.replies)
+
 
 class TotalSpeakerScoreMetricAnnotator(SpeakerScoreQuerySetMetricAnnotator):
     """Metric annotator for total speaker score."""
@@ -92,6 +124,37 @@ class TrimmedMeanSpeakerScoreMetricAnnotator(SpeakerScoreQuerySetMetricAnnotator
             output_field=FloatField()
         )
 
+    columnar = True
+
+    def get_column_values(self, columns):
+        values, mask = self.get_column_scores(columns)
+        return self.trimmed_means(
+            columns.aggregate(Sum, values, mask),
+            columns.aggregate(Count, values, mask),
+            columns.aggregate(Max, values, mask),
+            columns.aggregate(Min, values, mask),
+        )
+
+    def get_aggregate_values(self, aggregates):
+        return self.trimmed_means(
+            aggregates.aggregate(Sum, self.replies),
+            aggregates.aggregate(Count, self.replies),
+            aggregates.aggregate(Max, self.replies),
+            aggregates.aggregate(Min, self.replies),
+        )
+
+    @staticmethod
+    def trimmed_means(totals, counts, highest, lowest):
+        trimmed_means = {}
+        for speaker_id, count in counts.items():
+            if count > 2:
+                trimmed_means[speaker_id] = (totals[speaker_id] - highest[speaker_id] - lowest[speaker_id]) / (count - 2)
+            elif count > 0:
+                trimmed_means[speaker_id] = totals[speaker_id] / count
+            else:
+                trimmed_means[speaker_id] = None
+        return trimmed_means
+
 
 class StandardDeviationSpeakerScoreMetricAnnotator(SpeakerScoreQuerySetMetricAnnotator):
     """Metric annotator for standard deviation of speaker score."""
@@ -164,8 +227,15 @@ class SpeakerStandingsGenerator(BaseStandingsGenerator):
         standings = generator.generate(teams)
 
     The generate() method returns a TeamStandings object.
+
+    Metrics are computed from the stored aggregates of each speaker's scores
+    in each round (see `standings.aggregates`). To compute them from speaker
+    scores instead, pass `use_aggregates=False` to the constructor.
     """
 
+    DEFAULT_OPTIONS = BaseStandingsGenerator.DEFAULT_OPTIONS.copy()
+    DEFAULT_OPTIONS["use_aggregates"] = True
+
     TIEBREAK_FUNCTIONS = BaseStandingsGenerator.TIEBREAK_FUNCTIONS.copy()
     TIEBREAK_FUNCTIONS["name"] = lambda x: x.sort(key=lambda y: y.speaker.name)
     TIEBREAK_FUNCTIONS["institution"] = lambda x: x.sort(key=lambda y: y.speaker.team.institution.name)
@@ -185,3 +255,14 @@ class SpeakerStandingsGenerator(BaseStandingsGenerator):
     ranking_annotator_classes = {
         "rank"     : BasicRankAnnotator,
     }
+
+    columns_class = SpeakerResultColumns
+
+    def annotate_metrics(self, queryset, standings, round=None):
+        if self.options["use_aggregates"] and round is not None:
+            aggregates = SpeakerScoreAggregates(queryset, round)
+            for annotator in self.metric_annotators:
+                logger.debug("Running metric annotator from aggregates: %s", annotator.name)
+                annotator.run_from_aggregates(aggregates, standings)
+        else:
+            super().annotate_metrics(queryset, standings, round)
@@ -0,0 +1,156 @@
+"""Functions for streaming standings as CSV or JSON files.
+
+The standings pages build a table with `TabbycatTableBuilder`, which includes
+formatting, popovers and so on for every cell, and embed it in the page. For
+downloading tabs for analysis, that's all unnecessary; these functions instead
+turn standings into plain rows of values, which the admin download views
+stream to the client as they're written. Public downloads are written in full
+instead, because streaming responses can't be cached, and the public pages
+get many more requests."""
+
+import csv
+import json
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+
+
+class Echo:
+    """A file-like object that returns what's written to it, so that
+    `csv.writer` returns each row rather than writing it somewhere."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(["" if value is None else value for value in row])
+
+
+def stream_json(header, rows):
+    """Yields a JSON list with an object for each row, keyed by the header."""
+    yield "["
+    separator = "\n"
+    for row in rows:
+        yield separator + json.dumps(OrderedDict(zip(header, row)), cls=DjangoJSONEncoder)
+        separator = ",\n"
+    yield "\n]\n"
+
+
+STREAM_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'json': (stream_json, 'application/json'),
+}
+
+
+def streaming_response(header, rows, format, filename):
+    """Returns a `StreamingHttpResponse` that writes `header` and `rows` in the
+    given format ("csv" or "json"), as an attachment called `filename`."""
+    stream, content_type = STREAM_FORMATS[format]
+    response = StreamingHttpResponse(stream(header, rows), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+def download_response(header, rows, format, filename):
+    """Like `streaming_response()`, but returns an `HttpResponse` with the
+    whole file, so that the response can be cached."""
+    stream, content_type = STREAM_FORMATS[format]
+    response = HttpResponse("".join(stream(header, rows)), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(filename)
+    return response
+
+
+def team_standings_rows(standings, rounds, show_institutions=True, code_names=False):
+    """Returns a tuple `(header, rows)` for team standings. Each item in
+    `standings` must have a `round_results` attribute, as set by
+    `add_team_round_results()`. The round columns have the points the team
+    got in each round. If `code_names` is True, teams' code names are used in
+    place of their names."""
+
+    header = list(standings.ranking_keys) + ["id", "short_name", "long_name"]
+    if show_institutions:
+        header.append("institution")
+    header += [round.abbreviation for round in rounds] + list(standings.metric_keys)
+
+    def rows():
+        for info in standings:
+            team = info.team
+            row = [info.get_ranking(key) for key in standings.ranking_keys]
+            if code_names:
+                row += [team.id, team.code_name, team.code_name]
+            else:
+                row += [team.id, team.short_name, team.long_name]
+            if show_institutions:
+                row.append(team.institution.code if team.institution else None)
+            row += [ts.points if ts is not None else None for ts in info.round_results]
+            row += list(info.itermetrics())
+            yield row
+
+    return header, rows()
+
+
+def speaker_standings_rows(standings, rounds, show_institutions=True, code_names=False,
+        redact_anonymous=False):
+    """Returns a tuple `(header, rows)` for speaker (or reply) standings. Each
+    item in `standings` must have a `scores` attribute, as set by
+    `add_speaker_round_results()`. If `redact_anonymous` is True, the names,
+    teams and institutions of anonymous speakers are left blank."""
+
+    header = list(standings.ranking_keys) + ["id", "name", "team"]
+    if show_institutions:
+        header.append("institution")
+    header += [round.abbreviation for round in rounds] + list(standings.metric_keys)
+
+    def rows():
+        for info in standings:
+            speaker = info.speaker
+            team = speaker.team
+            row = [info.get_ranking(key) for key in standings.ranking_keys]
+            if redact_anonymous and speaker.anonymous:
+                row += [speaker.id, None, None] + ([None] if show_institutions else [])
+            else:
+                row += [speaker.id, speaker.name, team.code_name if code_names else team.short_name]
+                if show_institutions:
+                    row.append(team.institution.code if team.institution else None)
+            row += list(info.scores)
+            row += list(info.itermetrics())
+            yield row
+
+    return header, rows()
+
+
+def adjudicator_tab_rows(adjudicators, feedback_weight, show_institutions=True,
+        show_test_scores=True, show_feedback_scores=True, show_final_scores=True):
+    """Returns a tuple `(header, rows)` for the adjudicator tab. Adjudicators
+    must have had their feedback scores populated with
+    `populate_feedback_scores()`."""
+
+    header = ["id", "name"]
+    if show_institutions:
+        header.append("institution")
+    if show_test_scores:
+        header.append("test_score")
+    if show_feedback_scores:
+        header.append("feedback_score")
+    if show_final_scores:
+        header.append("score")
+
+    def rows():
+        for adj in adjudicators:
+            row = [adj.id, adj.name]
+            if show_institutions:
+                row.append(adj.institution.code if adj.institution else None)
+            if show_test_scores:
+                row.append(adj.test_score)
+            if show_feedback_scores:
+                row.append(adj._feedback_score())
+            if show_final_scores:
+                row.append(adj.weighted_score(feedback_weight))
+            yield row
+
+    return header, rows()
@@ -2,19 +2,21 @@
 
 import logging
 
-from django.db.models import Avg, Count, FloatField, Func, Prefetch, Q, StdDev, Sum
+import numpy as np
+from django.db.models import Avg, Count, FloatField, Func, Q, StdDev, Sum
 from django.db.models.functions import Cast
 from django.utils.translation import gettext_lazy as _
 
-from draw.models import DebateTeam
-from draw.prefetch import populate_opponents
 from participants.models import Team
 from tournaments.models import Round
 from results.models import TeamScore
 
 from .base import BaseStandingsGenerator
+from .columnar import COLUMN_AGGREGATES, TeamResultColumns
 from .metrics import BaseMetricAnnotator, metricgetter, QuerySetMetricAnnotator, RepeatedMetricAnnotator
+from .opponents import OpponentMatrix
 from .ranking import BasicRankAnnotator, DivisionRankAnnotator, RankFromInstitutionAnnotator, SubrankAnnotator
+from .snapshots import annotate_from_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +59,18 @@ class TeamScoreQuerySetMetricAnnotator(QuerySetMetricAnnotator):
 
         return self.function(self.get_field(), filter=annotation_filter)
 
+    @property
+    def columnar(self):
+        return self.field is not None and self.function in COLUMN_AGGREGATES
+
+    def get_column_values(self, columns):
+        values, mask = columns.get(self.field)
+        if self.exclude_forfeits:
+            mask = mask & ~columns.values['forfeit']
+        if self.where_value is not None:
+            mask = mask & (values == self.where_value)
+        return columns.aggregate(self.function, values, mask)
+
 
 class Points210MetricAnnotator(TeamScoreQuerySetMetricAnnotator):
     """Metric annotator for team points using win = 2, loss = 1, loss by forfeit = 0."""
@@ -89,6 +103,14 @@ class Points210MetricAnnotator(TeamScoreQuerySetMetricAnnotator):
         byes = Count('debateteam', filter=bye_filter)
         return wins * 2 + byes * 2 + losses
 
+    columnar = True
+
+    def get_column_values(self, columns):
+        wins = self.WinsIncludingForfeits().get_column_values(columns)
+        losses = self.LossesExcludingForfeits().get_column_values(columns)
+        byes = columns.get_bye_counts()
+        return {team_id: wins[team_id] * 2 + byes[team_id] * 2 + losses[team_id] for team_id in columns.ids}
+
 
 class PointsMetricAnnotator(TeamScoreQuerySetMetricAnnotator):
     """Metric annotator for total number of points."""
@@ -181,37 +203,56 @@ class AverageIndividualScoreMetricAnnotator(TeamScoreQuerySetMetricAnnotator):
         return Avg('debateteam__speakerscore__score', filter=annotation_filter)
 
 
-class DrawStrengthMetricAnnotator(BaseMetricAnnotator):
-    """Metric annotator for draw strength."""
-    key = "draw_strength"
-    name = _("draw strength")
-    abbr = _("DS")
+class BaseDrawStrengthMetricAnnotator(BaseMetricAnnotator):
+    """Base class for metric annotators that sum a TeamScore field over all of
+    a team's opponents, each counted once for every time they were faced."""
+
+    field = None  # must be set by subclasses
+    uses_opponents = True
+
+    def get_totals(self, tournament, round=None):
+        """Returns a dict mapping team IDs to the sum of `self.field` over the
+        team's confirmed ballots, in a single query."""
+        ts = TeamScore.objects.filter(
+            ballot_submission__confirmed=True,
+            debate_team__team__tournament=tournament,
+            debate_team__debate__round__stage=Round.STAGE_PRELIMINARY,
+        )
+        if round is not None:
+            ts = ts.filter(debate_team__debate__round__seq__lte=round.seq)
+        ts = ts.values_list('debate_team__team_id').annotate(Sum(self.field)).order_by()
+        return dict(ts)
 
     def annotate(self, queryset, standings, round=None):
-        if not queryset.exists():
+        teams = list(queryset.select_related('tournament'))
+        if not teams:
             return
 
-        logger.info("Running points query for draw strength:")
+        tournament = teams[0].tournament
+        opponents = OpponentMatrix(tournament, round)
+        draw_strengths = opponents.sum_over_opponents(self.get_totals(tournament, round))
 
-        prefetch_queryset = DebateTeam.objects.filter(debate__round__stage=Round.STAGE_PRELIMINARY)
-        if round is not None:
-            prefetch_queryset = prefetch_queryset.filter(debate__round__seq__lte=round.seq)
+        for team in teams:
+            standings.add_metric(team, self.key, draw_strengths.get(team.id, 0))
 
-        points_queryset = PointsMetricAnnotator().get_annotated_queryset(
-                queryset[0].tournament.team_set.all(), 'points', round).prefetch_related(
-                Prefetch('debateteam_set',queryset=prefetch_queryset, to_attr='debateteams'))
-        points_queryset_teams = {team.id: team for team in points_queryset}
-        points_queryset_debateteams = {team.id: list(team.debateteams) for team in points_queryset}
 
-        populate_opponents([dt for dts in points_queryset_debateteams.values() for dt in dts])
+class DrawStrengthMetricAnnotator(BaseDrawStrengthMetricAnnotator):
+    """Metric annotator for draw strength, the total points of all opponents."""
+    key = "draw_strength"
+    name = _("draw strength")
+    abbr = _("DS")
+
+    field = "points"
 
-        for team in queryset:
-            draw_strength = 0
-            for dt in points_queryset_debateteams[team.id]:
-                points = points_queryset_teams[dt.opponent.team_id].points
-                if points is not None: # points is None when no debates have happened
-                    draw_strength += points
-            standings.add_metric(team, self.key, draw_strength)
+
+class DrawStrengthBySpeakerScoreMetricAnnotator(BaseDrawStrengthMetricAnnotator):
+    """Metric annotator for draw strength by speaker score, the total speaker
+    scores of all opponents."""
+    key = "draw_strength_speaks"
+    name = _("draw strength by speaker score")
+    abbr = _("DSS")
+
+    field = "score"
 
 
 class NumberOfAdjudicatorsMetricAnnotator(TeamScoreQuerySetMetricAnnotator):
@@ -236,9 +277,24 @@ class NumberOfAdjudicatorsMetricAnnotator(TeamScoreQuerySetMetricAnnotator):
             NullIf('debateteam__teamscore__votes_possible', 0, output_field=FloatField()) *
             self.adjs_per_debate)
 
+    columnar = True
+
+    def get_column_values(self, columns):
+        given, mask = columns.get('votes_given')
+        possible, mask = columns.get('votes_possible', mask)
+        mask = mask & (possible != 0)
+        votes = given / np.where(mask, possible, 1) * self.adjs_per_debate
+        return columns.aggregate(Sum, votes, mask)
+
     def annotate(self, queryset, standings, round=None):
         super().annotate(queryset, standings, round)
+        self.convert_to_integers(standings)
+
+    def annotate_from_columns(self, columns, standings):
+        super().annotate_from_columns(columns, standings)
+        self.convert_to_integers(standings)
 
+    def convert_to_integers(self, standings):
         # If the number of ballots carried by every team is an integer, then
         # it's probably (though not certainly) the case that there are no
         # "weird" cases causing any fractional numbers of votes due to
@@ -277,42 +333,57 @@ class WhoBeatWhomMetricAnnotator(RepeatedMetricAnnotator):
     abbr_prefix = _("WBW")
     choice_name = _("who-beat-whom")
 
+    not_applicable = "n/a"  # fail fast if attempt to compare with an int
+
     def __init__(self, index, keys):
         if len(keys) == 0:
             raise ValueError("keys must not be empty")
         super(WhoBeatWhomMetricAnnotator, self).__init__(index, keys)
 
-    def get_team_scores(self, key, equal_teams, tsi, round):
-        equal_teams.remove(tsi)
-        other = equal_teams[0]
+    def get_group_key(self, key, tsi):
+        """Returns a key such that teams that could be separated by this metric
+        have the same key."""
+        return key(tsi)
+
+    def get_head_to_head_points(self, team_ids, round):
+        """Returns a dict mapping (team_id, opponent_id) to the total points
+        the team earned in debates against the opponent, for every pair of
+        teams in `team_ids` that has met, in a single query."""
         ts = TeamScore.objects.filter(
             ballot_submission__confirmed=True,
-            debate_team__team=tsi.team,
-            debate_team__debate__debateteam__team=other.team)
+            debate_team__team_id__in=team_ids,
+            debate_team__debate__debateteam__team_id__in=team_ids)
 
         if round is not None:
             ts = ts.filter(debate_team__debate__round__seq__lte=round.seq)
 
-        ts = ts.aggregate(Sum('points'))
-        logger.info("who beat whom, %s %s vs %s %s: %s",
-            tsi.team.short_name, key(tsi), other.team.short_name, key(other),
-            ts["points__sum"])
-        return ts
+        ts = ts.values_list('debate_team__team_id', 'debate_team__debate__debateteam__team_id').annotate(
+                Sum('points')).order_by()
+        return {(team_id, opponent_id): points for team_id, opponent_id, points in ts}
 
     def annotate(self, queryset, standings, round=None):
         key = metricgetter(*self.keys)
 
-        def who_beat_whom(tsi):
-            equal_teams = [x for x in standings.infoview() if key(x) == key(tsi)]
-            if len(equal_teams) != 2:
-                return "n/a"  # fail fast if attempt to compare with an int
+        groups = {}
+        for tsi in standings.infoview():
+            groups.setdefault(self.get_group_key(key, tsi), []).append(tsi)
 
-            ts = self.get_team_scores(key, equal_teams, tsi, round)
-            return ts["points__sum"] or 0
+        pairs = [group for group in groups.values() if len(group) == 2]
+        if pairs:
+            team_ids = [tsi.instance_id for pair in pairs for tsi in pair]
+            points = self.get_head_to_head_points(team_ids, round)
 
-        for tsi in standings.infoview():
-            wbw = who_beat_whom(tsi)
-            tsi.add_metric(self.key, wbw)
+        for group in groups.values():
+            if len(group) != 2:
+                for tsi in group:
+                    tsi.add_metric(self.key, self.not_applicable)
+                continue
+
+            for tsi, other in (group, reversed(group)):
+                wbw = points.get((tsi.instance_id, other.instance_id)) or 0
+                logger.info("who beat whom, %s %s vs %s %s: %s",
+                    tsi.team.short_name, key(tsi), other.team.short_name, key(other), wbw)
+                tsi.add_metric(self.key, wbw)
 
 
 class DivisionsWhoBeatWhomMetricAnnotator(WhoBeatWhomMetricAnnotator):
@@ -324,20 +395,10 @@ class DivisionsWhoBeatWhomMetricAnnotator(WhoBeatWhomMetricAnnotator):
     abbr_prefix = _("WBWD")
     choice_name = _("who-beat-whom (in divisions)")
 
-    def annotate(self, queryset, standings, round=None):
-        key = metricgetter(*self.keys)
-
-        def who_beat_whom_divisions(tsi):
-            equal_teams = [x for x in standings.infoview() if key(x) == key(tsi) and x.team.division == tsi.team.division]
-            if len(equal_teams) != 2:
-                return 0  # Fail fast if attempt to compare with an int
+    not_applicable = 0
 
-            ts = self.get_team_scores(key, equal_teams, tsi, round)
-            return ts["points__sum"] or 0
-
-        for tsi in standings.infoview():
-            wbwd = who_beat_whom_divisions(tsi)
-            tsi.add_metric(self.key, wbwd)
+    def get_group_key(self, key, tsi):
+        return (key(tsi), tsi.team.division_id)
 
 
 # ==============================================================================
@@ -353,8 +414,17 @@ class TeamStandingsGenerator(BaseStandingsGenerator):
         standings = generator.generate(teams)
 
     The generate() method returns a TeamStandings object.
+
+    By default, metrics are read from (and, where missing, stored in) standings
+    snapshots; see `standings.snapshots`. To compute them all afresh, pass
+    `use_snapshots=False` to the constructor.
     """
 
+    DEFAULT_OPTIONS = BaseStandingsGenerator.DEFAULT_OPTIONS.copy()
+    DEFAULT_OPTIONS["use_snapshots"] = True
+
+    columns_class = TeamResultColumns
+
     TIEBREAK_FUNCTIONS = BaseStandingsGenerator.TIEBREAK_FUNCTIONS.copy()
     TIEBREAK_FUNCTIONS["shortname"] = lambda x: x.sort(key=lambda y: y.team.short_name)
     TIEBREAK_FUNCTIONS["institution"] = lambda x: x.sort(key=lambda y: y.team.institution.name)
@@ -368,6 +438,7 @@ class TeamStandingsGenerator(BaseStandingsGenerator):
         "speaks_ind_avg": AverageIndividualScoreMetricAnnotator,
         "speaks_stddev" : SpeakerScoreStandardDeviationMetricAnnotator,
         "draw_strength" : DrawStrengthMetricAnnotator,
+        "draw_strength_speaks": DrawStrengthBySpeakerScoreMetricAnnotator,
         "margin_sum"    : SumMarginMetricAnnotator,
         "margin_avg"    : AverageMarginMetricAnnotator,
         "num_adjs"      : NumberOfAdjudicatorsMetricAnnotator,
@@ -383,3 +454,16 @@ class TeamStandingsGenerator(BaseStandingsGenerator):
         "division"    : DivisionRankAnnotator,
         "institution" : RankFromInstitutionAnnotator,
     }
+
+    def annotate_metrics(self, queryset, standings, round=None):
+        if self.options["use_snapshots"]:
+            annotate_from_snapshot(self.metric_annotators, queryset, standings, round,
+                    self.run_metric_annotators)
+        else:
+            super().annotate_metrics(queryset, standings, round)
+
+    def get_tournament(self, queryset, round=None):
+        if round is not None:
+            return round.tournament
+        team = queryset.select_related('tournament').first()
+        return team.tournament if team is not None else None
@@ -0,0 +1,103 @@
+import random
+
+from django.test import TestCase
+
+from participants.models import Speaker
+from results.models import BallotSubmission, SpeakerScore, TeamScore
+from results.result import notify_scores_saved
+
+from . import test_standings
+from ..models import SpeakerScoreAggregate
+from ..speakers import SpeakerStandingsGenerator
+
+
+class TestSpeakerScoreAggregates(TestCase):
+
+    metrics = ('total', 'average', 'trimmed_mean', 'stdev', 'count')
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+        self.last_round = self.tournament.round_set.order_by('seq').last()
+
+        rng = random.Random(1016)
+        positions = list(self.tournament.positions)
+        for team in self.teams.values():
+            for i in range(len(positions)):
+                Speaker.objects.create(name="{} {:d}".format(team.reference, i), team=team)
+        for teamscore in TeamScore.objects.select_related('debate_team__team').all():
+            speakers = list(teamscore.debate_team.team.speaker_set.all())
+            for speaker, position in zip(speakers, positions):
+                SpeakerScore.objects.create(ballot_submission=teamscore.ballot_submission,
+                        debate_team=teamscore.debate_team, speaker=speaker, position=position,
+                        score=rng.randint(70, 80) + rng.choice([0, 0.5]), ghost=rng.random() < 0.1)
+        for ballotsub in BallotSubmission.objects.filter(confirmed=True):
+            notify_scores_saved(ballotsub)
+
+    def generate(self, use_aggregates=True, round=None):
+        generator = SpeakerStandingsGenerator(self.metrics, ('rank',), use_aggregates=use_aggregates)
+        speakers = Speaker.objects.filter(team__tournament=self.tournament)
+        return generator.generate(speakers, round=round or self.last_round)
+
+    def assertStandingsMatchFresh(self, round=None):  # noqa: N802
+        aggregated = self.generate(round=round)
+        fresh = self.generate(use_aggregates=False, round=round)
+        self.assertEqual(aggregated.metric_keys, fresh.metric_keys)
+        for info in fresh.infoview():
+            other = aggregated.get_standing(info.instance)
+            for metric in self.metrics:
+                with self.subTest(speaker=info.instance.name, metric=metric):
+                    self.assertAlmostEqual(info.metrics[metric], other.metrics[metric])
+                    self.assertEqual(type(info.metrics[metric]), type(other.metrics[metric]))
+
+    def test_aggregates_kept_up_to_date(self):
+        rounds = self.tournament.round_set.filter(debate__isnull=False).distinct().count()
+        self.assertEqual(SpeakerScoreAggregate.objects.values('round').distinct().count(), rounds)
+        self.assertStandingsMatchFresh()
+        self.assertStandingsMatchFresh(self.last_round.prev)
+
+    def test_missing_rounds_added(self):
+        SpeakerScoreAggregate.objects.all().delete()
+        self.assertStandingsMatchFresh()
+        self.assertTrue(SpeakerScoreAggregate.objects.exists())
+
+    def test_partly_aggregated_round_added(self):
+        SpeakerScoreAggregate.objects.all().delete()
+        ballotsub = BallotSubmission.objects.filter(debate__round=self.last_round, confirmed=True).first()
+        ballotsub.confirmed = False
+        ballotsub.save()
+        ballotsub.confirmed = True
+        ballotsub.save()
+        self.assertTrue(SpeakerScoreAggregate.objects.filter(round=self.last_round).exists())
+        self.assertStandingsMatchFresh()
+
+    def test_unconfirm_updates_aggregates(self):
+        ballotsub = BallotSubmission.objects.filter(debate__round=self.last_round, confirmed=True).first()
+        ballotsub.confirmed = False
+        ballotsub.save()
+        self.assertStandingsMatchFresh()
+
+        ballotsub.confirmed = True
+        ballotsub.save()
+        self.assertStandingsMatchFresh()
+
+    def test_scores_saved_updates_aggregates(self):
+        speakerscore = SpeakerScore.objects.filter(ballot_submission__confirmed=True, ghost=False).first()
+        speakerscore.score += 5
+        speakerscore.save()
+        notify_scores_saved(speakerscore.ballot_submission)
+        self.assertStandingsMatchFresh()
+
+        speakerscore.ghost = True
+        speakerscore.save()
+        notify_scores_saved(speakerscore.ballot_submission)
+        self.assertStandingsMatchFresh()
+
+        speakerscore.delete()
+        notify_scores_saved(speakerscore.ballot_submission)
+        self.assertStandingsMatchFresh()
+
+    def test_ballot_delete_updates_aggregates(self):
+        ballotsub = BallotSubmission.objects.filter(debate__round=self.last_round, confirmed=True).first()
+        ballotsub.delete()
+        self.assertStandingsMatchFresh()
@@ -0,0 +1,66 @@
+import random
+
+from django.test import TestCase
+
+from participants.models import Speaker
+from results.models import SpeakerScore, TeamScore
+
+from . import test_standings
+from ..speakers import SpeakerStandingsGenerator
+from ..teams import TeamStandingsGenerator
+
+
+class TestColumnarStandingsParity(TestCase):
+    """Checks that the in-memory engine gives the same metrics as the database
+    queries."""
+
+    team_metrics = ('points', 'points210', 'wins', 'speaks_sum', 'speaks_avg', 'speaks_stddev',
+            'margin_sum', 'margin_avg', 'num_adjs', 'firsts', 'seconds')
+    speaker_metrics = ('total', 'average', 'trimmed_mean', 'stdev', 'count')
+    reply_metrics = ('replies_sum', 'replies_avg', 'replies_stddev', 'replies_count')
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+        self.last_round = self.tournament.round_set.order_by('seq').last()
+
+        # Add speaker scores, including a ghost, to compare speaker standings
+        rng = random.Random(1011)
+        positions = list(self.tournament.positions)
+        for team in self.teams.values():
+            for i in range(len(positions)):
+                Speaker.objects.create(name="{} {:d}".format(team.reference, i), team=team)
+        for teamscore in TeamScore.objects.select_related('debate_team__team').all():
+            speakers = list(teamscore.debate_team.team.speaker_set.all())
+            for speaker, position in zip(speakers, positions):
+                SpeakerScore.objects.create(ballot_submission=teamscore.ballot_submission,
+                        debate_team=teamscore.debate_team, speaker=speaker, position=position,
+                        score=rng.randint(70, 80) + rng.choice([0, 0.5]), ghost=rng.random() < 0.1)
+
+    def assertMetricsEqual(self, sql, columnar, metrics):  # noqa: N802
+        self.assertEqual(sql.metric_keys, columnar.metric_keys)
+        for info in sql.infoview():
+            other = columnar.get_standing(info.instance)
+            for metric in metrics:
+                with self.subTest(instance=str(info.instance), metric=metric):
+                    self.assertAlmostEqual(info.metrics[metric], other.metrics[metric])
+                    self.assertEqual(type(info.metrics[metric]), type(other.metrics[metric]))
+
+    def test_team_metrics(self):
+        for round in [self.last_round, self.last_round.prev, None]:
+            with self.subTest(round=round):
+                standings = {}
+                for engine in ["sql", "columnar"]:
+                    generator = TeamStandingsGenerator(self.team_metrics, ('rank',), engine=engine, use_snapshots=False)
+                    standings[engine] = generator.generate(self.tournament.team_set.all(), round=round)
+                self.assertMetricsEqual(standings["sql"], standings["columnar"], self.team_metrics)
+
+    def test_speaker_metrics(self):
+        speakers = Speaker.objects.filter(team__tournament=self.tournament)
+        for metrics in [self.speaker_metrics, self.reply_metrics]:
+            with self.subTest(metrics=metrics):
+                standings = {}
+                for engine in ["sql", "columnar"]:
+                    generator = SpeakerStandingsGenerator(metrics, ('rank',), engine=engine, use_aggregates=False)
+                    standings[engine] = generator.generate(speakers, round=self.last_round)
+                self.assertMetricsEqual(standings["sql"], standings["columnar"], metrics)
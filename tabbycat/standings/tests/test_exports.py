@@ -0,0 +1,63 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import translation
+
+from results.models import TeamScore
+from results.result import notify_scores_saved
+from tournaments.models import Tournament
+
+from . import test_standings
+from ..exports import clear_public_tab_exports, export_public_tabs, get_public_tab_export, render_public_tab_tables
+from ..models import PublicTabExport
+
+
+class TestPublicTabExports(TestCase):
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+
+    def test_only_released_tabs_exported(self):
+        self.assertEqual(export_public_tabs(self.tournament), 0)
+
+        self.tournament.preferences['tab_release__team_tab_released'] = True
+        self.tournament = Tournament.objects.get(pk=self.tournament.pk)  # clear cached preferences
+        self.assertEqual(export_public_tabs(self.tournament), 1)
+        with translation.override(PublicTabExport.objects.get().language):
+            tables_data = get_public_tab_export(self.tournament, 'PublicTeamTabView')
+        self.assertEqual(len(tables_data), 1)
+        self.assertEqual(len(tables_data[0]['data']), len(self.teams))
+
+    def test_exports_cleared_on_result_change(self):
+        PublicTabExport.objects.create(tournament=self.tournament, view='PublicTeamTabView',
+                language='en', tables_data=[])
+        teamscore = TeamScore.objects.filter(debate_team__team__tournament=self.tournament).first()
+        teamscore.points = 1 - teamscore.points
+        teamscore.save()
+        notify_scores_saved(teamscore.ballot_submission)
+        self.assertFalse(PublicTabExport.objects.filter(tournament=self.tournament).exists())
+
+    def test_exports_cleared_on_preference_change(self):
+        PublicTabExport.objects.create(tournament=self.tournament, view='PublicTeamTabView',
+                language='en', tables_data=[])
+        self.tournament.preferences['tab_release__team_tab_limit'] = 2
+        self.assertFalse(PublicTabExport.objects.filter(tournament=self.tournament).exists())
+
+    def test_exports_kept_when_default_preference_stored(self):
+        PublicTabExport.objects.create(tournament=self.tournament, view='PublicTeamTabView',
+                language='en', tables_data=[])
+        self.tournament.preferences['tab_release__speaker_tab_limit']  # not read before, so stores the default
+        self.assertTrue(PublicTabExport.objects.filter(tournament=self.tournament).exists())
+
+    def test_exports_not_stored_if_cleared_while_rendering(self):
+        def render_and_clear(view_class, tournament, category=""):
+            tables_data = render_public_tab_tables(view_class, tournament, category)
+            clear_public_tab_exports(tournament.id)
+            return tables_data
+
+        self.tournament.preferences['tab_release__team_tab_released'] = True
+        self.tournament = Tournament.objects.get(pk=self.tournament.pk)  # clear cached preferences
+        with patch('standings.exports.render_public_tab_tables', render_and_clear):
+            self.assertIsNone(export_public_tabs(self.tournament))
+        self.assertFalse(PublicTabExport.objects.filter(tournament=self.tournament).exists())
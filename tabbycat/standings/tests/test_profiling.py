@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from . import test_standings
+from ..profiling import profile_standings
+from ..teams import TeamStandingsGenerator
+
+
+class TestProfileStandings(TestCase):
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+
+    def test_profile_standings(self):
+        for engine in ["sql", "columnar"]:
+            with self.subTest(engine=engine):
+                generator = TeamStandingsGenerator(('points', 'speaks_sum'), ('rank',),
+                        engine=engine, use_snapshots=False)
+                standings, profile = profile_standings(generator, self.tournament.team_set.all())
+                expected = generator.generate(self.tournament.team_set.all())
+
+                self.assertEqual({info.team: info.rankings['rank'] for info in standings},
+                        {info.team: info.rankings['rank'] for info in expected})
+                self.assertEqual(list(profile.as_dict()),
+                        ["metric:points", "metric:speaks_sum", "ranking:rank", "other", "total"])
+                self.assertGreater(profile.total.queries, 0)
+                self.assertTrue(all(t.time > 0 for t in profile))
+                self.assertTrue(all(t.queries >= 0 for t in profile))
+                self.assertGreaterEqual(profile.other.queries, 0)
+
+                # instrumentation should be removed afterwards
+                self.assertNotIn('run', vars(generator.metric_annotators[0]))
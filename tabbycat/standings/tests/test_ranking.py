@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from ..base import encode_metric
+from ..ranking import rank_within_groups
+
+
+class TestEncodeMetric(unittest.TestCase):
+
+    def test_order_and_equality(self):
+        codes = encode_metric([3, 1.5, 3, 0, 1.5])
+        self.assertEqual(codes.tolist(), [2, 1, 2, 0, 1])
+
+    def test_non_numeric(self):
+        codes = encode_metric([1, "n/a", 0, "n/a", None])
+        self.assertEqual(codes.tolist(), [1, 2, 0, 2, 2])
+
+
+class TestRankWithinGroups(unittest.TestCase):
+
+    # rows are in ranked order
+    codes = np.array([[5, 3], [5, 3], [5, 2], [4, 2], [3, 1], [3, 1]])
+
+    def test_basic(self):
+        ranks, shared = rank_within_groups(self.codes)
+        self.assertEqual(ranks.tolist(), [1, 1, 3, 4, 5, 5])
+        self.assertEqual(shared.tolist(), [True, True, False, False, True, True])
+
+    def test_no_metrics(self):
+        ranks, shared = rank_within_groups(np.zeros((3, 0), dtype=int))
+        self.assertEqual(ranks.tolist(), [1, 1, 1])
+        self.assertEqual(shared.tolist(), [True, True, True])
+
+    def test_groups(self):
+        groups = np.array([0, 1, 0, -1, 1, 0])
+        ranks, shared = rank_within_groups(self.codes, groups)
+        self.assertEqual(ranks.tolist(), [1, 1, 2, 0, 2, 3])
+        self.assertEqual(shared.tolist(), [False, False, False, False, False, False])
+
+    def test_empty(self):
+        ranks, shared = rank_within_groups(np.zeros((0, 2), dtype=int), np.zeros(0, dtype=int))
+        self.assertEqual(ranks.tolist(), [])
+        self.assertEqual(shared.tolist(), [])
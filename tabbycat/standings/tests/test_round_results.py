@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from participants.models import Speaker
+from results.models import SpeakerScore, TeamScore
+
+from . import test_standings
+from ..round_results import add_speaker_round_results, add_team_round_results_public
+from ..speakers import SpeakerStandingsGenerator
+
+
+class TestRoundResults(TestCase):
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+        self.rounds = list(self.tournament.round_set.order_by('seq'))
+
+    def test_team_round_results(self):
+        teams = self.tournament.team_set.all()
+        for opponents in [True, False]:
+            with self.subTest(opponents=opponents):
+                add_team_round_results_public(teams, self.rounds, opponents=opponents)
+                for team in teams:
+                    for round, ts in zip(self.rounds, team.round_results):
+                        expected = TeamScore.objects.get(debate_team__team=team, debate_team__debate__round=round)
+                        self.assertEqual(ts, expected)
+                        if opponents:
+                            self.assertEqual(ts.debate_team.opponent.team,
+                                    expected.debate_team.debate.debateteam_set.exclude(team=team).get().team)
+                    self.assertEqual(team.points, sum(ts.points for ts in team.round_results))
+
+    def test_speaker_round_results(self):
+        team = self.teams['A']
+        speaker = Speaker.objects.create(name="A 1", team=team)
+        Speaker.objects.create(name="A 2", team=team)
+        teamscore = TeamScore.objects.get(debate_team__team=team, debate_team__debate__round=self.rounds[1])
+        SpeakerScore.objects.create(ballot_submission=teamscore.ballot_submission,
+                debate_team=teamscore.debate_team, speaker=speaker, position=1, score=75.5)
+
+        generator = SpeakerStandingsGenerator(('total',), ())
+        standings = generator.generate(Speaker.objects.filter(team=team), round=self.rounds[-1])
+        add_speaker_round_results(standings, self.rounds, self.tournament)
+
+        expected = [None] * len(self.rounds)
+        expected[1] = 75.5
+        self.assertEqual(standings.get_standing(speaker).scores, expected)
+        for info in standings:
+            if info.instance != speaker:
+                self.assertEqual(info.scores, [None] * len(self.rounds))
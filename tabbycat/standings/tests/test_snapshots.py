@@ -0,0 +1,95 @@
+from django.test import TestCase
+
+from results.models import BallotSubmission, TeamScore
+from results.result import notify_scores_saved
+from tournaments.models import Round
+
+from . import test_standings
+from ..models import TeamStandingsSnapshot, TeamStandingsSnapshotRow
+from ..teams import TeamStandingsGenerator
+
+
+class TestTeamStandingsSnapshots(TestCase):
+
+    metrics = ('points', 'speaks_sum', 'draw_strength', 'margin_sum', 'wbw')
+
+    def setUp(self):
+        self.tournament, self.teams = test_standings.TestBasicStandings.setup_testdata(
+                self, test_standings.TestBasicStandings.testdata[1])
+        self.last_round = self.tournament.round_set.order_by('seq').last()
+
+    def generate(self, use_snapshots=True):
+        generator = TeamStandingsGenerator(self.metrics, ('rank',), use_snapshots=use_snapshots)
+        return generator.generate(self.tournament.team_set.all(), round=self.last_round)
+
+    def assertStandingsMatchFresh(self):  # noqa: N802
+        snapshotted = self.generate()
+        fresh = self.generate(use_snapshots=False)
+        self.assertEqual(snapshotted.metric_keys, fresh.metric_keys)
+        for team in self.teams.values():
+            with self.subTest(team=team.reference):
+                self.assertEqual(snapshotted.get_standing(team).metrics, fresh.get_standing(team).metrics)
+
+    def test_snapshot_created(self):
+        self.assertStandingsMatchFresh()
+        snapshot = TeamStandingsSnapshot.objects.get(tournament=self.tournament, round=self.last_round)
+        self.assertEqual(snapshot.metrics, "draw_strength,margin_sum,points,speaks_sum")
+        self.assertEqual(snapshot.rows.count(), len(self.teams))
+
+    def test_snapshot_used(self):
+        self.generate()
+        TeamStandingsSnapshotRow.objects.filter(team=self.teams['B']).update(metrics={
+            'points': 100, 'speaks_sum': 0, 'draw_strength': 0, 'margin_sum': 0})
+        standings = self.generate()
+        self.assertEqual(standings.get_standing(self.teams['B']).metrics['points'], 100)
+        self.assertEqual(standings.get_instance_list()[0], self.teams['B'])
+
+    def test_missing_teams_added(self):
+        self.generate()
+        TeamStandingsSnapshotRow.objects.filter(team=self.teams['C']).delete()
+        self.assertStandingsMatchFresh()
+        self.assertEqual(TeamStandingsSnapshotRow.objects.count(), len(self.teams))
+
+    def test_unconfirm_updates_snapshot(self):
+        self.generate()
+        snapshot_id = TeamStandingsSnapshot.objects.get().id
+        ballotsub = BallotSubmission.objects.get(debate__round__seq=0,
+                debate__debateteam__team=self.teams['A'], confirmed=True)
+        ballotsub.confirmed = False
+        ballotsub.save()
+
+        # The snapshot should have been updated, not recreated
+        self.assertEqual(TeamStandingsSnapshot.objects.get().id, snapshot_id)
+        self.assertStandingsMatchFresh()
+
+        ballotsub.confirmed = True
+        ballotsub.save()
+        self.assertEqual(TeamStandingsSnapshot.objects.get().id, snapshot_id)
+        self.assertStandingsMatchFresh()
+
+    def test_teamscore_change_clears_snapshot(self):
+        self.generate()
+        teamscore = TeamScore.objects.filter(debate_team__team=self.teams['D']).first()
+        teamscore.score += 10
+        teamscore.save()
+        notify_scores_saved(teamscore.ballot_submission)
+        self.assertFalse(TeamStandingsSnapshot.objects.exists())
+        self.assertStandingsMatchFresh()
+
+    def test_round_order_change_clears_snapshot(self):
+        self.generate()
+        self.last_round.draw_status = Round.STATUS_RELEASED
+        self.last_round.save()
+        self.assertTrue(TeamStandingsSnapshot.objects.exists())
+
+        first_round = self.tournament.round_set.order_by('seq').first()
+        first_round.stage = Round.STAGE_ELIMINATION
+        first_round.save()
+        self.assertFalse(TeamStandingsSnapshot.objects.exists())
+        self.assertStandingsMatchFresh()
+
+    def test_round_delete_clears_snapshot(self):
+        self.generate()
+        self.tournament.round_set.order_by('seq').first().delete()
+        self.assertFalse(TeamStandingsSnapshot.objects.exists())
+        self.assertStandingsMatchFresh()
@@ -23,24 +23,29 @@ class TestBasicStandings(TestCase):
     testdata = dict()
     testdata[1] = \
         {'rankings': {('points', 'speaks_sum'): ['A', 'D', 'C', 'B'],
-                      ('points', 'speaks_sum', 'draw_strength', 'margin_sum'): ['A', 'D', 'C', 'B']},
+                      ('points', 'speaks_sum', 'draw_strength', 'margin_sum'): ['A', 'D', 'C', 'B'],
+                      ('points', 'draw_strength_speaks'): ['C', 'D', 'A', 'B']},
          'standings': {'A': {'against': {'B': 2, 'C': 0, 'D': 'n/a'},
                              'draw_strength': 2,
+                             'draw_strength_speaks': 2291.5,
                              'margin_sum': 46.0,
                              'points': 2,
                              'speaks_sum': 804.5},
                        'B': {'against': {'A': 0, 'C': 'n/a', 'D': 0},
                              'draw_strength': 6,
+                             'draw_strength_speaks': 2396.5,
                              'margin_sum': -62.0,
                              'points': 0,
                              'speaks_sum': 753.5},
                        'C': {'against': {'A': 1, 'B': 'n/a', 'D': 1},
                              'draw_strength': 6,
+                             'draw_strength_speaks': 2379.5,
                              'margin_sum': 8.0,
                              'points': 2,
                              'speaks_sum': 784.5},
                        'D': {'against': {'A': 'n/a', 'B': 1, 'C': 1},
                              'draw_strength': 4,
+                             'draw_strength_speaks': 2322.5,
                              'margin_sum': 8.0,
                              'points': 2,
                              'speaks_sum': 787.5}},
@@ -115,6 +120,20 @@ class TestBasicStandings(TestCase):
                     ranked_teams = [teams[x] for x in testdata["rankings"][metrics]]
                     self.assertEqual(ranked_teams, standings.get_instance_list())
 
+    def test_who_beat_whom(self):
+        tournament, teams = self.setup_testdata(self.testdata[1])
+        for metric, not_applicable in [('wbw', 'n/a'), ('wbwd', 0)]:
+            with self.subTest(metric=metric):
+                generator = TeamStandingsGenerator(('points', 'margin_sum', metric), self.rankings)
+                standings = generator.generate(tournament.team_set.all())
+                key = metric + "1"
+
+                # C and D are tied on points and margins, and split their debates
+                self.assertEqual(standings.get_standing(teams['C']).metrics[key], 1)
+                self.assertEqual(standings.get_standing(teams['D']).metrics[key], 1)
+                self.assertEqual(standings.get_standing(teams['A']).metrics[key], not_applicable)
+                self.assertEqual(standings.get_standing(teams['B']).metrics[key], not_applicable)
+
     # TODO check that WBW is correct when not in first metrics
     # TODO check that it doesn't break when not all metrics present
     # TODO check that it works for different rounds
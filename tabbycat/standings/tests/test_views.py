@@ -1,3 +1,5 @@
+import csv
+import json
 import logging
 
 from django.test import TestCase
@@ -33,6 +35,35 @@ class PublicRepliesTabViewTest(PublicStandingsTestMixin, TestCase):
     view_toggle_preference = 'tab_release__replies_tab_released'
 
 
+class PublicDownloadTestMixin(PublicStandingsTestMixin):
+    """Checks that the download is a well-formed CSV or JSON file."""
+
+    def validate_response(self, response):
+        self.assertFalse(response.streaming)  # so that it can be cached
+        content = response.content.decode('utf-8')
+        if self.view_reverse_kwargs['format'] == 'csv':
+            rows = list(csv.reader(content.splitlines()))
+            self.assertIn("id", rows[0])
+            self.assertTrue(all(len(row) == len(rows[0]) for row in rows))
+            self.assertGreater(len(rows), 1)
+        else:
+            rows = json.loads(content)
+            self.assertGreater(len(rows), 0)
+            self.assertIn("id", rows[0])
+
+
+class PublicTeamTabCSVDownloadViewTest(PublicDownloadTestMixin, TestCase):
+    view_name = 'standings-public-tab-team-download'
+    view_reverse_kwargs = {'format': 'csv'}
+    view_toggle_preference = 'tab_release__team_tab_released'
+
+
+class PublicSpeakerTabJSONDownloadViewTest(PublicDownloadTestMixin, TestCase):
+    view_name = 'standings-public-tab-speaker-download'
+    view_reverse_kwargs = {'format': 'json'}
+    view_toggle_preference = 'tab_release__speaker_tab_released'
+
+
 class PublicAdjudicatorTabViewTest(ConditionalTournamentViewSimpleLoadTestMixin, TestCase):
     view_name = 'standings-public-adjudicators-tab'
     view_toggle_preference = 'tab_release__adjudicators_tab_released'
@@ -7,9 +7,15 @@ urlpatterns = [
         path('',
             views.StandingsIndexView.as_view(),
             name='standings-index'),
+        path('export/',
+            views.ExportPublicTabsView.as_view(),
+            name='standings-export-public-tabs'),
         path('team/',
             views.TeamStandingsView.as_view(),
             name='standings-team'),
+        path('team/download/<str:format>/',
+            views.TeamStandingsDownloadView.as_view(),
+            name='standings-team-download'),
         path('team/<slug:category>/',
             views.BreakCategoryStandingsView.as_view(),
             name='standings-break-category'),
@@ -20,12 +26,21 @@ urlpatterns = [
         path('speaker/',
             views.SpeakerStandingsView.as_view(),
             name='standings-speaker'),
+        path('speaker/download/<str:format>/',
+            views.SpeakerStandingsDownloadView.as_view(),
+            name='standings-speaker-download'),
         path('speaker/<slug:category>/',
             views.SpeakerCategoryStandingsView.as_view(),
             name='standings-speaker-category'),
         path('reply/',
             views.ReplyStandingsView.as_view(),
             name='standings-reply'),
+        path('reply/download/<str:format>/',
+            views.ReplyStandingsDownloadView.as_view(),
+            name='standings-reply-download'),
+        path('adjudicators/download/<str:format>/',
+            views.AdjudicatorTabDownloadView.as_view(),
+            name='standings-adjudicators-download'),
 
         path('diversity/',
             views.DiversityStandingsView.as_view(),
@@ -15,12 +15,18 @@ urlpatterns = [
     path('team/',
         views.PublicTeamTabView.as_view(),
         name='standings-public-tab-team'),
+    path('team/download/<str:format>/',
+        views.PublicTeamTabDownloadView.as_view(),
+        name='standings-public-tab-team-download'),
     path('team/<slug:category>/',
         views.PublicBreakCategoryTabView.as_view(),
         name='standings-public-tab-break-category'),
     path('speaker/',
         views.PublicSpeakerTabView.as_view(),
         name='standings-public-tab-speaker'),
+    path('speaker/download/<str:format>/',
+        views.PublicSpeakerTabDownloadView.as_view(),
+        name='standings-public-tab-speaker-download'),
     path('speaker/<slug:category>/',
         views.PublicSpeakerCategoryTabView.as_view(),
         name='standings-public-tab-speaker-category'),
@@ -28,10 +34,16 @@ urlpatterns = [
     path('replies/',
         views.PublicReplyTabView.as_view(),
         name='standings-public-tab-replies'),
+    path('replies/download/<str:format>/',
+        views.PublicReplyTabDownloadView.as_view(),
+        name='standings-public-tab-replies-download'),
 
     path('adjudicators/',
         views.PublicAdjudicatorsTabView.as_view(),
         name='standings-public-adjudicators-tab'),
+    path('adjudicators/download/<str:format>/',
+        views.PublicAdjudicatorsTabDownloadView.as_view(),
+        name='standings-public-adjudicators-tab-download'),
     path('diversity/',
         views.PublicDiversityStandingsView.as_view(),
         name='standings-public-diversity'),
@@ -4,9 +4,10 @@ import logging
 from django.conf import settings
 from django.contrib import messages
 from django.db.models import Avg, Count, Prefetch
+from django.http import Http404, HttpResponseBadRequest
 from django.utils.html import mark_safe
 from django.utils.translation import gettext as _
-from django.utils.translation import gettext_lazy
+from django.utils.translation import get_language, gettext_lazy, ngettext
 from django.views.generic.base import TemplateView
 
 from adjfeedback.views import BaseFeedbackOverview
@@ -19,13 +20,17 @@ from tournaments.mixins import PublicTournamentPageMixin, RoundMixin, SingleObje
 from tournaments.models import Round
 from utils.misc import reverse_tournament
 from utils.mixins import AdministratorMixin
-from utils.views import VueTableTemplateView
+from utils.views import PostOnlyRedirectView, VueTableTemplateView
 from utils.tables import TabbycatTableBuilder
 
 from .base import StandingsError
 from .diversity import get_diversity_data_sets
+from .exports import export_public_tabs, get_public_tab_export, IN_PROGRESS_VIEW
+from .models import PublicTabExport
 from .teams import TeamStandingsGenerator
 from .speakers import SpeakerStandingsGenerator
+from .streaming import (adjudicator_tab_rows, download_response, speaker_standings_rows, STREAM_FORMATS,
+    streaming_response, team_standings_rows)
 from .round_results import add_speaker_round_results, add_team_round_results, add_team_round_results_public
 from .templatetags.standingsformat import metricformat
 
@@ -82,9 +87,35 @@ class StandingsIndexView(AdministratorMixin, RoundMixin, TemplateView):
             kwargs["top_motions"] = motions.order_by('-ballotsubmission__count')[:4]
             kwargs["bottom_motions"] = motions.order_by('ballotsubmission__count')[:4]
 
+        kwargs["public_tab_exports"] = PublicTabExport.objects.filter(tournament=self.tournament).exclude(
+                view=IN_PROGRESS_VIEW).order_by('timestamp')
+
         return super().get_context_data(**kwargs)
 
 
+class ExportPublicTabsView(AdministratorMixin, RoundMixin, PostOnlyRedirectView):
+    """Exports all released public tab pages, so that they're served without
+    generating the standings. See `standings.exports`."""
+
+    round_redirect_pattern_name = 'standings-index'
+
+    def post(self, request, *args, **kwargs):
+        languages = {settings.LANGUAGE_CODE, get_language()}
+        count = export_public_tabs(self.tournament, languages=sorted(languages))
+        if count is None:
+            messages.warning(request, _("The public tab pages weren't exported, because the results "
+                "or settings changed while they were being exported. Please try again."))
+        elif count:
+            messages.success(request, ngettext(
+                "Exported %(count)d public tab page.",
+                "Exported %(count)d public tab pages.",
+                count) % {'count': count})
+        else:
+            messages.warning(request, _("No public tab pages were exported. Check that the tabs "
+                "have been released, and that there are no errors on the tab pages."))
+        return super().post(request, *args, **kwargs)
+
+
 # ==============================================================================
 # Shared standings
 # ==============================================================================
@@ -189,6 +220,15 @@ class PublicTabMixin(PublicTournamentPageMixin):
         kwargs['for_public'] = True
         return super().get_context_data(**kwargs)
 
+    def get_tables_data(self, use_export=True):
+        """Uses the exported tables data for this page, if there is one. See
+        `standings.exports`."""
+        if use_export:
+            tables_data = get_public_tab_export(self.tournament, type(self).__name__, self.kwargs.get('category', ""))
+            if tables_data is not None:
+                return tables_data
+        return super().get_tables_data()
+
 
 # ==============================================================================
 # Speaker standings
@@ -667,3 +707,102 @@ class PublicAdjudicatorsTabView(PublicTabMixin, BaseFeedbackOverview):
             "individual pieces of feedback across all rounds. "
             "<a href='http://tabbycat.readthedocs.io/en/stable/features/adjudicator-feedback.html#how-is-an-adjudicator-s-score-determined'>Read more</a>."))
         return table
+
+
+# ==============================================================================
+# Downloads
+# ==============================================================================
+
+class BaseStandingsDownloadMixin:
+    """Mixin for views that, rather than showing a table, return their rows as
+    a CSV or JSON file, depending on the `format` URL keyword argument.
+    Subclasses must implement `get_download_rows()`, which returns a tuple
+    `(header, rows)` (see `standings.streaming`).
+
+    Only admin downloads are streamed. Public downloads are returned whole, so
+    that they're cached like the public pages are."""
+
+    download_name = None
+
+    def get(self, request, *args, **kwargs):
+        if kwargs['format'] not in STREAM_FORMATS:
+            raise Http404("Unrecognized download format: %s" % kwargs['format'])
+        try:
+            header, rows = self.get_download_rows()
+        except StandingsError as e:
+            logger.exception("Error generating standings for download: " + str(e))
+            return HttpResponseBadRequest(str(e), content_type="text/plain")
+        filename = "{}-{}.{}".format(self.tournament.slug, self.download_name, kwargs['format'])
+        if self.admin_download:
+            return streaming_response(header, rows, kwargs['format'], filename)
+        return download_response(header, rows, kwargs['format'], filename)
+
+    @property
+    def admin_download(self):
+        return isinstance(self, AdministratorMixin)
+
+
+class TeamStandingsDownloadMixin(BaseStandingsDownloadMixin):
+    download_name = "team-tab"
+
+    def get_download_rows(self):
+        standings, rounds = self.get_standings()
+        return team_standings_rows(standings, rounds,
+            show_institutions=self.tournament.pref('show_team_institutions'),
+            code_names=use_team_code_names(self.tournament, self.admin_download))
+
+
+class SpeakerStandingsDownloadMixin(BaseStandingsDownloadMixin):
+
+    def get_download_rows(self):
+        standings, rounds = self.get_standings()
+        return speaker_standings_rows(standings, rounds,
+            show_institutions=self.tournament.pref('show_team_institutions'),
+            code_names=use_team_code_names(self.tournament, self.admin_download),
+            redact_anonymous=not self.admin_download)
+
+
+class AdjudicatorTabDownloadMixin(BaseStandingsDownloadMixin):
+    download_name = "adjudicator-tab"
+
+    def get_download_rows(self):
+        return adjudicator_tab_rows(self.get_adjudicators(), self.tournament.current_round.feedback_weight,
+            show_institutions=self.tournament.pref('show_adjudicator_institutions'))
+
+
+class TeamStandingsDownloadView(TeamStandingsDownloadMixin, TeamStandingsView):
+    pass
+
+
+class PublicTeamTabDownloadView(TeamStandingsDownloadMixin, PublicTeamTabView):
+    pass
+
+
+class SpeakerStandingsDownloadView(SpeakerStandingsDownloadMixin, SpeakerStandingsView):
+    download_name = "speaker-tab"
+
+
+class PublicSpeakerTabDownloadView(SpeakerStandingsDownloadMixin, PublicSpeakerTabView):
+    download_name = "speaker-tab"
+
+
+class ReplyStandingsDownloadView(SpeakerStandingsDownloadMixin, ReplyStandingsView):
+    download_name = "reply-tab"
+
+
+class PublicReplyTabDownloadView(SpeakerStandingsDownloadMixin, PublicReplyTabView):
+    download_name = "reply-tab"
+
+
+class AdjudicatorTabDownloadView(AdjudicatorTabDownloadMixin, AdministratorMixin, BaseFeedbackOverview):
+    pass
+
+
+class PublicAdjudicatorsTabDownloadView(AdjudicatorTabDownloadMixin, PublicAdjudicatorsTabView):
+
+    def get_download_rows(self):
+        shows = self.tournament.pref('adjudicators_tab_shows')
+        return adjudicator_tab_rows(self.get_adjudicators(), self.tournament.current_round.feedback_weight,
+            show_institutions=self.tournament.pref('show_adjudicator_institutions'),
+            show_test_scores=shows in ['test', 'all'], show_feedback_scores=shows == 'all',
+            show_final_scores=shows in ['final', 'all'])
@@ -294,10 +294,11 @@ class SingleObjectByRandomisedUrlMixin(SingleObjectFromTournamentMixin):
     slug_url_kwarg = 'url_key'
 
 
-class DrawForDragAndDropMixin(RoundMixin):
-    """Provides the base set of constructors used to assemble a the
-    drag and drop table used for editing matchups/adjs/venues with a
-    drag and drop interface. Subclass annotate method to add extra view data """
+class DragAndDropDrawSerializationMixin:
+    """Serializes the draw for the drag and drop interfaces used for editing
+    matchups/adjs/venues. Only needs `self.round` and `self.tournament`, so it
+    can be used outside views, for example by background jobs that send a new
+    draw to an open editor. Subclass annotate method to add extra data."""
 
     @cached_property
     def break_categories(self):
@@ -361,14 +362,6 @@ class DrawForDragAndDropMixin(RoundMixin):
 
         return serialised_draw
 
-    def get_round_info(self):
-        round_info = self.round.serialize()
-        if hasattr(self, 'auto_url'):
-            round_info['autoUrl'] = reverse_round(self.auto_url, self.round)
-        if hasattr(self, 'save_url'):
-            round_info['saveUrl'] = reverse_round(self.save_url, self.round)
-        return round_info
-
     def get_draw(self):
         # The use-case for prefetches here is so intense that we'll just implement
         # a separate one (as opposed to use Round.debate_set_with_prefetches())
@@ -391,6 +384,20 @@ class DrawForDragAndDropMixin(RoundMixin):
         draw = self.annotate_draw(draw, serialised_draw)
         return json.dumps(serialised_draw)
 
+
+class DrawForDragAndDropMixin(DragAndDropDrawSerializationMixin, RoundMixin):
+    """Provides the base set of constructors used to assemble a the
+    drag and drop table used for editing matchups/adjs/venues with a
+    drag and drop interface. Subclass annotate method to add extra view data """
+
+    def get_round_info(self):
+        round_info = self.round.serialize()
+        if hasattr(self, 'auto_url'):
+            round_info['autoUrl'] = reverse_round(self.auto_url, self.round)
+        if hasattr(self, 'save_url'):
+            round_info['saveUrl'] = reverse_round(self.save_url, self.round)
+        return round_info
+
     def get_context_data(self, **kwargs):
         kwargs['vueDebates'] = self.get_draw()
         kwargs['vueRoundInfo'] = json.dumps(self.get_round_info())
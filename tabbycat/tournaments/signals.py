@@ -3,6 +3,7 @@ from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from tournaments.models import Round, Tournament
+from utils.consumers import forget_tournament
 
 import logging
 logger = logging.getLogger(__name__)
@@ -14,6 +15,7 @@ def update_tournament_cache(sender, instance, **kwargs):
     cache.delete(cached_key)
     cached_key = "%s_%s" % (instance.slug, 'current_round_object')
     cache.delete(cached_key)
+    forget_tournament(instance.slug)
 
 
 @receiver(post_delete, sender=Round)
@@ -0,0 +1,136 @@
+"""Solvers for the linear assignment problem, used by the Hungarian-based
+adjudicator allocators and the BP power-paired draw generator.
+
+All solvers take a cost matrix as a two-dimensional NumPy array (or anything
+that can be converted to one), which need not be square. Pairs that may not be
+assigned to each other should be given a cost of `DISALLOWED` (which is
+`numpy.inf`). Solvers return a list of (row, column) index pairs, sorted by row,
+with one pair for each row or column, whichever is fewer.
+
+The solver to use is chosen by name using `get_solver()`. Solvers that rely on
+optional packages fall back to the Munkres solver if the package isn't
+installed."""
+
+import logging
+
+import munkres
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DISALLOWED = np.inf
+
+
+class AssignmentInfeasibleError(Exception):
+    """Raised when there is no assignment that avoids all disallowed pairs."""
+    pass
+
+
+class BaseAssignmentSolver:
+    """Base class for assignment solvers. Subclasses must implement
+    `_solve()`, and may assume that the cost matrix passed to it is a
+    two-dimensional NumPy array of floats."""
+
+    name = None
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def solve(self, costs):
+        costs = np.asarray(costs, dtype=float)
+        if costs.size == 0:
+            return []
+        indices = sorted(self._solve(costs))
+        if any(np.isinf(costs[i, j]) for i, j in indices):
+            raise AssignmentInfeasibleError("No assignment avoids all disallowed pairs")
+        return indices
+
+    def _solve(self, costs):
+        raise NotImplementedError
+
+    @staticmethod
+    def _finite_costs(costs):
+        """Returns a copy of `costs` in which disallowed cells are replaced by a
+        cost large enough that no optimal assignment uses them unless it has
+        to, for solvers that can't handle infinite costs."""
+        disallowed = np.isinf(costs)
+        if not disallowed.any():
+            return costs
+        finite = costs[~disallowed]
+        span = (finite.max() - min(finite.min(), 0)) if finite.size else 0
+        costs = costs.copy()
+        costs[disallowed] = (span + 1) * min(costs.shape) + 1
+        return costs
+
+
+class MunkresSolver(BaseAssignmentSolver):
+    """Pure-Python implementation of the Hungarian algorithm, from the
+    `munkres` package."""
+
+    name = "munkres"
+
+    def _solve(self, costs):
+        matrix = costs.astype(object)
+        matrix[np.isinf(costs)] = munkres.DISALLOWED
+        try:
+            return munkres.Munkres().compute(matrix.tolist())
+        except munkres.UnsolvableMatrix as e:
+            raise AssignmentInfeasibleError(str(e))
+
+
+class SciPySolver(BaseAssignmentSolver):
+    """`linear_sum_assignment()` from SciPy."""
+
+    name = "scipy"
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import scipy.optimize  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _solve(self, costs):
+        from scipy.optimize import linear_sum_assignment
+        rows, cols = linear_sum_assignment(self._finite_costs(costs))
+        return list(zip(rows.tolist(), cols.tolist()))
+
+
+class LAPJVSolver(BaseAssignmentSolver):
+    """Jonker-Volgenant algorithm, from the `lap` package."""
+
+    name = "lapjv"
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import lap  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _solve(self, costs):
+        import lap
+        _, x, _ = lap.lapjv(self._finite_costs(costs), extend_cost=costs.shape[0] != costs.shape[1])
+        return [(i, j) for i, j in enumerate(x.tolist()) if j >= 0]
+
+
+SOLVER_CLASSES = [MunkresSolver, SciPySolver, LAPJVSolver]
+SOLVERS = {cls.name: cls for cls in SOLVER_CLASSES}
+DEFAULT_SOLVER = MunkresSolver.name
+
+
+def get_solver(name=DEFAULT_SOLVER):
+    """Returns an instance of the solver with the given name. If that solver's
+    package isn't installed, logs a warning and returns a Munkres solver."""
+    try:
+        cls = SOLVERS[name]
+    except KeyError:
+        raise ValueError("Unrecognised assignment solver: %s" % name)
+    if not cls.is_available():
+        logger.warning("Assignment solver '%s' is not available, using '%s' instead",
+                name, DEFAULT_SOLVER)
+        cls = SOLVERS[DEFAULT_SOLVER]
+    return cls()
@@ -0,0 +1,144 @@
+"""Batched broadcasts to WebSocket consumers.
+
+Sending a message to a group blocks the sender until the channel layer has
+taken it, and every message makes the pages listening to the group update.
+When many events happen at once, like when ballots are being submitted at the
+end of a round, that slows down the requests sending them and the pages
+receiving them.
+
+`publish()` instead adds the event to a batch for its group and returns
+straight away. A background thread sends each group's batch as one message,
+`settings.BROADCAST_BATCH_WINDOW` seconds after the first event in it. The
+consumers pass messages on to clients as usual (see `TournamentConsumer`); a
+batched message has a "batch" key with a list of the events' data, in the
+order they were published, which `WebSocketMixin` unpacks.
+
+The in-memory channel layer (used in local installations) can't be used from
+another thread's event loop, so in that case, and if the window is zero,
+events are sent one at a time, straight away, as by `utils.jobs.broadcast()`."""
+
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from channels.layers import get_channel_layer, InMemoryChannelLayer
+from django.conf import settings
+
+from .jobs import broadcast
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastBatcher:
+    """Collects events for each group, and calls `send(group_name, items)`
+    with a list of each group's events, `window` seconds after the first
+    event for that group. `send` is called from a background thread, which is
+    started when the first event is published."""
+
+    def __init__(self, window, send):
+        self.window = window
+        self.send = send
+        self._batches = OrderedDict()  # group name: (deadline, list of data), oldest first
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def publish(self, group_name, data):
+        with self._condition:
+            if group_name not in self._batches:
+                self._batches[group_name] = (time.monotonic() + self.window, [])
+                self._condition.notify()
+            self._batches[group_name][1].append(data)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="broadcast-batcher", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Sends all pending batches now, in this thread. The background thread
+        is stopped first, so that the two never call `send` at the same time
+        (which `ChannelLayerSender` doesn't allow), and started again by the
+        next event."""
+        with self._condition:
+            thread = self._thread
+            self._stopping = True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+
+        with self._condition:
+            batches = [(group_name, items) for group_name, (deadline, items) in self._batches.items()]
+            self._batches.clear()
+            self._thread = None
+            self._stopping = False
+        for group_name, items in batches:
+            self._send(group_name, items)
+
+    def _next_due_batch(self):
+        """Waits until the oldest batch is due, then removes and returns it.
+        Returns None if the thread is being stopped."""
+        with self._condition:
+            while not self._stopping:
+                if not self._batches:
+                    self._condition.wait()
+                    continue
+                group_name, (deadline, items) = next(iter(self._batches.items()))
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                del self._batches[group_name]
+                return group_name, items
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._next_due_batch()
+            if batch is None:
+                return
+            self._send(*batch)
+
+    def _send(self, group_name, items):
+        try:
+            self.send(group_name, items)
+        except Exception:
+            logger.exception("Error sending %d batched events to %s", len(items), group_name)
+
+
+class ChannelLayerSender:
+    """Sends batches to a channel layer group, using an event loop of its own,
+    so that the channel layer's connections are reused between batches."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self, group_name, items):
+        self.loop.run_until_complete(get_channel_layer().group_send(group_name, {
+            "type": "send_json",
+            "batch": items,
+        }))
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = BroadcastBatcher(settings.BROADCAST_BATCH_WINDOW, ChannelLayerSender())
+            atexit.register(_batcher.flush)
+        return _batcher
+
+
+def publish(group_name, data):
+    """Sends `data` to all consumers in the given group, batched with other
+    events for the group published around the same time. Doesn't block."""
+    if settings.BROADCAST_BATCH_WINDOW <= 0 or isinstance(get_channel_layer(), InMemoryChannelLayer):
+        broadcast(group_name, data)
+    else:
+        get_batcher().publish(group_name, data)
@@ -1,8 +1,8 @@
-from asgiref.sync import async_to_sync
-from django.core.cache import cache
-from django.shortcuts import get_object_or_404
+import time
 
-from channels.generic.websocket import JsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.core.cache import cache
 
 from tournaments.models import Tournament
 
@@ -25,10 +25,26 @@ class WSPublicAccessMixin():
         return True
 
 
-class TournamentConsumer(JsonWebsocketConsumer):
+# Tournaments looked up by consumers in this process, by slug, with the time
+# they expire. Consumers only need the tournament's primary key and slug, so
+# a copy that's a little out of date is fine; saving a tournament removes it
+# (see tournaments/signals.py), but only in the process that saved it.
+_tournaments = {}
+TOURNAMENT_CACHE_TIMEOUT = 300
+
+
+def forget_tournament(slug):
+    _tournaments.pop(slug, None)
+
+
+class TournamentConsumer(AsyncJsonWebsocketConsumer):
     """For a channel consumer specific to a tournament and whose path includes
     a tournament_slug. Must provide a group_prefix that serves as a stream_name
-    to be follow by "_" and tournament_slug."""
+    to be follow by "_" and tournament_slug.
+
+    This is an asynchronous consumer, so that open connections don't each
+    need a thread; anything that uses the database must be wrapped in
+    `database_sync_to_async`."""
 
     group_prefix = None
 
@@ -36,49 +52,62 @@ class TournamentConsumer(JsonWebsocketConsumer):
     tournament_cache_key = "{slug}_object"
     tournament_redirect_pattern_name = None
 
-    def tournament(self):
+    async def tournament(self):
+        """Returns the tournament, or None if there's no tournament with the
+        slug in the path."""
+
         # First look in self
         if hasattr(self, "_tournament_from_url"):
             return self._tournament_from_url
 
-        # Then look in cache
+        # Then look in this process
         slug = self.scope["url_route"]["kwargs"][self.tournament_slug_url_kwarg]
+        expiry, tournament = _tournaments.get(slug, (0, None))
+        if expiry < time.monotonic():
+            # Then in the cache, then the database
+            tournament = await database_sync_to_async(self.get_tournament)(slug)
+            if tournament is not None:
+                _tournaments[slug] = (time.monotonic() + TOURNAMENT_CACHE_TIMEOUT, tournament)
+
+        self._tournament_from_url = tournament
+        return tournament
+
+    def get_tournament(self, slug):
         key = self.tournament_cache_key.format(slug=slug)
         cached_tournament = cache.get(key)
         if cached_tournament:
-            self._tournament_from_url = cached_tournament
             return cached_tournament
 
-        # If it was in neither place, retrieve the object
-        tournament = get_object_or_404(Tournament, slug=slug)
+        try:
+            tournament = Tournament.objects.get(slug=slug)
+        except Tournament.DoesNotExist:
+            return None
         cache.set(key, tournament, None)
-        self._tournament_from_url = tournament
         return tournament
 
     def group_name(self):
-        return self.group_prefix + '_' + self.tournament().slug
+        # Only valid once connected, when the slug is known to be a tournament's
+        return self.group_prefix + '_' + self._tournament_from_url.slug
 
-    def send_error(self, error, message, original_content):
+    async def send_error(self, error, message, original_content):
         # Need to forcibly decode the string (for translations)
-        self.send_json({
+        await self.send_json({
             'error': str(error),
             'message': str(message),
             'original_content': original_content,
             'component_id': original_content['component_id']
         })
-        return super()
-
-    def connect(self):
-        if self.authentication_needed():
-            async_to_sync(self.channel_layer.group_add)(
-                self.group_name(), self.channel_name
-            )
-            self.accept()
+
+    async def connect(self):
+        # The user is loaded from the session lazily, so check in a thread
+        authenticated = await database_sync_to_async(self.authentication_needed)()
+        if authenticated and await self.tournament() is not None:
+            await self.channel_layer.group_add(self.group_name(), self.channel_name)
+            await self.accept()
         else:
-            pass
+            await self.close()
 
-    def disconnect(self, message):
-        async_to_sync(self.channel_layer.group_discard)(
-            self.group_name(), self.channel_name
-        )
-        super().disconnect(message)
+    async def disconnect(self, message):
+        if getattr(self, "_tournament_from_url", None) is not None:
+            await self.channel_layer.group_discard(self.group_name(), self.channel_name)
+        await super().disconnect(message)
@@ -0,0 +1,49 @@
+"""Utilities for running long jobs, like auto-allocations and draw generation,
+outside of the HTTP request that starts them.
+
+Jobs are sent to a named channel, which is handled by a worker process started
+with `manage.py runworker <channel>` (see the "channel" routes in routing.py).
+The in-memory channel layer (used in local installations) can't be read from
+other processes, so in that case jobs are run in a background thread of the
+web server instead."""
+
+import logging
+import threading
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer, InMemoryChannelLayer
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def dispatch_job(channel, message, func, *args):
+    """Sends `message` to the worker listening on `channel`, or, if the
+    channel layer can't be read by other processes, calls `func(*args)` in a
+    background thread instead."""
+    channel_layer = get_channel_layer()
+    if isinstance(channel_layer, InMemoryChannelLayer):
+        logger.info("Running %s job in a background thread", channel)
+        thread = threading.Thread(target=_run_in_thread, args=(func,) + args, daemon=True)
+        thread.start()
+    else:
+        logger.info("Sending job to %s worker", channel)
+        async_to_sync(channel_layer.send)(channel, message)
+
+
+def _run_in_thread(func, *args):
+    try:
+        func(*args)
+    finally:
+        # Threads get their own database connections, which Django doesn't
+        # close automatically
+        connection.close()
+
+
+def broadcast(group_name, data):
+    """Sends `data` to all consumers in the given group, in the same form as
+    other broadcasts from views (see e.g. LogActionMixin.log_action())."""
+    async_to_sync(get_channel_layer().group_send)(group_name, {
+        "type": "send_json",
+        "data": data,
+    })
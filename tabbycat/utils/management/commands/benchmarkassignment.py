@@ -0,0 +1,100 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from draw.generator.bphungarian import BPHungarianDrawGenerator
+from utils.assignment import SOLVERS
+
+
+class SyntheticTeam:
+
+    def __init__(self, id, points, side_history):
+        self.id = id
+        self.points = points
+        self.side_history = side_history
+
+    def __repr__(self):
+        return "<SyntheticTeam {0}>".format(self.id)
+
+
+class Command(BaseCommand):
+
+    help = "Compares assignment solvers on synthetic BP draw and adjudicator allocation instances"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-r", "--rooms", type=int, nargs="+", default=[100, 200, 400],
+                            help="Numbers of rooms in the synthetic instances")
+        parser.add_argument("-s", "--solvers", type=str, nargs="+", choices=list(SOLVERS.keys()),
+                            default=list(SOLVERS.keys()), help="Solvers to compare")
+        parser.add_argument("-p", "--prior-rounds", type=int, default=6,
+                            help="Number of rounds before the synthetic BP draw")
+        parser.add_argument("-n", "--repeats", type=int, default=1,
+                            help="Number of times to run each solver on each instance")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="Seed for the random number generators")
+
+    def handle(self, *args, **options):
+        if options["seed"] is not None:
+            random.seed(options["seed"])
+            np.random.seed(options["seed"])
+
+        solvers = []
+        for name in options["solvers"]:
+            cls = SOLVERS[name]
+            if not cls.is_available():
+                self.stdout.write(self.style.WARNING("Skipping solver '{}', which is not installed".format(name)))
+                continue
+            solvers.append(cls())
+        if not solvers:
+            raise CommandError("None of the requested solvers are installed.")
+
+        for nrooms in options["rooms"]:
+            instances = [
+                ("BP draw, {:d} teams".format(nrooms * 4), self.bp_draw_costs(nrooms, options["prior_rounds"])),
+                ("allocation, {:d} panellists".format(nrooms * 3), self.allocation_costs(nrooms)),
+            ]
+            for description, costs in instances:
+                self.stdout.write("{} ({:d} x {:d}):".format(description, *costs.shape))
+                for solver in solvers:
+                    self.run_solver(solver, costs, options["repeats"])
+
+    def run_solver(self, solver, costs, repeats):
+        times = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            indices = solver.solve(costs)
+            times.append(time.perf_counter() - start)
+        total_cost = sum(costs[i, j] for i, j in indices)
+        self.stdout.write("    {name:<10} {time:10.3f} s   total cost {cost:.4f}".format(
+            name=solver.name, time=min(times), cost=total_cost))
+
+    def bp_draw_costs(self, nrooms, nrounds):
+        """Returns a cost matrix for a power-paired BP draw of `nrooms` rooms,
+        with teams whose points and side histories are simulated over `nrounds`
+        random rounds."""
+        teams = [SyntheticTeam(i, 0, [0, 0, 0, 0]) for i in range(nrooms * 4)]
+        for r in range(nrounds):
+            random.shuffle(teams)
+            for room in range(nrooms):
+                for pos, team in enumerate(teams[room*4:room*4+4]):
+                    team.points += 3 - pos
+                    team.side_history[pos] += 1
+        random.shuffle(teams)
+
+        generator = BPHungarianDrawGenerator(teams)
+        rooms = generator.define_rooms([team.points for team in teams])
+        return generator.generate_cost_matrix(rooms)
+
+    def allocation_costs(self, nrooms):
+        """Returns a cost matrix resembling the panellist matrix of the voting
+        Hungarian allocator, for `nrooms` rooms of three panellists."""
+        scores = np.random.uniform(0, 5, nrooms * 3)
+        importances = np.repeat(np.random.randint(1, 6, nrooms), 3).astype(float)
+        diff = 5 + importances[:, np.newaxis] - scores[np.newaxis, :]
+        costs = np.where(diff > 0.25, 1000 * np.exp(np.maximum(diff, 0.25) - 0.25), 0.0)
+        costs += 5 - scores
+        conflicts = np.random.random_sample(costs.shape) < 0.01
+        costs[conflicts] += 1e6
+        return costs
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import CommandError
+
+from checkins.consumers import CheckInEventConsumer
+from utils.management.base import TournamentCommand
+
+
+class Command(TournamentCommand):
+
+    help = "Opens increasing numbers of check-in WebSocket connections in this " \
+           "process, broadcasts to them, and reports how many connections one " \
+           "worker can sustain. Uses the configured channel layer."
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument("-c", "--connections", type=int, nargs="+", default=[100, 250, 500, 1000, 2000],
+                            help="Numbers of simultaneous connections to try, in increasing order")
+        parser.add_argument("-b", "--broadcasts", type=int, default=5,
+                            help="Number of messages to broadcast at each step")
+        parser.add_argument("--timeout", type=float, default=5.0,
+                            help="Seconds to wait for each connection or message before counting it as failed")
+        parser.add_argument("--max-latency", type=float, default=1.0,
+                            help="Slowest acceptable time (in seconds) for a broadcast to reach every connection")
+
+    def handle_tournament(self, tournament, **options):
+        if options["connections"] != sorted(options["connections"]):
+            raise CommandError("--connections must be in increasing order.")
+
+        self.stdout.write("Tournament \"{:s}\":".format(tournament.name))
+        sustained = 0
+        for nconnections in options["connections"]:
+            ok = async_to_sync(self.run_step)(tournament, nconnections, **options)
+            if not ok:
+                break
+            sustained = nconnections
+
+        if sustained:
+            self.stdout.write(self.style.SUCCESS("Sustained {:d} connections".format(sustained)))
+        else:
+            self.stdout.write(self.style.ERROR("Couldn't sustain {:d} connections".format(
+                options["connections"][0])))
+
+    def application(self, tournament):
+        """Returns an application that opens a public check-in consumer for the
+        tournament, as the routing would for an anonymous user."""
+        def application(scope):
+            scope = dict(scope, user=AnonymousUser(), url_route={
+                "args": (), "kwargs": {"tournament_slug": tournament.slug}})
+            return CheckInEventConsumer(scope)
+        return application
+
+    async def run_step(self, tournament, nconnections, **options):
+        """Opens `nconnections` connections, broadcasts to them, then closes
+        them. Returns True if every connection was accepted and received every
+        message within the limits."""
+        timeout = options["timeout"]
+        application = self.application(tournament)
+        communicators = [WebsocketCommunicator(application, "/ws/{}/checkins/".format(tournament.slug))
+                         for i in range(nconnections)]
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[c.connect(timeout) for c in communicators], return_exceptions=True)
+        connect_time = time.perf_counter() - start
+        # connect() returns (accepted, subprotocol or close code)
+        connected = [c for c, result in zip(communicators, results) if isinstance(result, tuple) and result[0]]
+
+        latencies = []
+        failures = 0
+        group_name = CheckInEventConsumer.group_prefix + "_" + tournament.slug
+        for i in range(options["broadcasts"]):
+            start = time.perf_counter()
+            await get_channel_layer().group_send(group_name, {"type": "send_json", "data": {"loadtest": i}})
+            received = await asyncio.gather(*[c.receive_json_from(timeout) for c in connected],
+                                            return_exceptions=True)
+            latencies.append(time.perf_counter() - start)
+            failures += sum(1 for r in received if isinstance(r, Exception))
+
+        await asyncio.gather(*[c.disconnect() for c in connected], return_exceptions=True)
+
+        ok = len(connected) == nconnections and failures == 0 and \
+            max(latencies, default=0) <= options["max_latency"]
+        self.stdout.write("    {n:>6d} connections: {conn:>6d} accepted in {ct:6.2f} s, "
+                          "broadcast latency mean {mean:6.3f} s, max {max:6.3f} s, "
+                          "{fail:d} messages not received".format(
+                              n=nconnections, conn=len(connected), ct=connect_time,
+                              mean=sum(latencies) / len(latencies) if latencies else 0,
+                              max=max(latencies, default=0), fail=failures),
+                          self.style.SUCCESS if ok else self.style.ERROR)
+        return ok
@@ -1,7 +1,6 @@
 from django.contrib.auth import get_user_model
 
-from adjallocation.allocator import allocate_adjudicators
-from adjallocation.hungarian import ConsensusHungarianAllocator, VotingHungarianAllocator
+from adjallocation.allocator import allocate_adjudicators, get_allocator_class
 from availability.utils import activate_all
 from draw.models import Debate
 from draw.manager import DrawManager
@@ -35,11 +34,7 @@ class Command(GenerateResultsCommandMixin, RoundCommand):
         round.save()
 
         self.stdout.write("Auto-allocating adjudicators for round '{}'...".format(round.name))
-        if round.ballots_per_debate == 'per-adj':
-            allocator_class = VotingHungarianAllocator
-        else:
-            allocator_class = ConsensusHungarianAllocator
-        allocate_adjudicators(round, allocator_class)
+        allocate_adjudicators(round, get_allocator_class(round))
 
         self.stdout.write("Generating results for round '{}'...".format(round.name))
         add_results_to_round(round, **self.result_kwargs(options))